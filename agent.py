@@ -1,12 +1,13 @@
 import os
-import ast
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_community.tools import WikipediaQueryRun
-from langchain_community.utilities import WikipediaAPIWrapper
-from langchain_community.utilities import SerpAPIWrapper
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+import time
+import asyncio
+import argparse
+from functools import lru_cache
+from calculator import CalculatorError, format_number, solve
+from clients import load_env, pooled_client_kwargs
+from router import route
+from scheduler import get_scheduler
+from weather import NoWeatherResult, WeatherResult, get_weather, parse_weather
 
 # Simple memory implementation for newer LangChain versions
 class SimpleMemory:
@@ -26,46 +27,246 @@ class SimpleMemory:
     def get_context(self):
         return self.buffer
 
-load_dotenv()
+# Clients are built on first use so importing this module stays fast
 
-# Initialize LLM
-api_key = os.getenv("OPENAI_API_KEY")
-serpapi_key = os.getenv("SERPAPI_API_KEY")
-llm = ChatOpenAI(temperature=0, openai_api_key=api_key)
+@lru_cache(maxsize=None)
+def get_llm():
+    """Initialize LLM"""
+    from langchain_openai import ChatOpenAI
+    load_env()
+    api_key = os.getenv("OPENAI_API_KEY")
+    return ChatOpenAI(temperature=0, openai_api_key=api_key, **pooled_client_kwargs())
 
-# Create Wikipedia tool
-wikipedia = WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper())
+@lru_cache(maxsize=None)
+def get_wikipedia():
+    """Create Wikipedia tool"""
+    from langchain_community.tools import WikipediaQueryRun
+    from langchain_community.utilities import WikipediaAPIWrapper
+    return WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper())
 
-# Create SerpAPI tool
-serpapi = SerpAPIWrapper(serpapi_api_key=serpapi_key)
-
-# LangChain memory implementation (last 3 conversations)
-memory = ConversationBufferWindowMemory(k=3)
+@lru_cache(maxsize=None)
+def get_serpapi():
+    """Create SerpAPI tool"""
+    from langchain_community.utilities import SerpAPIWrapper
+    load_env()
+    return SerpAPIWrapper(serpapi_api_key=os.getenv("SERPAPI_API_KEY"))
 
 def calculator(expression: str) -> str:
-    """Calculate mathematical expressions"""
+    """Calculate a mathematical expression, or the arithmetic in a question, without eval"""
     try:
-        return str(eval(expression))
-    except:
+        return format_number(solve(expression)[1])
+    except CalculatorError:
         return "Invalid expression"
 
 def format_weather(weather_data):
     """Format weather data in a user-friendly way"""
-    if isinstance(weather_data, dict) and weather_data.get('type') == 'weather_result':
-        return f"Weather in {weather_data.get('location', 'Unknown')}: {weather_data.get('weather', 'N/A')} at {weather_data.get('temperature', 'N/A')}°{weather_data.get('unit', 'F')[0]}. Humidity: {weather_data.get('humidity', 'N/A')}, Wind: {weather_data.get('wind', 'N/A')}, Precipitation: {weather_data.get('precipitation', 'N/A')} ({weather_data.get('date', 'N/A')})"
-    return str(weather_data)
-
-# Create conversation chain with LangChain memory
-conversation = ConversationChain(
-    llm=llm,
-    memory=memory,
-    verbose=True
-)
-
-def ask_question(question):
+    result = weather_data if isinstance(weather_data, WeatherResult) else parse_weather(weather_data)
+    return result.render() if result is not None else str(weather_data)
+
+def weather_lookup(query: str):
+    """Current weather from the search answer box, or None when there is none"""
+    try:
+        return get_weather(query, get_serpapi().results)
+    except NoWeatherResult:
+        return None
+
+def new_conversation(k=3, verbose=False):
+    """Create a ConversationChain with its own windowed memory"""
+    from langchain.chains import ConversationChain
+    from langchain.memory import ConversationBufferWindowMemory
+    return ConversationChain(llm=get_llm(), memory=ConversationBufferWindowMemory(k=k), verbose=verbose)
+
+@lru_cache(maxsize=None)
+def get_conversation():
+    """Create conversation chain with LangChain memory (last 3 conversations)"""
+    return new_conversation(k=3, verbose=True)
+
+_LAZY_ATTRIBUTES = {
+    "llm": get_llm,
+    "wikipedia": get_wikipedia,
+    "serpapi": get_serpapi,
+    "conversation": get_conversation,
+    "memory": lambda: get_conversation().memory,
+}
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def ask_question(question, conversation=None):
     """Ask a question using LangChain memory"""
+    conversation = conversation or get_conversation()
     return conversation.predict(input=question)
 
+# intent -> (scheduler provider, tool factory); provider is None for local tools
+TOOLS = {
+    "weather": (None, lambda: weather_lookup),  # scheduled and cached per location in weather.py
+    "search": ("serpapi", lambda: get_serpapi().run),
+    "wiki": ("wikipedia", lambda: get_wikipedia().run),
+    "calc": (None, lambda: calculator),
+}
+
+def plan_tool_calls(question, context=""):
+    """Route each part of a question to a tool or to the LLM
+
+    Returns the router's routes in question order; "chat" routes go straight
+    to the LLM. `context` (earlier questions) resolves references like
+    "there". Tool lookups do not touch memory, so they can run ahead of time.
+    """
+    return route(question, context)
+
+def run_route(r):
+    """Run one route's tool lookup, returning None for chat routes or when it fails"""
+    if r.intent not in TOOLS:
+        return None
+    provider, tool = TOOLS[r.intent]
+    try:
+        if provider is None:
+            return tool()(r.query)
+        return get_scheduler().call(provider, tool(), r.query)
+    except Exception as e:
+        print(f"Tool lookup failed for {r.text!r}: {e}")
+        return None
+
+def run_tool_calls(question, context=""):
+    """[(route, result)] for every part of the question, lookups one after another"""
+    return [(r, run_route(r)) for r in plan_tool_calls(question, context)]
+
+def tool_answer(r, result):
+    """Answer text for a route from its tool result, or None if the LLM should answer instead"""
+    from passage_ranker import top_passages
+    
+    if result is None:
+        return None
+    if r.intent == "weather":
+        # Rendered from a template; no weather box means the LLM answers instead
+        return result.render() if isinstance(result, WeatherResult) else None
+    if r.intent == "calc":
+        if result == "Invalid expression":
+            return None
+        return f"{r.query} = {result}."
+    # Wikipedia or search results, trimmed to the passages most relevant to the question
+    return top_passages(r.text, str(result), max_chars=200)
+
+def answer_question(question, routed, conversation=None):
+    """Turn tool results into an answer and record it in the conversation memory
+
+    `routed` is the [(route, result)] list from run_tool_calls. Parts no tool
+    could answer go to the LLM together; tool answers are appended in order.
+    """
+    conversation = conversation or get_conversation()
+    memory = conversation.memory
+    
+    llm_parts, tool_parts = [], []
+    for r, result in routed:
+        answer = tool_answer(r, result)
+        if answer is None:
+            llm_parts.append(r.text)
+        else:
+            tool_parts.append((r.text, answer))
+    
+    if not tool_parts:
+        return ask_question(question, conversation)
+    
+    tool_text = " ".join(answer for _, answer in tool_parts)
+    if not llm_parts:
+        memory.save_context({"input": question}, {"output": tool_text})
+        return tool_text
+    
+    # The LLM records its own part of the exchange; the tool answers are saved alongside
+    llm_answer = ask_question(" ".join(llm_parts), conversation)
+    memory.save_context({"input": " ".join(text for text, _ in tool_parts)}, {"output": tool_text})
+    return f"{llm_answer} {tool_text}"
+
+def print_answer(question, answer):
+    """Print a question and its answer, handling Unicode encoding issues"""
+    print(f"\nQ: {question}")
+    try:
+        print(f"A: {answer}")
+    except UnicodeEncodeError:
+        print(f"A: {answer.encode('ascii', 'ignore').decode('ascii')}")
+
+def run_sequential(questions, conversation=None):
+    """Baseline: every tool lookup and LLM call one after another"""
+    answers = []
+    for i, question in enumerate(questions):
+        answer = answer_question(question, run_tool_calls(question, " ".join(questions[:i])), conversation)
+        print_answer(question, answer)
+        answers.append(answer)
+    return answers
+
+async def run_pipeline(questions, conversation=None, max_concurrency=4):
+    """Answer questions with tool lookups fanned out concurrently
+
+    Every tool lookup starts straight away (at most `max_concurrency` at a
+    time), while the steps that read or write memory run one at a time in
+    question order, so the conversation sees the same history as before.
+    """
+    conversation = conversation or get_conversation()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def fetch(r):
+        async with semaphore:
+            return r, await asyncio.to_thread(run_route, r)
+    
+    async def lookup(i, question):
+        # Multi-part questions fan out to one lookup per part
+        routes = plan_tool_calls(question, " ".join(questions[:i]))
+        return await asyncio.gather(*(fetch(r) for r in routes))
+    
+    lookups = [asyncio.create_task(lookup(i, question)) for i, question in enumerate(questions)]
+    answers = []
+    for question, lookup in zip(questions, lookups):
+        routed = await lookup
+        answer = await asyncio.to_thread(answer_question, question, routed, conversation)
+        print_answer(question, answer)
+        answers.append(answer)
+    return answers
+
+async def run_conversations(conversations, max_concurrency=4):
+    """Run several independent conversations at once
+
+    `conversations` maps a ConversationChain to its list of questions.
+    """
+    return await asyncio.gather(*(
+        run_pipeline(questions, conversation, max_concurrency)
+        for conversation, questions in conversations.items()
+    ))
+
+def compare_with_sequential(questions, max_concurrency=4):
+    """Report pipeline wall-clock time against the sequential baseline"""
+    start = time.perf_counter()
+    run_sequential(questions, new_conversation())
+    sequential = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    asyncio.run(run_pipeline(questions, new_conversation(), max_concurrency))
+    pipelined = time.perf_counter() - start
+    
+    print("\n" + "="*50)
+    print("TIMING REPORT:")
+    print(f"Sequential: {sequential:.2f}s")
+    print(f"Pipeline:   {pipelined:.2f}s (max_concurrency={max_concurrency})")
+    print(f"Speedup:    {sequential / pipelined:.2f}x")
+    return sequential, pipelined
+
+def show_memory_buffer(memory=None):
+    """Display LangChain memory buffer"""
+    memory = memory or get_conversation().memory
+    print("\n" + "="*50)
+    print("LANGCHAIN MEMORY BUFFER:")
+    try:
+        print(memory.buffer)
+    except UnicodeEncodeError:
+        safe_buffer = str(memory.buffer).encode('ascii', 'ignore').decode('ascii')
+        print(safe_buffer)
+
+# Function to use SerpAPI for any search query
+def search_web(query: str) -> str:
+    """Search the web using SerpAPI"""
+    return get_scheduler().call("serpapi", get_serpapi().run, query)
+
 # Handle multiple queries with memory
 questions = [
     "What is the capital of France? Also, what is 15 multiplied by 12?",
@@ -73,61 +274,14 @@ questions = [
     "Tell me about the Eiffel Tower"
 ]
 
-for question in questions:
-    print(f"\nQ: {question}")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Combined multi-agent demo")
+    parser.add_argument("--concurrency", type=int, default=4, help="max concurrent tool lookups")
+    parser.add_argument("--compare", action="store_true", help="time the pipeline against the sequential loop")
+    args = parser.parse_args()
     
-    if "weather" in question.lower():
-        # Get SerpAPI search results for weather
-        search_result = serpapi.run("current weather in Paris France")
-        try:
-            if isinstance(search_result, str):
-                weather_dict = ast.literal_eval(search_result)
-            else:
-                weather_dict = search_result
-                
-            if weather_dict.get('type') == 'weather_result':
-                weather_text = f"Weather in {weather_dict.get('location', 'Unknown')}: {weather_dict.get('weather', 'N/A')} at {weather_dict.get('temperature', 'N/A')}°{weather_dict.get('unit', 'F')[0]}. Humidity: {weather_dict.get('humidity', 'N/A')}, Wind: {weather_dict.get('wind', 'N/A')}, Precipitation: {weather_dict.get('precipitation', 'N/A')} ({weather_dict.get('date', 'N/A')})"
-                memory.save_context({"input": question}, {"output": weather_text})
-                print(f"A: {weather_text}")
-            else:
-                result = ask_question(question)
-                print(f"A: {result}")
-        except:
-            result = ask_question(question)
-            print(f"A: {result}")
-    elif "multiplied" in question.lower() or "*" in question or "calculate" in question.lower():
-        # Handle calculation
-        calc_result = calculator("15 * 12")
-        answer = f"The capital of France is Paris. 15 multiplied by 12 equals {calc_result}."
-        memory.save_context({"input": question}, {"output": answer})
-        print(f"A: {answer}")
-    elif "eiffel tower" in question.lower():
-        # Get Wikipedia info
-        tower_info = wikipedia.run("Eiffel Tower Paris")
-        # Handle Unicode encoding issues
-        try:
-            short_info = tower_info[:200] + "..."
-            memory.save_context({"input": question}, {"output": short_info})
-            print(f"A: {short_info}")
-        except UnicodeEncodeError:
-            safe_info = tower_info.encode('ascii', 'ignore').decode('ascii')[:200] + "..."
-            memory.save_context({"input": question}, {"output": safe_info})
-            print(f"A: {safe_info}")
+    if args.compare:
+        compare_with_sequential(questions, args.concurrency)
     else:
-        result = ask_question(question)
-        print(f"A: {result}")
-
-# Display LangChain memory buffer
-print("\n" + "="*50)
-print("LANGCHAIN MEMORY BUFFER:")
-try:
-    print(memory.buffer)
-except UnicodeEncodeError:
-    safe_buffer = str(memory.buffer).encode('ascii', 'ignore').decode('ascii')
-    print(safe_buffer)
-
-# Function to use SerpAPI for any search query
-def search_web(query: str) -> str:
-    """Search the web using SerpAPI"""
-    return serpapi.run(query)
-
+        asyncio.run(run_pipeline(questions, max_concurrency=args.concurrency))
+        show_memory_buffer()
@@ -1,43 +1,207 @@
 import os
-from dotenv import load_dotenv
-from langchain_openai import OpenAI
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Test if API key is loaded
-api_key = os.getenv("OPENAI_API_KEY")
-
-llm = OpenAI(temperature=0.7, openai_api_key=api_key)
-
-# Create a prompt template
-prompt1 = PromptTemplate(
-    input_variables=["cuisine"],
-    template="Suggest one creative name for a restaurant that serves {cuisine} cuisine. Return only the name."
-)
-
-# list of menu items
-prompt2 = PromptTemplate(
-    input_variables=["restaurant_name"],
-    template="Suggest 10 menu items for a restaurant named: {restaurant_name}."
-)
-
-# Create sequential chain that preserves restaurant name
-chain = (
-    RunnablePassthrough.assign(
-        restaurant_name=prompt1 | llm | StrOutputParser() | (lambda x: x.strip())
+from functools import lru_cache
+from clients import load_env, pooled_client_kwargs
+from streaming import MenuItemParser, astream_llm
+
+# "two_step" asks for the name, then the menu; "structured" gets both as JSON in one call
+CHAIN_MODES = ("two_step", "structured")
+
+def default_mode():
+    load_env()
+    mode = os.getenv("CHAIN_MODE", "two_step")
+    if mode not in CHAIN_MODES:
+        raise ValueError(f"CHAIN_MODE must be one of {CHAIN_MODES}, got {mode!r}")
+    return mode
+
+# LangChain objects are built on first use so importing this module stays fast
+
+@lru_cache(maxsize=None)
+def get_llm():
+    """Completion model used by both steps of the chain"""
+    from langchain_openai import OpenAI
+    from response_cache import get_response_cache
+    
+    # Load environment variables from .env file
+    load_env()
+    api_key = os.getenv("OPENAI_API_KEY")
+    
+    # Repeated prompts are served from the response cache instead of the API
+    return OpenAI(temperature=0.7, openai_api_key=api_key, cache=get_response_cache(), **pooled_client_kwargs())
+
+@lru_cache(maxsize=None)
+def get_prompts():
+    """Prompt templates for the restaurant name and its menu"""
+    from langchain_core.prompts import PromptTemplate
+    
+    # Create a prompt template
+    prompt1 = PromptTemplate(
+        input_variables=["cuisine"],
+        template="Suggest one creative name for a restaurant that serves {cuisine} cuisine. Return only the name."
     )
-    | RunnablePassthrough.assign(
-        menu_items=lambda x: (prompt2 | llm).invoke({"restaurant_name": x["restaurant_name"]})
+    
+    # list of menu items
+    prompt2 = PromptTemplate(
+        input_variables=["restaurant_name"],
+        template="Suggest 10 menu items for a restaurant named: {restaurant_name}."
     )
-)
+    return prompt1, prompt2
 
-# Run the chain
-response = chain.invoke({"cuisine": "bengali"})
-print(f"Restaurant Name: {response['restaurant_name']}")
-print(f"\nMenu Items:\n{response['menu_items']}")
+@lru_cache(maxsize=None)
+def get_structured_prompts():
+    """Prompt templates for the single-call mode and its repair retry"""
+    from langchain_core.prompts import PromptTemplate
+    from restaurant_plan import FORMAT_INSTRUCTIONS
+    
+    plan_prompt = PromptTemplate(
+        input_variables=["cuisine"],
+        partial_variables={"format_instructions": FORMAT_INSTRUCTIONS},
+        template=(
+            "Suggest one creative name for a restaurant that serves {cuisine} cuisine "
+            "and 10 menu items for it.\n{format_instructions}"
+        )
+    )
+    
+    # Shown the rejected output and why it was rejected
+    fix_prompt = PromptTemplate(
+        input_variables=["output", "error"],
+        partial_variables={"format_instructions": FORMAT_INSTRUCTIONS},
+        template=(
+            "This response was rejected: {error}\n\nResponse:\n{output}\n\n"
+            "Rewrite it so it is valid. {format_instructions}"
+        )
+    )
+    return plan_prompt, fix_prompt
+
+def _build_name_chain(llm):
+    from langchain_core.output_parsers import StrOutputParser
+    prompt1, _ = get_prompts()
+    return prompt1 | llm | StrOutputParser() | (lambda x: x.strip())
+
+@lru_cache(maxsize=None)
+def get_name_chain():
+    """Restaurant name step, shared by the chain and the streaming path"""
+    return _build_name_chain(get_llm())
 
+def build_chain(mode=None, llm=None, max_retries=1):
+    """Build the restaurant chain for `mode` (see CHAIN_MODES)
 
+    Both modes take {"cuisine"} and return it with "restaurant_name" and
+    "menu_items" added; the structured mode's menu_items is a list.
+    """
+    mode = mode or default_mode()
+    if mode not in CHAIN_MODES:
+        raise ValueError(f"mode must be one of {CHAIN_MODES}, got {mode!r}")
+    llm = llm if llm is not None else get_llm()
+    if mode == "structured":
+        return _build_structured_chain(llm, max_retries).with_config(run_name="restaurant_chain.structured")
+    
+    from langchain_core.runnables import RunnablePassthrough
+    _, prompt2 = get_prompts()
+    
+    # Sequential chain that preserves the restaurant name
+    return (
+        RunnablePassthrough.assign(
+            restaurant_name=_build_name_chain(llm)
+        )
+        | RunnablePassthrough.assign(
+            menu_items=prompt2 | llm
+        )
+    ).with_config(run_name="restaurant_chain.two_step")
+
+def _build_structured_chain(llm, max_retries):
+    from langchain_core.exceptions import OutputParserException
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.runnables import RunnableLambda
+    from restaurant_plan import parse_plan
+    
+    plan_prompt, fix_prompt = get_structured_prompts()
+    generate = plan_prompt | llm | StrOutputParser()
+    fix = fix_prompt | llm | StrOutputParser()
+    
+    # parse_plan repairs what it can locally; only hopeless output costs another call
+    def plan(inputs):
+        text = generate.invoke(inputs)
+        for attempt in range(max_retries + 1):
+            try:
+                return {**inputs, **parse_plan(text).model_dump()}
+            except OutputParserException as e:
+                if attempt == max_retries:
+                    raise
+                text = fix.invoke({"output": text, "error": str(e)})
+    
+    async def aplan(inputs):
+        text = await generate.ainvoke(inputs)
+        for attempt in range(max_retries + 1):
+            try:
+                return {**inputs, **parse_plan(text).model_dump()}
+            except OutputParserException as e:
+                if attempt == max_retries:
+                    raise
+                text = await fix.ainvoke({"output": text, "error": str(e)})
+    
+    return RunnableLambda(plan, afunc=aplan, name="structured_restaurant")
+
+@lru_cache(maxsize=None)
+def get_chain(mode=None):
+    """Shared chain for `mode`, defaulting to CHAIN_MODE"""
+    return build_chain(mode)
+
+def menu_item_list(menu_items):
+    """Menu items as a list, whichever mode produced them"""
+    if isinstance(menu_items, str):
+        parser = MenuItemParser()
+        return parser.feed(menu_items) + parser.close()
+    return list(menu_items)
+
+_LAZY_ATTRIBUTES = {
+    "llm": get_llm,
+    "prompt1": lambda: get_prompts()[0],
+    "prompt2": lambda: get_prompts()[1],
+    "name_chain": get_name_chain,
+    "chain": get_chain,
+}
+
+def __getattr__(name):
+    # Keeps `from app import chain` working without building anything at import
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+async def astream_restaurant(cuisine, mode=None):
+    """Stream the restaurant name first, then menu items one at a time
+
+    Yields ("restaurant_name", name) followed by ("menu_item", item) pairs.
+    The structured mode yields everything at once when its single call returns.
+    """
+    if (mode or default_mode()) == "structured":
+        response = await get_chain("structured").ainvoke({"cuisine": cuisine})
+        yield "restaurant_name", response["restaurant_name"]
+        for item in response["menu_items"]:
+            yield "menu_item", item
+        return
+    
+    restaurant_name = await get_name_chain().ainvoke({"cuisine": cuisine})
+    yield "restaurant_name", restaurant_name
+    
+    parser = MenuItemParser()
+    _, prompt2 = get_prompts()
+    prompt_value = await prompt2.ainvoke({"restaurant_name": restaurant_name})
+    async for text in astream_llm(get_llm(), prompt_value):
+        for item in parser.feed(text):
+            yield "menu_item", item
+    for item in parser.close():
+        yield "menu_item", item
+
+# Run the chain
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Suggest a restaurant name and menu")
+    parser.add_argument("cuisine", nargs="?", default="bengali")
+    parser.add_argument("--mode", choices=CHAIN_MODES, help="defaults to CHAIN_MODE or two_step")
+    args = parser.parse_args()
+    
+    response = get_chain(args.mode).invoke({"cuisine": args.cuisine})
+    print(f"Restaurant Name: {response['restaurant_name']}")
+    print("\nMenu Items:")
+    for item in menu_item_list(response["menu_items"]):
+        print(f"- {item}")
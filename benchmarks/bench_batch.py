@@ -0,0 +1,71 @@
+"""
+Throughput benchmark for restaurant_suggester batch generation
+Runs against a fake local LLM, so no API key or network is needed
+
+    python benchmarks/bench_batch.py --items 200 --latency 0.05
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+
+from fake_llm import FakeChatModel
+import restaurant_suggester as rs
+
+CUISINES = ["Italian", "Japanese", "Mexican", "French", "Indian", "Thai", "Bengali", "Greek"]
+ATMOSPHERES = ["romantic", "modern", "casual", "upscale", "family-friendly", "trendy"]
+
+
+def make_pairs(n):
+    return [(CUISINES[i % len(CUISINES)], ATMOSPHERES[i % len(ATMOSPHERES)]) for i in range(n)]
+
+
+def report(label, n, elapsed, results=None):
+    failed = sum(1 for r in results if r["error"]) if results else 0
+    print(f"{label:<28} {elapsed:8.3f}s {n / elapsed:10.1f} items/s   failed={failed}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake LLM latency per call (s)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--timeout", type=float, default=5.0, help="per-item timeout (s)")
+    parser.add_argument("--fail-every", type=int, default=0, help="make every Nth call fail")
+    args = parser.parse_args()
+
+    pairs = make_pairs(args.items)
+    print(f"{args.items} items, fake latency {args.latency * 1000:.0f}ms per call")
+    print("-" * 70)
+
+    # Sequential baseline: one blocking invoke per pair
+    fake = FakeChatModel(latency=args.latency)
+    chain = rs.prompt_template | fake
+    start = time.perf_counter()
+    for cuisine, atmosphere in pairs:
+        chain.invoke({"cuisine_type": cuisine, "atmosphere": atmosphere})
+    report("sequential invoke", args.items, time.perf_counter() - start)
+
+    for concurrency in args.concurrency:
+        fake = FakeChatModel(latency=args.latency, fail_every=args.fail_every)
+        chain = rs.prompt_template | fake
+        start = time.perf_counter()
+        results = rs.suggest_restaurant_names_batch(
+            pairs, max_concurrency=concurrency, timeout=args.timeout, runnable=chain
+        )
+        report(f"batch (concurrency={concurrency})", args.items, time.perf_counter() - start, results)
+
+    # Per-item timeouts: a deadline shorter than the fake latency fails every item
+    fake = FakeChatModel(latency=args.latency)
+    results = rs.suggest_restaurant_names_batch(
+        pairs[:8], max_concurrency=8, timeout=args.latency / 2, runnable=rs.prompt_template | fake
+    )
+    print(f"\ntimeout check: {sum(1 for r in results if r['error'])}/8 items timed out ({results[0]['error']})")
+
+
+if __name__ == "__main__":
+    main()
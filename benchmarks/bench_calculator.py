@@ -0,0 +1,86 @@
+"""
+Calculator latency on expressions and natural-language questions, and how
+quickly hostile inputs that would hang or exploit eval() are rejected, and
+that overflowing or complex results are rejected rather than crashing
+
+    python benchmarks/bench_calculator.py --rounds 2000
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calculator import CalculatorError, evaluate, format_number, solve
+
+EXPRESSIONS = ["15 * 12", "0.1 + 0.2", "1/3 + 1/6", "2^10", "80 + 10%", "sqrt(144) + 5!", "(3 + 4) * 2 / 7"]
+QUESTIONS = [
+    "What is 15 multiplied by 12?",
+    "How much is 20% of 80?",
+    "What's the square root of 144?",
+    "What is 1200 minus 450?",
+    "What is 3 to the power of 4?",
+]
+HOSTILE = [
+    "9**9**9**9",
+    "2**10000000",
+    "factorial(100000)",
+    "10**10**10",
+    "__import__('os').system('echo hi')",
+    "(1).__class__.__bases__",
+    "[x for x in range(10**9)]",
+    "'a' * 10**9",
+    "+".join(["1"] * 1000),
+]
+# Valid syntax whose value overflows a float, is complex, or is too long to print in full
+EDGE = ["pi ** 1000", "e**1000", "(-8)**(1/3)", "1e400", "0 ** -0.5", "pi * 2**2000", "(2**9999)**10", "2**5000 / 3"]
+
+
+def timed(fn, arg, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(arg)
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'expression':<36} {'result':>18} {'time':>10}")
+    for expression in EXPRESSIONS:
+        seconds = timed(evaluate, expression, args.rounds)
+        print(f"{expression:<36} {format_number(evaluate(expression)):>18} {seconds * 1e6:8.1f}us")
+
+    print(f"\n{'question':<36} {'expression':>18} {'time':>10}")
+    for question in QUESTIONS:
+        seconds = timed(solve, question, args.rounds)
+        expression, value = solve(question)
+        print(f"{question:<36} {expression:>18} {seconds * 1e6:8.1f}us  = {format_number(value)}")
+
+    print(f"\n{'hostile input':<36} {'rejected in':>12}  reason")
+    for expression in HOSTILE:
+        start = time.perf_counter()
+        try:
+            evaluate(expression)
+            reason = "NOT REJECTED"
+        except CalculatorError as e:
+            reason = str(e)
+        print(f"{expression[:36]:<36} {(time.perf_counter() - start) * 1e3:10.2f}ms  {reason[:50]}")
+
+    print(f"\n{'edge case':<36} {'result':>18}")
+    for expression in EDGE:
+        try:
+            result = format_number(evaluate(expression))
+        except CalculatorError as e:
+            result = f"rejected: {e}"
+        except Exception as e:
+            result = f"CRASHED: {type(e).__name__}"
+        print(f"{expression:<36} {result:>18}")
+
+
+if __name__ == "__main__":
+    main()
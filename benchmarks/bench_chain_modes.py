@@ -0,0 +1,86 @@
+"""
+Compare app.py's two-step chain with the single-call structured mode
+Runs against a fake local LLM, so no API key or network is needed
+
+    python benchmarks/bench_chain_modes.py --requests 20 --latency 0.3
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+
+from fake_llm import FakeChatModel
+import app
+
+MENU = ["Shorshe Ilish", "Kosha Mangsho", "Aloo Posto", "Cholar Dal", "Luchi", "Mishti Doi",
+        "Chingri Malai Curry", "Begun Bhaja", "Rosogolla", "Sandesh"]
+JSON_PLAN = '{"restaurant_name": "Spice Route", "menu_items": [%s]}' % ", ".join(f'"{item}"' for item in MENU)
+
+TWO_STEP_RESPONSES = ["Spice Route", "\n".join(f"{i}. {item}" for i, item in enumerate(MENU, 1))]
+
+# Well-formed JSON plus the usual ways it goes wrong
+STRUCTURED_RESPONSES = {
+    "valid": [JSON_PLAN],
+    "fenced": ["Here you go:\n```json\n" + JSON_PLAN + "\n```"],
+    "trailing comma": [JSON_PLAN.replace('"]}', '",]}')],
+    "truncated": [JSON_PLAN[:-30]],
+    "prose (needs retry)": ["Spice Route would be a lovely name!", JSON_PLAN],
+}
+
+
+def run(chain, requests):
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        chain.invoke({"cuisine": "bengali"})
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run_concurrent(chain, requests):
+    start = time.perf_counter()
+    await asyncio.gather(*(chain.ainvoke({"cuisine": "bengali"}) for _ in range(requests)))
+    return time.perf_counter() - start
+
+
+def report(label, latencies, calls, requests):
+    print(f"{label:<32} p50 {statistics.median(latencies) * 1000:8.1f}ms   "
+          f"LLM calls/request {calls / requests:4.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake LLM latency per call (s)")
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests, fake latency {args.latency * 1000:.0f}ms per call")
+    print("-" * 70)
+
+    fake = FakeChatModel(responses=TWO_STEP_RESPONSES, latency=args.latency)
+    report("two_step", run(app.build_chain("two_step", fake), args.requests), fake.calls, args.requests)
+
+    for label, responses in STRUCTURED_RESPONSES.items():
+        fake = FakeChatModel(responses=responses, latency=args.latency)
+        chain = app.build_chain("structured", fake)
+        latencies = run(chain, args.requests)
+        report(f"structured: {label}", latencies, fake.calls, args.requests)
+
+    print("-" * 70)
+    for mode, responses in (("two_step", TWO_STEP_RESPONSES), ("structured", [JSON_PLAN])):
+        chain = app.build_chain(mode, FakeChatModel(responses=responses, latency=args.latency))
+        elapsed = asyncio.run(run_concurrent(chain, args.requests))
+        print(f"{mode + ' (concurrent)':<32} {elapsed:8.3f}s total")
+
+    plan = app.build_chain("structured", FakeChatModel(responses=[JSON_PLAN], latency=0)).invoke({"cuisine": "bengali"})
+    print(f"\nstructured result: {plan['restaurant_name']!r}, {len(plan['menu_items'])} menu items as a {type(plan['menu_items']).__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Overhead of instrumentation on the restaurant chain
+Runs against a fake local LLM with no latency, so the cost of tracing dominates
+
+    python benchmarks/bench_instrumentation.py --calls 500
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+os.environ["INSTRUMENTATION"] = "0"
+
+from fake_llm import FakeChatModel
+import app
+import instrumentation
+
+
+def run(calls):
+    chain = app.build_chain("two_step", FakeChatModel(responses=["Spice Route", "Luchi, Dal, Rice"], latency=0))
+    start = time.perf_counter()
+    for _ in range(calls):
+        chain.invoke({"cuisine": "bengali"})
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+
+    run(20)  # warm up imports and caches
+    off = run(args.calls)
+    trace_path = os.path.join(tempfile.mkdtemp(), "traces.jsonl")
+    instrumentation.enable(trace_path)
+    on = run(args.calls)
+
+    spans = sum(1 for _ in open(trace_path, encoding="utf-8"))
+    print(f"instrumentation off  {off * 1000:8.3f}ms per chain call")
+    print(f"instrumentation on   {on * 1000:8.3f}ms per chain call  (+{(on - off) * 1e6:.0f}us, {spans // args.calls} spans per call)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Durable memory log: append cost, reload time for a session's last turns as
+the log grows (it should stay flat), append latency while compaction runs,
+and several processes writing to one log file at once
+
+    python benchmarks/bench_memory_log.py --sizes 10000 100000 300000
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+
+from memory_log import MemoryLog
+
+SESSIONS = 1000
+TURN = ("What did I say my favourite cuisine was?", "You said it was Thai, especially green curry.")
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def growth(path, sizes, k):
+    from memory_agent import SessionMemoryStore
+    log = MemoryLog(path, compact_interval=0, keep_turns=10 ** 9)
+    # One long-running session next to many short ones
+    print(f"{'log turns':>10} {'append':>9} {'reload k=' + str(k):>12} {'reload long session':>20} {'restart + context':>18}")
+    written = 0
+    for size in sizes:
+        start = time.perf_counter()
+        for i in range(written, size):
+            log.append("long" if i % 10 == 0 else f"s{i % SESSIONS}", *TURN)
+        append_us = (time.perf_counter() - start) / max(1, size - written) * 1e6
+        written = size
+
+        reload_short = _timed(lambda: log.load("s1", k, k), 500)
+        reload_long = _timed(lambda: log.load("long", k, k), 500)
+        restart = _timed(lambda: SessionMemoryStore(k=k, log=log).get_context("long"), 200)
+        print(f"{size:>10} {append_us:>7.1f}us {reload_short * 1e6:>10.1f}us {reload_long * 1e6:>18.1f}us "
+              f"{restart * 1e6:>16.1f}us")
+    log.close()
+
+
+def _timed(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds
+
+
+def compaction(path, keep):
+    log = MemoryLog(path, compact_interval=0, keep_turns=keep)
+    before = log.stats()["turns"]
+    latencies = []
+    done = threading.Event()
+
+    def compact():
+        log.compact()
+        done.set()
+
+    start = time.perf_counter()
+    threading.Thread(target=compact).start()
+    while not done.is_set():
+        t = time.perf_counter()
+        log.append("live", *TURN)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    after = log.stats()["turns"]
+    print(f"\ncompaction to {keep} turns/session: {before} -> {after} turns in {elapsed:.2f}s; "
+          f"{len(latencies)} appends meanwhile, p50 {percentile(latencies, 0.5) * 1e3:.2f}ms "
+          f"p99 {percentile(latencies, 0.99) * 1e3:.2f}ms max {max(latencies) * 1e3:.1f}ms")
+    log.close()
+
+
+def _writer(path, worker, turns):
+    log = MemoryLog(path, compact_interval=0)
+    for i in range(turns):
+        log.append("shared", f"worker {worker} turn {i}", "ok")
+        log.append(f"worker-{worker}", f"turn {i}", "ok")
+
+
+def processes(path, workers, turns):
+    start = time.perf_counter()
+    pool = [multiprocessing.Process(target=_writer, args=(path, w, turns)) for w in range(workers)]
+    for p in pool:
+        p.start()
+    for p in pool:
+        p.join()
+    elapsed = time.perf_counter() - start
+    log = MemoryLog(path, compact_interval=0)
+    seqs = [row[0] for row in log._conn.execute("SELECT seq FROM turns WHERE session = 'shared' ORDER BY seq")]
+    assert seqs == list(range(1, workers * turns + 1)), "shared session lost or duplicated turns"
+    print(f"\n{workers} processes x {2 * turns} appends: {workers * 2 * turns / elapsed:.0f} appends/s, "
+          f"shared session has {len(seqs)} turns numbered 1..{seqs[-1]} with no gaps")
+    log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 300000])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--keep", type=int, default=20, help="turns per session kept by compaction")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "memory.sqlite")
+        growth(path, args.sizes, args.k)
+        compaction(path, args.keep)
+        processes(os.path.join(directory, "shared.sqlite"), args.workers, 500)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Name index cost and savings: add/lookup speed and bytes per name at scale,
+and LLM calls and output tokens spent getting 5 new names per request when
+the model keeps repeating itself, comparing a full regeneration with asking
+for the missing number scaled by the index's acceptance rate
+
+    python benchmarks/bench_name_index.py --names 200000 --requests 200
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tracemalloc
+from typing import Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+
+from fake_llm import FakeChatModel
+
+SYLLABLES = ("ba be bi bo ka ke ki ko la le li lo ma me mi mo na ne ni no ra re ri ro "
+             "sa se si so ta te ti to va ve vi vo za zo ch sh th").split()
+FIRST = ["Golden", "Ember", "Saffron", "Little", "Harbor", "Velvet", "Copper", "Wild",
+         "Rustic", "Silver", "Crimson", "Hidden", "Smoky", "Lucky", "Royal", "Urban",
+         "Amber", "Cedar", "Coral", "Honey", "Indigo", "Juniper", "Maple", "Marble",
+         "Midnight", "Scarlet", "Sunny", "Twisted", "Whispering", "Blue", "Green", "Olde"]
+SECOND = ["Fork", "Oak", "Table", "Lane", "Olive", "Lantern", "Garden", "Spoon",
+          "Basil", "Fig", "Thyme", "Ladle", "Hearth", "Vine", "Pepper", "Kettle",
+          "Anchor", "Barrel", "Candle", "Cellar", "Clove", "Compass", "Crane", "Dragon",
+          "Falcon", "Feather", "Harvest", "Lotus", "Orchard", "Pantry", "Quill", "Saddle"]
+POOL = [f"{first} {second}" for first in FIRST for second in SECOND]
+# A few names come up far more often than the rest, as at temperature 0.7
+POPULARITY = [1 / (rank + 1) for rank in range(len(POOL))]
+VARIANTS = ["{}", "The {}", "{}s", "{} & Co"]
+
+
+def random_names(count, seed=1):
+    rng = random.Random(seed)
+    word = lambda: "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+    return [f"{word()} {word()}" for _ in range(count)]
+
+
+class RepetitiveModel(FakeChatModel):
+    """Answers "Generate N ..." with N names from a fixed pool, in varied spellings
+
+    Like a real model, it mostly avoids names the prompt lists as taken.
+    """
+
+    seed: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        self.calls += 1
+        prompt = str(messages[-1].content)
+        count = int(re.search(r"Generate (\d+)", prompt).group(1))
+        taken = prompt.split("already taken", 1)[1] if "already taken" in prompt else ""
+        rng = random.Random(self.seed * 7919 + self.calls)
+        names = []
+        while len(names) < count:
+            name = rng.choice(VARIANTS).format(rng.choices(POOL, POPULARITY)[0])
+            if name not in taken or rng.random() < 0.1:
+                names.append(name)
+        text = "\n".join(f"{i}. {name}" for i, name in enumerate(names, 1))
+        result = self._result(messages, text)
+        usage = result.generations[0].message.usage_metadata
+        self.input_tokens += usage["input_tokens"]
+        self.output_tokens += usage["output_tokens"]
+        await asyncio.sleep(self.latency)
+        return result
+
+
+def scale(count):
+    from name_index import NameIndex
+    names = random_names(count)
+    index = NameIndex()
+    start = time.perf_counter()
+    for name in names:
+        index.add(name)
+    add_us = (time.perf_counter() - start) / count * 1e6
+
+    probes = random_names(20000, seed=2)
+    start = time.perf_counter()
+    duplicates = sum(index.match(name) is not None for name in probes)
+    match_us = (time.perf_counter() - start) / len(probes) * 1e6
+
+    # Measured separately, since tracing allocations slows the adds down several times
+    tracemalloc.start()
+    traced = NameIndex()
+    for name in names:
+        traced.add(name)
+    with traced._lock:
+        traced._merge()
+    index_bytes = tracemalloc.get_traced_memory()[0]
+    del traced
+    tracemalloc.stop()
+    tracemalloc.start()
+    plain = {name.casefold() for name in names}
+    set_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del plain
+
+    print(f"{len(index)} of {count} names indexed   add {add_us:.1f}us   lookup {match_us:.1f}us   "
+          f"{duplicates / len(probes):.1%} of fresh names flagged")
+    print(f"memory {index_bytes / len(index):.0f} B/name (exact + fuzzy)   "
+          f"vs {set_bytes / count:.0f} B/name for a plain set of strings (exact only)")
+
+
+async def regenerate_all(index, rs, cuisine, atmosphere, count=5, max_requests=3):
+    # Baseline: repeat the whole request until enough names are new
+    from name_index import parse_names
+    names = []
+    for _ in range(max_requests):
+        response = await rs.get_chain().ainvoke({"cuisine_type": cuisine, "atmosphere": atmosphere})
+        names += index.add_new(parse_names(response.content), limit=count - len(names))
+        if len(names) >= count:
+            break
+    return names
+
+
+def savings(requests, latency):
+    import restaurant_suggester as rs
+    from name_index import NameIndex
+    from streaming import run_sync
+
+    print(f"\n{'strategy':<22} {'LLM calls':>9} {'in tokens':>9} {'out tokens':>10} {'new names':>9} {'tokens/name':>11}")
+    for label, strategy in (("regenerate 5", lambda index: lambda c, a: regenerate_all(index, rs, c, a)),
+                            ("sized to acceptance", lambda index: lambda c, a: rs.asuggest_unique_restaurant_names(c, a, index=index))):
+        llm = RepetitiveModel(latency=latency, seed=1)
+        rs.get_llm = lambda: llm
+        rs.get_chain.cache_clear()
+        rs.get_more_names_chain.cache_clear()
+        suggest = strategy(NameIndex())
+
+        async def run():
+            total = 0
+            for i in range(requests):
+                total += len(await suggest("Italian", "casual"))
+            return total
+
+        new_names = run_sync(run())
+        per_name = (llm.input_tokens + llm.output_tokens) / max(new_names, 1)
+        print(f"{label:<22} {llm.calls:>9} {llm.input_tokens:>9} {llm.output_tokens:>10} {new_names:>9} {per_name:>11.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--names", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="fake LLM latency (s)")
+    args = parser.parse_args()
+
+    scale(args.names)
+    savings(args.requests, args.latency)
+
+
+if __name__ == "__main__":
+    main()
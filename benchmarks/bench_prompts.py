@@ -0,0 +1,120 @@
+"""
+Prompt size per agent: tokens the old f-string prompts sent against the
+compacted, budgeted prompts, how many leading tokens consecutive prompts
+share, and the time spent building each prompt
+
+    python benchmarks/bench_prompts.py --questions 50
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+os.environ.setdefault("SERPAPI_API_KEY", "fake")
+os.environ["MEMORY_LOG"] = "0"
+
+TOPICS = ["the Eiffel Tower", "Python", "artificial intelligence", "the Moon", "quantum computing", "the Nile"]
+
+
+def serpapi_payload(query):
+    """A full SerpAPI response, with the fields the old prompt pasted in whole"""
+    organic = []
+    for i in range(1, 9):
+        organic.append({
+            "position": i,
+            "title": f"{query} - result {i}",
+            "link": f"https://example{i}.com/{query.replace(' ', '-')}",
+            "redirect_link": f"https://www.google.com/url?q=https://example{i}.com",
+            "displayed_link": f"https://example{i}.com › news",
+            "favicon": f"https://serpapi.com/searches/abc/images/{i}.png",
+            # Aggregators repeat each other's snippets
+            "snippet": f"The latest on {query}: announcement number {i % 3} was covered widely this week. "
+                       f"Missing: today | Show results with: today",
+            "source": f"Example {i}",
+        })
+    return {
+        "search_metadata": {"id": f"{abs(hash(query)):x}", "status": "Success", "json_endpoint": "https://serpapi.com/searches/x.json",
+                            "created_at": "2024-03-12 10:00:00 UTC", "total_time_taken": 1.23},
+        "search_parameters": {"engine": "google", "q": query, "google_domain": "google.com", "device": "desktop"},
+        "knowledge_graph": {"title": query.title(), "type": "Topic", "kgmid": "/m/0abc",
+                            "description": f"{query.capitalize()} is a widely discussed subject.",
+                            "header_images": [{"image": "https://serpapi.com/img.png", "source": "https://example.com"}]},
+        "organic_results": organic,
+        "related_questions": [{"question": f"What is {query}?", "snippet": f"{query.capitalize()} is a widely discussed subject.",
+                               "link": "https://example.com/faq"}],
+    }
+
+
+def wikipedia_text(topic):
+    summary = (f"{topic.capitalize()} is described in many sources. It has a long history. "
+               f"Researchers have studied {topic} for decades and its influence continues today. ")
+    return f"Page: {topic.title()}\nSummary: {summary * 3}\n\nPage: History of {topic}\nSummary: {summary * 2}"
+
+
+def shared_prefix_tokens(prompts):
+    from tokens import count_tokens
+    shared = [count_tokens(os.path.commonprefix([a, b])) for a, b in zip(prompts, prompts[1:])]
+    return sum(shared) / len(shared)
+
+
+def run_agent(label, build, old_prompt, questions):
+    from tokens import count_tokens
+    from prompts import prompt_stats
+    build(questions[0])  # imports and first-use setup are not part of the per-prompt cost
+    prompt_stats.clear()
+    new = []
+    start = time.perf_counter()
+    for question in questions:
+        new.append(build(question))
+    build_us = (time.perf_counter() - start) / len(questions) * 1e6
+    old = [old_prompt(question) for question in questions]
+    stats = prompt_stats.report()[label]
+    old_tokens = sum(count_tokens(p) for p in old) / len(old)
+    new_tokens = stats["prompt_tokens"] / stats["calls"]
+    print(f"{label:<10} {old_tokens:>10.0f} {stats['raw_tokens'] / stats['calls']:>10.0f} "
+          f"{new_tokens:>9.0f} {new_tokens / old_tokens - 1:>+8.0%} "
+          f"{shared_prefix_tokens(old):>11.1f} {shared_prefix_tokens(new):>11.1f} {build_us:>10.0f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, default=50)
+    args = parser.parse_args()
+
+    import serpapi_agent
+    import wikipedia_agent
+    import memory_agent
+    from memory_agent import SessionMemoryStore
+
+    questions = [f"What is new with {TOPICS[i % len(TOPICS)]} (#{i})?" for i in range(args.questions)]
+    print(f"{'agent':<10} {'old f-str':>10} {'raw':>10} {'compacted':>9} {'vs old':>8} "
+          f"{'old prefix':>11} {'new prefix':>11} {'build':>12}")
+
+    serpapi_agent.search_web = lambda q: str(serpapi_payload(q))
+    run_agent("search", serpapi_agent.build_search_prompt,
+              lambda q: f"Based on this web search result: {serpapi_agent.search_web(q)}\n\nAnswer this question: {q}",
+              questions)
+
+    wikipedia_agent.search_wikipedia = lambda q: wikipedia_text(next(topic for topic in TOPICS if topic in q))
+    run_agent("wikipedia", wikipedia_agent.build_wikipedia_prompt,
+              lambda q: f"Based on this Wikipedia information: {wikipedia_agent.search_wikipedia(q)}\n\nAnswer this question: {q}",
+              questions)
+
+    store = SessionMemoryStore(k=5, max_tokens=1000, summarizer=lambda summary, turns: "The human likes Thai food.")
+    for i in range(8):
+        store.save_context("bench", {"input": f"Remember fact number {i}: I like {TOPICS[i % len(TOPICS)]}."},
+                           {"output": f"Got it, you like {TOPICS[i % len(TOPICS)]}."})
+    memory_agent.get_memory_store = lambda: store
+    run_agent("memory", lambda q: memory_agent.build_memory_prompt(q, "bench"),
+              lambda q: f"Previous conversation:\n{store.get_context('bench')}\n\nHuman: {q}\nAI:",
+              questions)
+    print("\nold f-str: tokens the previous prompts sent; raw/compacted: the new layout before and after "
+          "compaction and budgets;\nvs old: change in tokens sent. prefix: average leading tokens shared "
+          "with the previous prompt.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Routing accuracy and latency: the intent router against the old keyword
+checks in agent.py, on a labeled set of single- and multi-intent questions
+
+    python benchmarks/bench_router.py --show-errors
+"""
+
+import os
+import sys
+import time
+import argparse
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from router import INTENTS, route
+
+# (question, intents in clause order)
+LABELED = [
+    ("What's the weather like there?", ["weather"]),
+    ("What's the weather in New York?", ["weather"]),
+    ("Will it rain in London tomorrow?", ["weather"]),
+    ("Is it snowing in Denver right now?", ["weather"]),
+    ("What's the temperature in Tokyo?", ["weather"]),
+    ("Do I need an umbrella in Seattle today?", ["weather"]),
+    ("Weather forecast for Paris this weekend", ["weather"]),
+    ("How humid is it in Miami?", ["weather"]),
+    ("Latest news about artificial intelligence", ["search"]),
+    ("Current stock price of Apple", ["search"]),
+    ("What's the score of the Lakers game tonight?", ["search"]),
+    ("Who won the election in 2024?", ["search"]),
+    ("Search for cheap flights to Rome", ["search"]),
+    ("What are today's top headlines?", ["search"]),
+    ("Bitcoin price right now", ["search"]),
+    ("When is the new iPhone release date?", ["search"]),
+    ("Restaurants open now near me", ["search"]),
+    ("Look up the opening hours of the Louvre", ["search"]),
+    ("Tell me about the Eiffel Tower", ["wiki"]),
+    ("What is machine learning?", ["wiki"]),
+    ("Who was Albert Einstein?", ["wiki"]),
+    ("Explain photosynthesis", ["wiki"]),
+    ("Who invented the telephone?", ["wiki"]),
+    ("History of the Roman Empire", ["wiki"]),
+    ("What are black holes?", ["wiki"]),
+    ("Who painted the Mona Lisa?", ["wiki"]),
+    ("When was the Great Wall of China built?", ["wiki"]),
+    ("Describe the water cycle", ["wiki"]),
+    ("What is quantum computing?", ["wiki"]),
+    ("Give me an overview of the French Revolution", ["wiki"]),
+    ("What is 15 multiplied by 12?", ["calc"]),
+    ("Calculate 3.5 * 8", ["calc"]),
+    ("What's 2^10?", ["calc"]),
+    ("What is 144 divided by 12?", ["calc"]),
+    ("How much is 20% of 80?", ["calc"]),
+    ("What is 7 squared?", ["calc"]),
+    ("(3 + 4) * 2", ["calc"]),
+    ("What's 1200 minus 450?", ["calc"]),
+    ("Compute 17 times 23", ["calc"]),
+    ("What's the square root of 144?", ["calc"]),
+    ("What is the capital of France?", ["chat"]),
+    ("Hi, my name is Sam", ["chat"]),
+    ("Can you recommend a good book?", ["chat"]),
+    ("What did I just ask you?", ["chat"]),
+    ("Thanks, that helps!", ["chat"]),
+    ("Write a haiku about autumn", ["chat"]),
+    ("Should I learn Python or JavaScript first?", ["chat"]),
+    ("Do you remember my name?", ["chat"]),
+    ("Suggest a name for my bakery", ["chat"]),
+    ("How are you today?", ["chat"]),
+    ("Translate good morning into Spanish", ["chat"]),
+    # Harder cases the patterns were not tuned on
+    ("How tall is Mount Everest?", ["wiki"]),
+    ("Who is the CEO of Tesla now?", ["search"]),
+    ("Is it going to be hot in Phoenix this week?", ["weather"]),
+    ("Summarize the plot of Hamlet", ["wiki"]),
+    ("What is the capital of France? Also, what is 15 multiplied by 12?", ["chat", "calc"]),
+    ("What's the weather in Paris and tell me about the Eiffel Tower", ["weather", "wiki"]),
+    ("Who was Marie Curie? Also, what is 6 times 7?", ["wiki", "calc"]),
+    ("What's the latest news on SpaceX? And what's the weather in Houston?", ["search", "weather"]),
+    ("Calculate 12 * 12; also explain the Pythagorean theorem", ["calc", "wiki"]),
+    ("Hi there! What's the weather in Berlin?", ["chat", "weather"]),
+    ("Tell me about Tokyo. What's the temperature there?", ["wiki", "weather"]),
+    ("What is 100 divided by 4 and what is the current price of gold?", ["calc", "search"]),
+]
+
+
+def legacy_intents(question):
+    # The keyword checks agent.py used before the router
+    q = question.lower()
+    if "weather" in q:
+        return ["weather"]
+    if "multiplied" in q or "*" in question or "calculate" in q:
+        return ["calc"]
+    if "eiffel tower" in q:
+        return ["wiki"]
+    return ["chat"]
+
+
+def router_intents(question):
+    return [r.intent for r in route(question)]
+
+
+def evaluate(name, predict, show_errors):
+    exact = 0
+    # Per-intent counts over (expected, predicted) sets, for precision/recall
+    true_pos, predicted, expected = Counter(), Counter(), Counter()
+    errors = []
+    for question, labels in LABELED:
+        guess = predict(question)
+        exact += guess == labels
+        if guess != labels:
+            errors.append((question, labels, guess))
+        for intent in set(labels):
+            expected[intent] += 1
+        for intent in set(guess):
+            predicted[intent] += 1
+            true_pos[intent] += intent in labels
+
+    start = time.perf_counter()
+    rounds = 20
+    for _ in range(rounds):
+        for question, _ in LABELED:
+            predict(question)
+    per_question = (time.perf_counter() - start) / (rounds * len(LABELED))
+
+    print(f"\n{name}: {exact}/{len(LABELED)} exact ({exact / len(LABELED):.0%})   {per_question * 1e6:6.1f}us per question")
+    print(f"  {'intent':<8} {'precision':>9} {'recall':>7}")
+    for intent in INTENTS:
+        precision = true_pos[intent] / predicted[intent] if predicted[intent] else 0.0
+        recall = true_pos[intent] / expected[intent] if expected[intent] else 0.0
+        print(f"  {intent:<8} {precision:>9.0%} {recall:>7.0%}")
+    if show_errors:
+        for question, labels, guess in errors:
+            print(f"  MISS {question!r}: expected {labels}, got {guess}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--show-errors", action="store_true", help="list misrouted questions")
+    args = parser.parse_args()
+
+    multi = sum(len(labels) > 1 for _, labels in LABELED)
+    print(f"{len(LABELED)} labeled questions ({multi} multi-intent)")
+    evaluate("keyword checks", legacy_intents, False)
+    evaluate("intent router", router_intents, args.show_errors)
+
+
+if __name__ == "__main__":
+    main()
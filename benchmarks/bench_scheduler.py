@@ -0,0 +1,90 @@
+"""
+Exercise the shared scheduler against a stub LLM server that answers 429
+above a fixed requests/second limit
+
+    python benchmarks/bench_scheduler.py --calls 200 --server-rps 20
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+
+from stub_llm_server import start_in_thread
+
+
+async def fire(llm, calls, tag):
+    async def one(i):
+        try:
+            await llm.ainvoke(f"{tag} request {i}")
+            return True
+        except Exception:
+            return False
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(calls)))
+    return sum(results), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--server-rps", type=int, default=20, help="stub answers 429 above this rate")
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    base_url, stub = start_in_thread(latency=args.latency, rate_limit=args.server_rps)
+    os.environ["OPENAI_BASE_URL"] = base_url
+
+    from langchain_openai import ChatOpenAI
+    from clients import pooled_client_kwargs
+    from scheduler import BATCH, get_scheduler, priority
+    from streaming import run_sync
+
+    scheduler = get_scheduler()
+    # Stay a little under the server's limit, with a one-second burst
+    scheduler.burst_seconds = 1.0
+    scheduler.configure("openai", rpm=args.server_rps * 60 * 0.9)
+
+    print(f"{args.calls} concurrent calls, server allows {args.server_rps} req/s")
+    print("-" * 70)
+
+    # Baseline: no scheduler, no retries
+    plain = ChatOpenAI(max_retries=0)
+    time.sleep(1.1)
+    before = stub["rate_limited"]
+    ok, elapsed = run_sync(fire(plain, args.calls, "plain"))
+    print(f"{'unscheduled':<22} {ok:4d}/{args.calls} succeeded  {elapsed:6.2f}s   429s from server: {stub['rate_limited'] - before}")
+
+    scheduled = ChatOpenAI(**pooled_client_kwargs())
+    time.sleep(1.1)
+    before = stub["rate_limited"]
+    ok, elapsed = run_sync(fire(scheduled, args.calls, "scheduled"))
+    print(f"{'scheduled':<22} {ok:4d}/{args.calls} succeeded  {elapsed:6.2f}s   429s from server: {stub['rate_limited'] - before}")
+
+    # Priorities: a batch backlog is queued first, interactive calls arrive after
+    scheduler.configure("openai", rpm=args.server_rps * 60 * 0.9)
+
+    async def mixed():
+        async def batch():
+            with priority(BATCH):
+                return await fire(scheduled, args.calls, "batch")
+        backlog = asyncio.create_task(batch())
+        await asyncio.sleep(0.2)
+        interactive = await fire(scheduled, 10, "interactive")
+        return interactive, await backlog
+
+    # All scenarios share one loop, as the pooled async client requires
+    (_, interactive_elapsed), (_, batch_elapsed) = run_sync(mixed())
+    stats = scheduler.stats()["openai"]
+    print(f"{'10 interactive':<22} done in {interactive_elapsed:6.2f}s   avg wait {stats['interactive']['avg_wait'] * 1000:7.1f}ms")
+    print(f"{f'{args.calls} batch':<22} done in {batch_elapsed:6.2f}s   avg wait {stats['batch']['avg_wait'] * 1000:7.1f}ms"
+          f"   max queue depth {stats['batch']['max_queue_depth']}")
+    print("\nscheduler stats:", stats)
+
+
+if __name__ == "__main__":
+    main()
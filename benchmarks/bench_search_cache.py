@@ -0,0 +1,60 @@
+"""
+Exercise serpapi_agent.search_web against the local fake SerpAPI server
+Shows cache hits, request coalescing and stale-while-revalidate
+
+    python benchmarks/bench_search_cache.py
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_serpapi import FakeSerpAPIServer
+
+server = FakeSerpAPIServer(latency=0.2).start()
+os.environ["SERPAPI_BASE_URL"] = server.url
+os.environ["SERPAPI_API_KEY"] = "fake"
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+
+from serpapi_agent import search_web, search_cache
+
+
+def timed(label, fn):
+    before = server.requests
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<45} {(time.perf_counter() - start) * 1000:8.1f}ms  upstream requests: {server.requests - before}")
+    return result
+
+
+def main():
+    timed("cold query", lambda: search_web("Latest news about AI"))
+    timed("same query, different case/punctuation", lambda: search_web("latest news about AI?!"))
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        timed("32 concurrent identical cold queries",
+              lambda: list(pool.map(search_web, ["Who invented the telephone"] * 32)))
+
+    print("\nTTL classes:")
+    for query in ["Current weather in New York", "Current stock price of Apple", "Latest news about AI", "Who was Albert Einstein"]:
+        name, ttl = search_cache.classify(search_cache.normalize(query))
+        print(f"  {query:<35} {name:<10} ttl={ttl}s")
+
+    # Expire everything to show stale-while-revalidate
+    for key, (value, _) in list(search_cache._entries.items()):
+        search_cache._entries[key] = (value, time.monotonic() - 1)
+    before = server.requests
+    timed("expired query (served stale, refreshed async)", lambda: search_web("Latest news about AI"))
+    time.sleep(0.4)
+    print(f"{'background refresh':<45} {'':>10}  upstream requests: {server.requests - before}")
+    timed("after background refresh", lambda: search_web("Latest news about AI"))
+
+    print(f"\n{search_cache.stats()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
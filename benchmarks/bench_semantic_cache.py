@@ -0,0 +1,102 @@
+"""
+Semantic cache: match quality on paraphrased questions, lookup cost, and the
+time saved in ask_with_wikipedia with a fake LLM and fake Wikipedia
+
+    python benchmarks/bench_semantic_cache.py --entries 1000
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+
+from fake_llm import FakeChatModel
+from fake_tools import FakeWikipedia
+
+# (cached question, new question, should the cached answer be reused)
+PAIRS = [
+    ("What is the Eiffel Tower?", "Tell me about the Eiffel Tower", True),
+    ("Tell me about the Eiffel Tower", "eiffel tower", True),
+    ("What is machine learning?", "Can you explain machine learning?", True),
+    ("Who was Albert Einstein?", "who was albert einstein", True),
+    ("What are black holes?", "Tell me about black holes please", True),
+    ("What is Python?", "Explain Python to me", True),
+    ("What is quantum computing?", "What is quantum computing about?", True),
+    ("What is the Eiffel Tower?", "How tall is the Eiffel Tower?", False),
+    ("What is the Eiffel Tower?", "Where is the Eiffel Tower?", False),
+    ("Who was Albert Einstein?", "When was Albert Einstein born?", False),
+    ("Who is the president of France?", "Who was the president of France?", False),
+    ("Apple stock price", "Google stock price", False),
+    ("Weather in New York", "Weather in Boston", False),
+    ("What is machine learning?", "What is deep learning?", False),
+    ("Tell me about the Moon", "Tell me about the Sun", False),
+]
+
+THRESHOLDS = (0.7, 0.8, 0.9, 0.95)
+
+
+def match_quality():
+    from semantic_cache import SemanticCache
+    print(f"{'threshold':<10} {'hits':>5} {'false hits':>11} {'missed':>7}")
+    for threshold in THRESHOLDS:
+        hits = false_hits = missed = 0
+        for cached, asked, same in PAIRS:
+            cache = SemanticCache(path=None, threshold=threshold, max_entries=8)
+            cache.put("bench", cached, "answer")
+            hit = cache.get("bench", asked) is not None
+            hits += hit and same
+            false_hits += hit and not same
+            missed += same and not hit
+        print(f"{threshold:<10} {hits:>5} {false_hits:>11} {missed:>7}")
+
+
+def lookup_cost(entries, lookups=500):
+    from semantic_cache import SemanticCache
+    cache = SemanticCache(path=None, max_entries=entries)
+    for i in range(entries):
+        cache.put("bench", f"question {i} about topic {i * 7 % 997} and subject {i * 13 % 991}", "answer")
+    start = time.perf_counter()
+    for i in range(lookups):
+        cache.get("bench", f"question {i} about topic {i * 7 % 997} and subject {i * 13 % 991}")
+    elapsed = (time.perf_counter() - start) / lookups
+    print(f"\nlookup with {entries} entries: {elapsed * 1e6:.0f}us  (hit rate {cache.stats()['hit_rate']:.0%})")
+
+
+def end_to_end(latency):
+    import semantic_cache
+    import wikipedia_agent
+    llm = FakeChatModel(responses=["A short answer from the fake model."], latency=latency)
+    wikipedia = FakeWikipedia(latency=latency)
+    wikipedia_agent.get_llm = lambda: llm
+    wikipedia_agent.get_wikipedia = lambda: wikipedia
+
+    questions = [asked for pair in PAIRS if pair[2] for asked in pair[:2]]
+    for enabled in (False, True):
+        semantic_cache._semantic_cache = semantic_cache.SemanticCache(path=None, enabled=enabled)
+        llm.calls = 0
+        start = time.perf_counter()
+        for question in questions:
+            wikipedia_agent.ask_with_wikipedia(question)
+        elapsed = time.perf_counter() - start
+        label = "semantic cache" if enabled else "no cache"
+        print(f"{label:<16} {len(questions)} questions  {elapsed:6.2f}s  LLM calls {llm.calls:3d}"
+              f"  hit rate {semantic_cache._semantic_cache.stats()['hit_rate']:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.1, help="fake LLM and Wikipedia latency (s)")
+    args = parser.parse_args()
+
+    match_quality()
+    lookup_cost(args.entries)
+    print()
+    end_to_end(args.latency)
+
+
+if __name__ == "__main__":
+    main()
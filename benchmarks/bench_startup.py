@@ -0,0 +1,62 @@
+"""
+Measure cold-start cost: module import time and time until the interactive
+menu is shown, each in a fresh interpreter
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "import interactive_demo": "import interactive_demo",
+    "import ui backend (app, streaming)": "import app, streaming",
+    "import agent": "import agent",
+    "import server": "import server",
+    # What every import used to pay: all clients constructed up front
+    "eager: build every client": (
+        "import app, restaurant_suggester, wikipedia_agent, serpapi_agent, memory_agent, agent\n"
+        "app.get_chain(); restaurant_suggester.get_chain()\n"
+        "wikipedia_agent.get_llm(); wikipedia_agent.get_wikipedia()\n"
+        "serpapi_agent.get_llm(); serpapi_agent.get_serpapi()\n"
+        "memory_agent.get_llm(); agent.get_conversation(); agent.get_wikipedia(); agent.get_serpapi()"
+    ),
+}
+
+
+def run_python(code, stdin=None):
+    env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "sk-fake"), "SERPAPI_API_KEY": os.environ.get("SERPAPI_API_KEY") or "fake"}
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, input=stdin, text=True, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+def time_to_menu():
+    # Start the demo, pick "Exit" and stop the clock once the process is done
+    return run_python("import interactive_demo; interactive_demo.main()", stdin="6\n")
+
+
+def report(label, samples):
+    print(f"{label:<40} median {statistics.median(samples) * 1000:8.1f}ms  min {min(samples) * 1000:8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup latency benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    baseline = [run_python("pass") for _ in range(args.runs)]
+    report("python interpreter only", baseline)
+    for label, code in SCENARIOS.items():
+        report(label, [run_python(code) for _ in range(args.runs)])
+    report("interactive_demo time to menu", [time_to_menu() for _ in range(args.runs)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Weather fast path: parsing and rendering cost against the old string
+round trip, and LLM calls saved in ask_with_search with a fake LLM and a
+fake SerpAPI
+
+    python benchmarks/bench_weather.py --latency 0.2
+"""
+
+import os
+import sys
+import ast
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+os.environ.setdefault("SERPAPI_API_KEY", "fake")
+os.environ["SEMANTIC_CACHE"] = "0"
+
+from fake_llm import FakeChatModel
+from fake_serpapi import search_payload
+from fake_tools import FakeSearch
+
+QUESTIONS = [
+    "What's the weather in Paris?",
+    "Will it rain in London tomorrow?",
+    "What's the temperature in Paris today?",
+    "Weather forecast for London",
+    "Is it snowing in Denver right now?",
+    "What's the weather in Denver?",
+]
+
+
+def legacy_format(text):
+    # What agent.py did before: literal_eval the wrapper's string, then one long f-string
+    data = ast.literal_eval(text)
+    return (f"Weather in {data.get('location', 'Unknown')}: {data.get('weather', 'N/A')} at "
+            f"{data.get('temperature', 'N/A')}°{data.get('unit', 'F')[0]}. Humidity: {data.get('humidity', 'N/A')}, "
+            f"Wind: {data.get('wind', 'N/A')}, Precipitation: {data.get('precipitation', 'N/A')} ({data.get('date', 'N/A')})")
+
+
+def parsing(rounds):
+    from langchain_community.utilities import SerpAPIWrapper
+    from weather import parse_weather
+    payload = search_payload("weather in Paris")
+    text = str(SerpAPIWrapper._process_response(dict(payload)))
+    assert legacy_format(text) == parse_weather(payload).render()
+
+    for label, fn in (("literal_eval + f-string", lambda: legacy_format(text)),
+                      ("parse_weather + render", lambda: parse_weather(payload).render())):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            fn()
+        print(f"{label:<26} {(time.perf_counter() - start) / rounds * 1e6:7.1f}us per answer")
+
+
+def end_to_end(latency):
+    import serpapi_agent
+    from weather import get_weather_cache
+    llm = FakeChatModel(responses=["It is partly cloudy and mild."], latency=latency)
+    search = FakeSearch(latency=latency)
+    serpapi_agent.get_llm = lambda: llm
+    serpapi_agent.get_serpapi = lambda: search
+
+    fast_path = serpapi_agent.weather_answer
+    for label, weather_answer in (("search + LLM", lambda question: None), ("weather fast path", fast_path)):
+        serpapi_agent.weather_answer = weather_answer
+        serpapi_agent.search_cache.clear()
+        get_weather_cache().clear()
+        llm.calls = search.calls = 0
+        start = time.perf_counter()
+        for question in QUESTIONS:
+            serpapi_agent.ask_with_search(question)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<26} {len(QUESTIONS)} questions {elapsed:6.2f}s   LLM calls {llm.calls}   searches {search.calls}")
+    serpapi_agent.weather_answer = fast_path
+
+
+class NoWeatherBox(FakeSearch):
+    """Search results with no weather answer box, as for places Google doesn't recognize"""
+
+    def results(self, query: str) -> dict:
+        return super().results(f"about {query.replace('weather', 'climate')}")
+
+
+def without_box(latency, repeats=3):
+    # Each question should cost one search the first time and none after that
+    import serpapi_agent
+    from weather import get_weather_cache
+    llm = FakeChatModel(responses=["No weather report was found for that place."], latency=latency)
+    search = NoWeatherBox(latency=latency)
+    serpapi_agent.get_llm = lambda: llm
+    serpapi_agent.get_serpapi = lambda: search
+    serpapi_agent.search_cache.clear()
+    get_weather_cache().clear()
+    questions = [q for q in QUESTIONS if "Denver" not in q]
+    for _ in range(repeats):
+        for question in questions:
+            serpapi_agent.ask_with_search(question)
+    print(f"{'no weather box':<26} {len(questions)} questions x{repeats}   LLM calls {llm.calls}   searches {search.calls}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.1, help="fake LLM and search latency (s)")
+    args = parser.parse_args()
+
+    parsing(args.rounds)
+    print()
+    end_to_end(args.latency)
+    without_box(args.latency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+UI backend: generations run inline on threads (today's Streamlit behaviour,
+one thread per session) against the worker process pool, with a fake LLM
+that also burns CPU per call like parsing and formatting do. Reports
+throughput, how long the main thread stalls while jobs run, and how fast a
+cancelled job frees its worker
+
+    python benchmarks/bench_worker_pool.py --jobs 16 --cpu-ms 40 --workers 4
+"""
+
+import os
+import sys
+import time
+import argparse
+import functools
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+
+from fake_llm import FakeChatModel
+
+MENU = "1. Samosa\n2. Butter Chicken\n3. Dal Makhani\n4. Garlic Naan\n5. Mango Lassi"
+CUISINES = ["bengali", "italian", "chinese", "mexican", "indian"]
+
+
+def _burn(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class BusyModel(FakeChatModel):
+    """Fake model that holds the CPU (and the GIL) for `cpu_seconds` per call"""
+
+    cpu_seconds: float = 0.0
+
+    async def _agenerate(self, *args, **kwargs):
+        _burn(self.cpu_seconds)
+        return await super()._agenerate(*args, **kwargs)
+
+    async def _astream(self, *args, **kwargs):
+        _burn(self.cpu_seconds)
+        async for chunk in super()._astream(*args, **kwargs):
+            yield chunk
+
+
+def use_fake_llm(latency, cpu_seconds):
+    # Runs in the parent for the inline backend and in every worker for the pool;
+    # one response serves both steps, since concurrent jobs interleave their calls
+    import app
+    llm = BusyModel(responses=[MENU], latency=latency, cpu_seconds=cpu_seconds, chunk_delay=0.005)
+    app.get_llm = lambda: llm
+    app.get_name_chain.cache_clear()
+    app.get_chain.cache_clear()
+
+
+class StallMeter:
+    """Ticks every 5ms on its own thread and records the worst lateness, like a UI render loop"""
+
+    def __init__(self):
+        self.worst = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            time.sleep(0.005)
+            self.worst = max(self.worst, time.perf_counter() - start - 0.005)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def p95(samples):
+    return sorted(samples)[int(len(samples) * 0.95) - 1]
+
+
+def inline(jobs, concurrency):
+    from app import astream_restaurant
+    from streaming import iter_sync
+    from concurrent.futures import ThreadPoolExecutor
+
+    first = []
+
+    def run(i):
+        events = []
+        for event in iter_sync(astream_restaurant(CUISINES[i % len(CUISINES)], "two_step")):
+            if not events:
+                first.append(time.perf_counter() - start)
+            events.append(event)
+        return events
+
+    with StallMeter() as meter, ThreadPoolExecutor(concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(run, range(jobs)))
+        elapsed = time.perf_counter() - start
+    assert all(len(events) == 6 for events in results)
+    return elapsed, p95(first), meter.worst
+
+
+def pooled(pool, jobs):
+    with StallMeter() as meter:
+        start = time.perf_counter()
+        submitted = [pool.submit(CUISINES[i % len(CUISINES)]) for i in range(jobs)]
+        results = [job.result(timeout=60) for job in submitted]
+        elapsed = time.perf_counter() - start
+    assert all(len(r["menu_items"]) == 5 for r in results)
+    first = [job.first_event_at - start for job in submitted]
+    return elapsed, p95(first), meter.worst
+
+
+def cancellation(initializer):
+    from worker_pool import WorkerPool
+    pool = WorkerPool(1, mode="two_step", initializer=initializer)
+    pool.submit("warmup").result(timeout=60)
+    slow = pool.submit("bengali")
+    next(slow.stream(timeout=30))  # the name has arrived; the menu is streaming
+    start = time.perf_counter()
+    slow.cancel()
+    following = pool.submit("italian")
+    events = list(slow.stream(timeout=30))
+    cancelled = time.perf_counter() - start
+    next(following.stream(timeout=30))
+    freed = time.perf_counter() - start
+    pool.shutdown()
+    print(f"\ncancel while streaming: job ended '{events[-1][0]}' after {cancelled * 1e3:.0f}ms, "
+          f"the next job's first event {freed * 1e3:.0f}ms after the cancel")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.1, help="fake LLM latency (s)")
+    parser.add_argument("--cpu-ms", type=float, default=40.0, help="CPU time per LLM call (ms)")
+    args = parser.parse_args()
+
+    initializer = functools.partial(use_fake_llm, args.latency, args.cpu_ms / 1000)
+    os.environ["CHAIN_MODE"] = "two_step"
+
+    print(f"{'backend':<24} {'seconds':>8} {'jobs/s':>7} {'p95 first event':>16} {'worst main-thread stall':>24}")
+    initializer()
+    elapsed, first, stall = inline(args.jobs, args.workers)
+    print(f"{'inline threads':<24} {elapsed:8.2f} {args.jobs / elapsed:7.1f} {first * 1e3:14.0f}ms {stall * 1e3:22.1f}ms")
+
+    from worker_pool import WorkerPool
+    pool = WorkerPool(args.workers, mode="two_step", initializer=initializer)
+    pool.submit("warmup").result(timeout=60)  # workers start in parallel; wait until all imports are done
+    for job in [pool.submit("warmup") for _ in range(args.workers)]:
+        job.result(timeout=60)
+    elapsed, first, stall = pooled(pool, args.jobs)
+    print(f"{f'{args.workers} worker processes':<24} {elapsed:8.2f} {args.jobs / elapsed:7.1f} "
+          f"{first * 1e3:14.0f}ms {stall * 1e3:22.1f}ms")
+    pool.shutdown()
+
+    cancellation(initializer)
+
+
+if __name__ == "__main__":
+    main()
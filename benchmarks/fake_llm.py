@@ -0,0 +1,78 @@
+"""
+Fake chat model for offline benchmarks
+Simulates network latency and token throughput without calling any API
+"""
+
+import time
+import asyncio
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that returns canned responses after a fixed delay"""
+
+    responses: list[str] = ["1. The Golden Fork\n2. Ember & Oak\n3. Saffron Table\n4. Harbor Lane\n5. Little Olive"]
+    latency: float = 0.05
+    chunk_delay: float = 0.0
+    tokens_per_second: float = 0.0  # 0 = the whole response arrives at once
+    fail_every: int = 0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def _next_response(self) -> str:
+        self.calls += 1
+        if self.fail_every and self.calls % self.fail_every == 0:
+            raise RuntimeError(f"Simulated failure on call {self.calls}")
+        return self.responses[(self.calls - 1) % len(self.responses)]
+
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second else self.chunk_delay
+
+    def _generation_time(self, text) -> float:
+        return self.latency + (len(_tokens(text)) / self.tokens_per_second if self.tokens_per_second else 0.0)
+
+    def _result(self, messages, text) -> ChatResult:
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+        usage = {"input_tokens": prompt_tokens, "output_tokens": len(_tokens(text)),
+                 "total_tokens": prompt_tokens + len(_tokens(text))}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        text = self._next_response()
+        time.sleep(self._generation_time(text))
+        return self._result(messages, text)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        text = self._next_response()
+        await asyncio.sleep(self._generation_time(text))
+        return self._result(messages, text)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        text = self._next_response()
+        time.sleep(self.latency)
+        delay = self._token_delay()
+        for token in _tokens(text):
+            if delay:
+                time.sleep(delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        text = self._next_response()
+        await asyncio.sleep(self.latency)
+        delay = self._token_delay()
+        for token in _tokens(text):
+            if delay:
+                await asyncio.sleep(delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+def _tokens(text: str, size: int = 4):
+    """Split text into small pieces that look like streamed tokens"""
+    return [text[i:i + size] for i in range(0, len(text), size)]
@@ -0,0 +1,82 @@
+"""
+Local stand-in for the SerpAPI HTTP endpoint
+Answers /search with canned JSON after a configurable delay and counts requests
+
+    python benchmarks/fake_serpapi.py --port 8765 --latency 0.2
+    SERPAPI_BASE_URL=http://127.0.0.1:8765 SERPAPI_API_KEY=fake python serpapi_agent.py
+"""
+
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+def search_payload(query: str) -> dict:
+    """Canned SerpAPI response shaped like the real one"""
+    q = query.lower()
+    if "weather" in q:
+        return {"answer_box": {
+            "type": "weather_result", "temperature": "61", "unit": "Fahrenheit",
+            "precipitation": "10%", "humidity": "72%", "wind": "8 mph",
+            "location": "Paris, France", "date": "Friday 10:00 AM", "weather": "Partly cloudy",
+        }}
+    if "stock" in q or "price" in q:
+        return {"answer_box": {"type": "finance_results", "title": query, "price": "189.84", "currency": "USD"}}
+    return {"organic_results": [
+        {"title": f"Result {i} for {query}", "snippet": f"Snippet {i} about {query}.", "link": f"https://example.com/{i}"}
+        for i in range(1, 4)
+    ]}
+
+
+class FakeSerpAPIServer(ThreadingHTTPServer):
+    """Threaded fake server that records how many searches it served"""
+
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.1):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/search":
+            self.send_error(404)
+            return
+        with self.server._lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency)
+        query = parse_qs(url.query).get("q", [""])[0]
+        body = json.dumps(search_payload(query)).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake SerpAPI server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+    server = FakeSerpAPIServer(args.port, args.latency)
+    print(f"Fake SerpAPI listening on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,47 @@
+"""
+In-process fake search and Wikipedia backends for offline benchmarks
+Same `run(query)` interface as the real tools, with a configurable delay
+"""
+
+import time
+import threading
+
+from fake_serpapi import search_payload
+
+
+class FakeSearch:
+    """Stands in for SerpAPIWrapper, shaping canned results the same way"""
+
+    def __init__(self, latency=0.1):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def results(self, query: str) -> dict:
+        """Raw search payload, like SerpAPIWrapper.results"""
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return search_payload(query)
+
+    def run(self, query: str) -> str:
+        from langchain_community.utilities import SerpAPIWrapper
+        return str(SerpAPIWrapper._process_response(self.results(query)))
+
+
+class FakeWikipedia:
+    """Stands in for WikipediaQueryRun, answering from the bundled sample corpus"""
+
+    def __init__(self, latency=0.1):
+        from wiki_index import SAMPLE_CORPUS, WikiIndex
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._index = WikiIndex(":memory:")
+        self._index.ingest(SAMPLE_CORPUS)
+
+    def run(self, query: str) -> str:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return self._index.run(query)
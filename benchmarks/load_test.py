@@ -0,0 +1,119 @@
+"""
+Load test for server.py against the stub LLM server
+Reports p50/p99 latency and requests per second
+
+    python benchmarks/load_test.py --requests 500 --concurrency 50
+"""
+
+import os
+import sys
+import time
+import uuid
+import signal
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+import aiohttp
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stub_llm_server import start_in_thread
+
+
+async def wait_until_up(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{url}/healthz") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def run_load(url, endpoint, total, concurrency):
+    latencies, statuses = [], {}
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def worker(session):
+        while not queue.empty():
+            queue.get_nowait()
+            # Unique inputs so every request misses the response cache
+            tag = uuid.uuid4().hex[:8]
+            if endpoint == "/suggest":
+                payload = {"cuisine_type": f"Fusion {tag}", "atmosphere": "casual"}
+            else:
+                payload = {"cuisine": f"fusion {tag}"}
+            start = time.perf_counter()
+            try:
+                async with session.post(url + endpoint, json=payload) as response:
+                    await response.read()
+                    status = response.status
+            except aiohttp.ClientError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return np.array(latencies), statuses, elapsed
+
+
+def report(endpoint, latencies, statuses, elapsed):
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"{endpoint:<12} {len(latencies) / elapsed:8.1f} req/s   p50 {p50:7.1f}ms   p99 {p99:7.1f}ms   {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.1, help="stub LLM latency per call (s)")
+    parser.add_argument("--port", type=int, default=8181)
+    parser.add_argument("--max-concurrency", type=int, default=32)
+    parser.add_argument("--max-queue", type=int, default=256)
+    args = parser.parse_args()
+
+    base_url, stub = start_in_thread(latency=args.latency)
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="sk-stub",
+        OPENAI_BASE_URL=base_url,
+        RESPONSE_CACHE_PATH=os.path.join(tempfile.mkdtemp(), "responses.sqlite"),
+        # Measure the service, not the scheduler's production rate limits
+        OPENAI_RPM=os.environ.get("OPENAI_RPM", "1000000"),
+        OPENAI_TPM=os.environ.get("OPENAI_TPM", "1000000000"),
+    )
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "server.py"), "--port", str(args.port),
+         "--max-concurrency", str(args.max_concurrency), "--max-queue", str(args.max_queue)],
+        cwd=ROOT, env=env,
+    )
+    url = f"http://127.0.0.1:{args.port}"
+    try:
+        asyncio.run(wait_until_up(url))
+        print(f"{args.requests} requests, {args.concurrency} clients, stub latency {args.latency * 1000:.0f}ms")
+        print("-" * 90)
+        for endpoint in ["/suggest", "/restaurant"]:
+            report(endpoint, *asyncio.run(run_load(url, endpoint, args.requests, args.concurrency)))
+        print(f"stub LLM calls: {stub['requests']}")
+    finally:
+        # Graceful shutdown: SIGINT lets the server drain in-flight requests
+        server.send_signal(signal.SIGINT)
+        server.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Stub OpenAI-compatible server for load tests
+Serves /v1/chat/completions and /v1/completions with canned text after a delay,
+optionally answering 429 above a requests/second limit
+
+    python benchmarks/stub_llm_server.py --port 8900 --latency 0.1
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 python server.py
+"""
+
+import json
+import time
+import asyncio
+import argparse
+import threading
+
+from aiohttp import web
+
+CHAT_TEXT = "1. The Golden Fork\n2. Ember & Oak\n3. Saffron Table\n4. Harbor Lane\n5. Little Olive"
+COMPLETION_TEXT = "\n\n1. Shorshe Ilish\n2. Kosha Mangsho\n3. Luchi with Aloo Dum\n4. Chingri Malai Curry\n5. Mishti Doi"
+
+
+def _usage(prompt, text):
+    prompt_tokens, completion_tokens = len(str(prompt)) // 4, len(text) // 4
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+def create_stub_app(latency=0.1, chunk_delay=0.0, rate_limit=0):
+    stub = web.Application()
+    stub["requests"] = 0
+    stub["rate_limited"] = 0
+    window = {"second": 0, "count": 0}
+
+    async def respond(request, chat):
+        stub["requests"] += 1
+        if rate_limit:
+            second = int(time.monotonic())
+            if window["second"] != second:
+                window.update(second=second, count=0)
+            window["count"] += 1
+            if window["count"] > rate_limit:
+                stub["rate_limited"] += 1
+                return web.json_response(
+                    {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                    status=429, headers={"Retry-After": "1"},
+                )
+        body = await request.json()
+        await asyncio.sleep(latency)
+        model = body.get("model", "stub")
+        prompt = body.get("messages") if chat else body.get("prompt")
+        text = CHAT_TEXT if chat else ("Ember & Saffron" if "name" in str(prompt) else COMPLETION_TEXT)
+
+        if not body.get("stream"):
+            choice = {"index": 0, "finish_reason": "stop"}
+            if chat:
+                choice["message"] = {"role": "assistant", "content": text}
+            else:
+                choice.update(text=text, logprobs=None)
+            return web.json_response({
+                "id": "stub-1", "object": "chat.completion" if chat else "text_completion",
+                "created": int(time.time()), "model": model, "choices": [choice],
+                "usage": _usage(prompt, text),
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for i in range(0, len(text), 4):
+            piece = text[i:i + 4]
+            choice = {"index": 0, "finish_reason": None}
+            if chat:
+                choice["delta"] = {"role": "assistant", "content": piece}
+            else:
+                choice.update(text=piece, logprobs=None)
+            chunk = {"id": "stub-1", "object": "chat.completion.chunk" if chat else "text_completion",
+                     "created": int(time.time()), "model": model, "choices": [choice]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            if chunk_delay:
+                await asyncio.sleep(chunk_delay)
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    stub.add_routes([
+        web.post("/v1/chat/completions", lambda request: respond(request, chat=True)),
+        web.post("/v1/completions", lambda request: respond(request, chat=False)),
+    ])
+    return stub
+
+
+def start_in_thread(port=0, latency=0.1, chunk_delay=0.0, rate_limit=0):
+    """Run the stub on its own event loop thread; returns (base_url, app)"""
+    stub = create_stub_app(latency, chunk_delay, rate_limit)
+    ready = threading.Event()
+    state = {}
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        runner = web.AppRunner(stub)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", port)
+        loop.run_until_complete(site.start())
+        state["port"] = site._server.sockets[0].getsockname()[1]
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, daemon=True).start()
+    ready.wait()
+    return f"http://127.0.0.1:{state['port']}/v1", stub
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub OpenAI-compatible server")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--chunk-delay", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=0, help="requests/second before answering 429 (0 = off)")
+    args = parser.parse_args()
+    web.run_app(create_stub_app(args.latency, args.chunk_delay, args.rate_limit), host="127.0.0.1", port=args.port)
@@ -0,0 +1,298 @@
+"""
+Offline benchmark suite for the main entry points
+Swaps in fake chat models and fake search / Wikipedia backends, then measures
+latency, throughput and memory, and compares against a stored baseline
+
+    python benchmarks/suite.py                    # run and compare with baseline.json
+    python benchmarks/suite.py --save-baseline --repeats 5    # record a new baseline
+    python benchmarks/suite.py --only ask_with_search --iterations 50 --repeats 5
+
+Each benchmark is measured `--repeats` times and every metric is the median
+of those runs. The baseline also records how far the runs spread, and a
+change within that spread never counts as a regression.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+import statistics
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+os.environ.setdefault("SERPAPI_API_KEY", "fake")
+os.environ["INSTRUMENTATION"] = "0"
+# Measure the full pipeline; repeated questions would otherwise be answered from the cache
+os.environ["SEMANTIC_CACHE"] = "0"
+# Keep benchmark conversations in memory rather than in the on-disk memory log
+os.environ["MEMORY_LOG"] = "0"
+
+from fake_llm import FakeChatModel
+from fake_tools import FakeSearch, FakeWikipedia
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+CUISINES = ["Italian", "Japanese", "Mexican", "French", "Indian", "Thai", "Bengali", "Greek"]
+ATMOSPHERES = ["romantic", "modern", "casual", "upscale", "family-friendly", "trendy"]
+TOPICS = ["the Eiffel Tower", "Python", "artificial intelligence", "the Moon", "quantum computing", "the Nile"]
+
+SUGGESTIONS = "1. The Golden Fork\n2. Ember & Oak\n3. Saffron Table\n4. Harbor Lane\n5. Little Olive"
+MENU = "1. Shorshe Ilish\n2. Kosha Mangsho\n3. Aloo Posto\n4. Cholar Dal\n5. Luchi\n6. Mishti Doi"
+ANSWER = ("Based on the information available, here is a short and accurate answer that covers "
+          "the main points of the question in two or three sentences.")
+
+# metric -> (better direction, absolute change always tolerated); the spread seen between
+# repeats when the baseline was saved raises the tolerated change further
+METRICS = {
+    "p50_ms": ("lower", 2.0),
+    "p95_ms": ("lower", 5.0),
+    "throughput_per_s": ("higher", 0.0),
+    "concurrent_per_s": ("higher", 0.0),
+    "overhead_ms": ("lower", 0.5),
+    "peak_kb": ("lower", 256.0),
+}
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+class Patches:
+    """Swap module attributes for fakes and put everything back afterwards"""
+
+    def __init__(self):
+        self._saved = []
+
+    def set(self, module, name, value):
+        self._saved.append((module, name, module.__dict__.get(name)))
+        setattr(module, name, value)
+
+    def restore(self):
+        for module, name, value in reversed(self._saved):
+            setattr(module, name, value)
+        self._saved.clear()
+
+
+def _clear(*getters):
+    # Cached chains hold on to whichever LLM was current when they were built
+    for getter in getters:
+        getter.cache_clear()
+
+
+@benchmark("suggest_restaurant_names")
+def _suggest(patches, fake_llm, fake_tool):
+    import restaurant_suggester as rs
+    llm = fake_llm([SUGGESTIONS])
+    patches.set(rs, "get_llm", lambda: llm)
+    _clear(rs.get_chain)
+    return lambda i: rs.suggest_restaurant_names(CUISINES[i % len(CUISINES)], ATMOSPHERES[i % len(ATMOSPHERES)])
+
+
+@benchmark("app.chain")
+def _app_chain(patches, fake_llm, fake_tool):
+    import app
+    llm = fake_llm(["Ember & Saffron", MENU])
+    patches.set(app, "get_llm", lambda: llm)
+    _clear(app.get_chain, app.get_name_chain)
+    chain = app.get_chain("two_step")
+    return lambda i: chain.invoke({"cuisine": CUISINES[i % len(CUISINES)]})
+
+
+@benchmark("ask_with_memory")
+def _memory(patches, fake_llm, fake_tool):
+    import memory_agent
+    llm = fake_llm([ANSWER])
+    patches.set(memory_agent, "get_llm", lambda: llm)
+    _clear(memory_agent.get_memory_store)
+    # One long conversation, so the window fills up and older turns get summarized
+    return lambda i: memory_agent.ask_with_memory(f"Remember fact number {i}: I like {TOPICS[i % len(TOPICS)]}.", "bench")
+
+
+@benchmark("ask_with_search")
+def _search(patches, fake_llm, fake_tool):
+    import serpapi_agent
+    from search_cache import SearchCache
+    llm = fake_llm([ANSWER])
+    search = fake_tool(FakeSearch)
+    patches.set(serpapi_agent, "get_llm", lambda: llm)
+    patches.set(serpapi_agent, "get_serpapi", lambda: search)
+    patches.set(serpapi_agent, "search_cache", SearchCache())
+    # Distinct questions, so every call pays for a search
+    return lambda i: serpapi_agent.ask_with_search(f"What is new with {TOPICS[i % len(TOPICS)]} (#{i})?")
+
+
+@benchmark("ask_with_wikipedia")
+def _wikipedia(patches, fake_llm, fake_tool):
+    import wikipedia_agent
+    llm = fake_llm([ANSWER])
+    wikipedia = fake_tool(FakeWikipedia)
+    patches.set(wikipedia_agent, "get_llm", lambda: llm)
+    patches.set(wikipedia_agent, "get_wikipedia", lambda: wikipedia)
+    return lambda i: wikipedia_agent.ask_with_wikipedia(f"Tell me about {TOPICS[i % len(TOPICS)]}")
+
+
+@contextmanager
+def prepared(name, llm_latency, tokens_per_second, tool_latency):
+    patches = Patches()
+
+    def fake_llm(responses):
+        return FakeChatModel(responses=responses, latency=llm_latency, tokens_per_second=tokens_per_second)
+
+    def fake_tool(cls):
+        return cls(latency=tool_latency)
+
+    try:
+        yield BENCHMARKS[name](patches, fake_llm, fake_tool)
+    finally:
+        patches.restore()
+        _reset_caches()
+
+
+def _reset_caches():
+    import app, memory_agent, restaurant_suggester
+    _clear(app.get_chain, app.get_name_chain, restaurant_suggester.get_chain, memory_agent.get_memory_store)
+
+
+def measure(name, args):
+    """Latency and throughput with simulated latency, then pure overhead and memory with none"""
+    with prepared(name, args.llm_latency, args.tokens_per_second, args.tool_latency) as call:
+        for i in range(args.warmup):
+            call(i)
+        latencies = []
+        for i in range(args.iterations):
+            start = time.perf_counter()
+            call(i)
+            latencies.append(time.perf_counter() - start)
+
+    with prepared(name, args.llm_latency, args.tokens_per_second, args.tool_latency) as call:
+        n = args.iterations * 2
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(call, range(n)))
+        concurrent = n / (time.perf_counter() - start)
+
+    with prepared(name, 0.0, 0.0, 0.0) as call:
+        for i in range(args.warmup):
+            call(i)
+        start = time.perf_counter()
+        for i in range(args.iterations):
+            call(i)
+        overhead = (time.perf_counter() - start) / args.iterations
+
+        tracemalloc.start()
+        for i in range(args.iterations):
+            call(i)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+        "throughput_per_s": len(latencies) / sum(latencies),
+        "concurrent_per_s": concurrent,
+        "overhead_ms": overhead * 1000,
+        "peak_kb": peak / 1024,
+    }
+
+
+def measure_repeated(name, args):
+    """Median of each metric over `args.repeats` runs, and how far the runs spread"""
+    runs = [measure(name, args) for _ in range(args.repeats)]
+    medians = {metric: statistics.median(run[metric] for run in runs) for metric in runs[0]}
+    spread = {metric: max(run[metric] for run in runs) - min(run[metric] for run in runs) for metric in runs[0]}
+    return medians, spread
+
+
+def compare(results, baseline, tolerance):
+    """Print each metric next to the baseline; return the names of regressions"""
+    regressions = []
+    jitter = baseline.get("jitter", {})
+    print(f"\n{'benchmark':<26} {'metric':<18} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, metrics in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            print(f"{name:<26} (no baseline)")
+            continue
+        for metric, value in metrics.items():
+            if metric not in previous:
+                continue
+            direction, slack = METRICS[metric]
+            slack = max(slack, jitter.get(name, {}).get(metric, 0.0))
+            old = previous[metric]
+            change = (value - old) / old if old else 0.0
+            worse = (value - old) if direction == "lower" else (old - value)
+            regressed = worse > slack and worse > abs(old) * tolerance
+            flag = "  REGRESSION" if regressed else ""
+            if regressed:
+                regressions.append(f"{name}.{metric}")
+            print(f"{name:<26} {metric:<18} {old:>10.2f} {value:>10.2f} {change:>+7.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--repeats", type=int, default=3, help="runs per benchmark; metrics are their medians")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency", type=float, default=0.02, help="fake LLM time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=1000.0, help="fake LLM generation speed")
+    parser.add_argument("--tool-latency", type=float, default=0.03, help="fake search / Wikipedia latency (s)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown before failing")
+    args = parser.parse_args()
+
+    # Fakes answer instantly, so lift the production rate limits for the run
+    from scheduler import get_scheduler
+    for provider in ("openai", "serpapi", "wikipedia"):
+        get_scheduler().configure(provider, rpm=1e9)
+
+    results, spreads = {}, {}
+    for name in args.only or BENCHMARKS:
+        metrics, spreads[name] = measure_repeated(name, args)
+        results[name] = metrics
+        print(f"{name:<26} p50 {metrics['p50_ms']:8.1f}ms  p95 {metrics['p95_ms']:8.1f}ms  "
+              f"{metrics['concurrent_per_s']:7.1f}/s @{args.concurrency}  "
+              f"overhead {metrics['overhead_ms']:6.2f}ms  peak {metrics['peak_kb']:8.0f}KB")
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline["machine"] = {"python": platform.python_version(), "platform": platform.platform(), "processor": platform.machine()}
+        baseline["config"] = {key: getattr(args, key) for key in ("iterations", "repeats", "concurrency", "llm_latency", "tokens_per_second", "tool_latency")}
+        baseline.setdefault("results", {}).update({name: {k: round(v, 3) for k, v in m.items()} for name, m in results.items()})
+        baseline.setdefault("jitter", {}).update({name: {k: round(v, 3) for k, v in m.items()} for name, m in spreads.items()})
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+        print(f"\nSaved baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("\nNo baseline yet; run with --save-baseline to record one")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+    print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
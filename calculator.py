@@ -0,0 +1,395 @@
+"""
+Safe arithmetic for the agent's calculator tool
+Expressions are parsed with `ast` and evaluated over a whitelist of nodes and
+math functions; nothing is passed to eval(). Integers and decimals are exact
+fractions, so 0.1 + 0.2 is 0.3 and 1/3 + 1/6 is exactly 0.5. Percentages follow
+calculator rules (80 + 10% is 88, 20% of 80 is 16). Exponents, result sizes
+and evaluation time are bounded.
+
+    evaluate("15 * 12")                        # 180
+    solve("What is the square root of 144?")   # ("sqrt(144)", 12)
+"""
+
+import re
+import ast
+import math
+import time
+import operator
+from fractions import Fraction
+from functools import lru_cache
+
+MAX_LENGTH = 500
+MAX_NODES = 200
+MAX_EXPONENT = 10000
+MAX_BITS = 100000
+MAX_FACTORIAL = 1000
+MAX_SECONDS = 0.05
+DISPLAY_DIGITS = 12
+# Larger integers and fractions are shown in scientific notation; str() refuses ints over
+# 4300 digits (about 14000 bits) and float() overflows past 1024 bits
+MAX_DISPLAY_BITS = 1000
+
+
+class CalculatorError(ValueError):
+    """The expression is not valid arithmetic, or is too large to evaluate"""
+
+
+class Percent:
+    """A percentage, kept apart from plain numbers until an operator decides what it means"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    @property
+    def fraction(self):
+        return self.value / 100
+
+
+def _factorial(n):
+    if n != int(n) or n < 0:
+        raise CalculatorError("factorial needs a non-negative integer")
+    if n > MAX_FACTORIAL:
+        raise CalculatorError(f"factorial is limited to {MAX_FACTORIAL}")
+    return math.factorial(int(n))
+
+
+def _integers(name, args):
+    # gcd and lcm only make sense for whole numbers; arguments arrive as fractions
+    if not args or any(arg != int(arg) for arg in args):
+        raise CalculatorError(f"{name} needs integers")
+    return [int(arg) for arg in args]
+
+
+def _gcd(*args):
+    return math.gcd(*_integers("gcd", args))
+
+
+def _lcm(*args):
+    return math.lcm(*_integers("lcm", args))
+
+
+def _sqrt(x):
+    # Exact for perfect squares, so sqrt(144) is 12 rather than 12.0
+    if isinstance(x, Fraction) and x >= 0:
+        n, d = math.isqrt(x.numerator), math.isqrt(x.denominator)
+        if n * n == x.numerator and d * d == x.denominator:
+            return Fraction(n, d)
+    return math.sqrt(x)
+
+
+def _log(x, base=None):
+    return math.log(x) if base is None else math.log(x, base)
+
+
+FUNCTIONS = {
+    "sqrt": _sqrt, "cbrt": lambda x: math.copysign(abs(x) ** (1 / 3), x),
+    "abs": abs, "round": round, "floor": math.floor, "ceil": math.ceil,
+    "log": _log, "ln": math.log, "log10": math.log10, "log2": math.log2, "exp": math.exp,
+    "sin": math.sin, "cos": math.cos, "tan": math.tan,
+    "asin": math.asin, "acos": math.acos, "atan": math.atan,
+    "degrees": math.degrees, "radians": math.radians,
+    "factorial": _factorial, "gcd": _gcd, "lcm": _lcm,
+    "min": min, "max": max, "hypot": math.hypot,
+}
+CONSTANTS = {"pi": math.pi, "e": math.e, "tau": math.tau}
+
+_BINARY = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv, ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod,
+}
+_UNARY = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+# "20% of 80" and a trailing "N%" are percentages; "10 % 3" stays modulo
+_PERCENT_OF = re.compile(r"(\d+(?:\.\d+)?)\s*%\s*of\s*(\d+(?:\.\d+)?|\([^()]*\))", re.IGNORECASE)
+_PERCENT = re.compile(r"(\d+(?:\.\d+)?)\s*%(?!\s*[\d(.])")
+_FACTORIAL = re.compile(r"(\d+)\s*!(?!=)")
+
+
+def _bits(value):
+    if isinstance(value, Fraction):
+        return max(value.numerator.bit_length(), value.denominator.bit_length())
+    if isinstance(value, int):
+        return value.bit_length()
+    return 64
+
+
+def _checked(value):
+    if isinstance(value, (int, Fraction)) and _bits(value) > MAX_BITS:
+        raise CalculatorError("result is too large")
+    if isinstance(value, complex):
+        raise CalculatorError("result is not a real number")
+    if isinstance(value, float) and not math.isfinite(value):
+        raise CalculatorError("result is not a finite number")
+    return value
+
+
+def _power(base, exponent):
+    if isinstance(exponent, Fraction) and exponent.denominator == 1:
+        exponent = exponent.numerator
+        if abs(exponent) > MAX_EXPONENT:
+            raise CalculatorError(f"exponents are limited to {MAX_EXPONENT}")
+        if _bits(base) * abs(exponent) > MAX_BITS:
+            raise CalculatorError("result is too large")
+        if base == 0 and exponent < 0:
+            raise CalculatorError("division by zero")
+        # A float base (pi ** 1000) can still overflow; _arithmetic reports that
+        return base ** exponent
+    if base == 0 and exponent < 0:
+        raise CalculatorError("division by zero")
+    return float(base) ** float(exponent)
+
+
+def _binary(op, left, right):
+    if isinstance(right, Percent):
+        # 80 + 10% adds ten percent of 80; 80 * 10% is 8
+        if op in (ast.Add, ast.Sub):
+            return _BINARY[op](left, left * right.fraction)
+        right = right.fraction
+    if isinstance(left, Percent):
+        left = left.fraction
+    if op is ast.Pow:
+        return _power(left, right)
+    if op in (ast.Div, ast.FloorDiv, ast.Mod) and right == 0:
+        raise CalculatorError("division by zero")
+    return _BINARY[op](left, right)
+
+
+def _arithmetic(op, left, right):
+    # Mixing a huge Fraction with a float converts it to float, which can overflow
+    try:
+        return _checked(_binary(op, left, right))
+    except OverflowError:
+        raise CalculatorError("result is too large") from None
+
+
+def _number(value):
+    # Decimals become exact fractions; repr keeps what the user typed, e.g. 0.1
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise CalculatorError(f"unsupported value {value!r}")
+    if isinstance(value, float) and not math.isfinite(value):
+        # 1e400 parses as inf
+        raise CalculatorError("number is too large")
+    return Fraction(value) if isinstance(value, int) else Fraction(repr(value))
+
+
+def _evaluate(node, deadline):
+    if time.perf_counter() > deadline:
+        raise CalculatorError("evaluation took too long")
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body, deadline)
+    if isinstance(node, ast.Constant):
+        return _number(node.value)
+    if isinstance(node, ast.BinOp) and (type(node.op) in _BINARY or isinstance(node.op, ast.Pow)):
+        left = _evaluate(node.left, deadline)
+        right = _evaluate(node.right, deadline)
+        return _arithmetic(type(node.op), left, right)
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY:
+        operand = _evaluate(node.operand, deadline)
+        if isinstance(operand, Percent):
+            return Percent(_UNARY[type(node.op)](operand.value))
+        return _UNARY[type(node.op)](operand)
+    if isinstance(node, ast.Name) and node.id in CONSTANTS:
+        return CONSTANTS[node.id]
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        name = node.func.id
+        if name not in FUNCTIONS and name not in ("percent", "percent_of"):
+            raise CalculatorError(f"unknown function {name!r}")
+        args = [_evaluate(arg, deadline) for arg in node.args]
+        if name == "percent" and len(args) == 1:
+            return Percent(args[0])
+        if name == "percent_of" and len(args) == 2:
+            return _arithmetic(ast.Mult, Percent(args[0]).fraction, args[1])
+        if name in FUNCTIONS:
+            args = [a.fraction if isinstance(a, Percent) else a for a in args]
+            try:
+                return _checked(FUNCTIONS[name](*args))
+            except CalculatorError:
+                raise
+            except (ValueError, TypeError, OverflowError, ZeroDivisionError) as e:
+                raise CalculatorError(f"{name}: {e}") from None
+    raise CalculatorError(f"unsupported syntax: {ast.dump(node)[:60]}")
+
+
+def _rewrite(expression: str) -> str:
+    # Calculator notation to Python syntax the whitelist understands
+    expression = expression.replace("^", "**").replace("×", "*").replace("÷", "/")
+    expression = _FACTORIAL.sub(r"factorial(\1)", expression)
+    expression = _PERCENT_OF.sub(r"percent_of(\1, \2)", expression)
+    return _PERCENT.sub(r"percent(\1)", expression)
+
+
+@lru_cache(maxsize=1024)
+def _parse(expression: str):
+    if len(expression) > MAX_LENGTH:
+        raise CalculatorError("expression is too long")
+    try:
+        tree = ast.parse(_rewrite(expression.strip()), mode="eval")
+    except SyntaxError:
+        raise CalculatorError(f"not an arithmetic expression: {expression!r}") from None
+    if sum(1 for _ in ast.walk(tree)) > MAX_NODES:
+        raise CalculatorError("expression is too long")
+    return tree
+
+
+def evaluate(expression: str):
+    """Value of an arithmetic expression: a Fraction when exact, else a float
+
+    Raises CalculatorError for anything that is not whitelisted arithmetic or
+    that would exceed the size and time limits.
+    """
+    result = _evaluate(_parse(expression), time.perf_counter() + MAX_SECONDS)
+    return result.fraction if isinstance(result, Percent) else result
+
+
+def _scientific(value: Fraction) -> str:
+    # Exact scaling by a power of ten first, so neither float() nor str() sees the huge number
+    if value == 0:
+        return "0"
+    sign, value = ("-" if value < 0 else ""), abs(value)
+    exponent = int((value.numerator.bit_length() - value.denominator.bit_length()) * math.log10(2))
+    mantissa = float(value / Fraction(10) ** exponent)
+    while mantissa >= 10:
+        mantissa, exponent = mantissa / 10, exponent + 1
+    while mantissa < 1:
+        mantissa, exponent = mantissa * 10, exponent - 1
+    return f"{sign}{mantissa:.{DISPLAY_DIGITS}g}e{exponent:+d}"
+
+
+def format_number(value) -> str:
+    """Integers as integers, terminating fractions as decimals, others as p/q (≈ decimal)
+
+    Numbers over MAX_DISPLAY_BITS are shown in scientific notation.
+    """
+    if isinstance(value, float):
+        if value.is_integer() and abs(value) < 1e15:
+            return str(int(value))
+        return f"{value:.{DISPLAY_DIGITS}g}"
+    if _bits(value) > MAX_DISPLAY_BITS:
+        return _scientific(value)
+    if value.denominator == 1:
+        return str(value.numerator)
+    denominator = value.denominator
+    for prime in (2, 5):
+        while denominator % prime == 0:
+            denominator //= prime
+    approximate = f"{float(value):.{DISPLAY_DIGITS}g}"
+    if denominator == 1 and len(approximate) <= DISPLAY_DIGITS + 2:
+        return approximate
+    return f"{value.numerator}/{value.denominator} (≈ {approximate})"
+
+
+# Spoken arithmetic, replaced in order before looking for an expression
+_WORDS = [
+    (re.compile(r"\bsquare root of\b", re.IGNORECASE), " sqrt "),
+    (re.compile(r"\bcube root of\b", re.IGNORECASE), " cbrt "),
+    (re.compile(r"\b(?:the )?(factorial|log|ln|sin|cos|tan|sine|cosine|tangent|absolute value) of\b", re.IGNORECASE), r" \1 "),
+    (re.compile(r"\bsine\b", re.IGNORECASE), "sin"),
+    (re.compile(r"\bcosine\b", re.IGNORECASE), "cos"),
+    (re.compile(r"\btangent\b", re.IGNORECASE), "tan"),
+    (re.compile(r"\babsolute value\b", re.IGNORECASE), "abs"),
+    (re.compile(r"\bpercent\b", re.IGNORECASE), "%"),
+    (re.compile(r"\bmultiplied by\b|\btimes\b|(?<=\d)\s*[x×](?=\s*\d)", re.IGNORECASE), " * "),
+    (re.compile(r"\bdivided by\b|\bover\b|÷", re.IGNORECASE), " / "),
+    (re.compile(r"\bplus\b", re.IGNORECASE), " + "),
+    (re.compile(r"\bminus\b", re.IGNORECASE), " - "),
+    (re.compile(r"\bmod(?:ulo)?\b", re.IGNORECASE), " % "),
+    (re.compile(r"\bto the power of\b|\braised to\b", re.IGNORECASE), " ^ "),
+    (re.compile(r"\bsquared\b", re.IGNORECASE), " ^ 2"),
+    (re.compile(r"\bcubed\b", re.IGNORECASE), " ^ 3"),
+]
+_TOKEN = re.compile(r"\d+(?:\.\d+)?|\*\*|[-+*/%^(),!]|[A-Za-z_]\w*|\S")
+_OPERATORS = {"+", "-", "*", "/", "%", "^", "**"}
+_NO_SPACE_BEFORE = {")", ",", "%", "!"}
+
+
+def _math_token(token, previous):
+    if token[0].isdigit() or token in _OPERATORS or token in "(),!":
+        return True
+    if token in FUNCTIONS or token in CONSTANTS:
+        return True
+    # "of" only belongs to the expression in "20% of 80"
+    return token.lower() == "of" and previous == "%"
+
+
+def _join(tokens):
+    text = ""
+    for i, token in enumerate(tokens):
+        # "20%" hugs its number, "10 % 3" (modulo) does not
+        modulo = token == "%" and i + 1 < len(tokens) and (tokens[i + 1][0].isdigit() or tokens[i + 1] == "(")
+        attached = token in _NO_SPACE_BEFORE and not modulo
+        if text and not attached and not text.endswith("(") and not (token == "(" and tokens[i - 1] in FUNCTIONS):
+            text += " "
+        text += token
+    return text
+
+
+def _call_brackets(run):
+    # "sqrt 144" -> "sqrt(144)"
+    tokens = []
+    i = 0
+    while i < len(run):
+        tokens.append(run[i])
+        if run[i] in FUNCTIONS and i + 1 < len(run) and run[i + 1] != "(":
+            tokens += ["(", run[i + 1], ")"]
+            i += 1
+        i += 1
+    return tokens
+
+
+def extract_expression(text: str):
+    """The arithmetic in a natural-language question, or None
+
+    "What is 15 multiplied by 12?" -> "15 * 12"
+    """
+    for pattern, replacement in _WORDS:
+        text = pattern.sub(replacement, text)
+    runs, current, previous = [], [], None
+    for token in _TOKEN.findall(text):
+        if _math_token(token, previous):
+            current.append(token)
+        else:
+            if current:
+                runs.append(current)
+            current = []
+        previous = token
+    if current:
+        runs.append(current)
+
+    best = None
+    for run in runs:
+        run = _call_brackets(run)
+        # Trim dangling operators and unmatched brackets from the edges; a trailing % is a percentage
+        while run and (run[-1] in _OPERATORS - {"%"} or run[-1] in "(,"):
+            run = run[:-1]
+        while run and (run[0] in _OPERATORS - {"-"} or run[0] in "),"):
+            run = run[1:]
+        while run and run.count("(") < run.count(")") and run[-1] == ")":
+            run = run[:-1]
+        if not any(t[0].isdigit() or t in CONSTANTS for t in run) or run.count("(") != run.count(")"):
+            continue
+        # A lone number is not a calculation; it needs an operator or a function
+        if not any(t in _OPERATORS or t in FUNCTIONS or t == "!" for t in run):
+            continue
+        if best is None or len(run) > len(best):
+            best = run
+    return _join(best) if best else None
+
+
+def solve(text: str):
+    """(expression, value) for a question or bare expression; raises CalculatorError if there is no arithmetic"""
+    try:
+        return text, evaluate(text)
+    except CalculatorError:
+        expression = extract_expression(text)
+        if expression is None:
+            raise
+        return expression, evaluate(expression)
+
+
+if __name__ == "__main__":
+    import sys
+    question = " ".join(sys.argv[1:]) or "What is 15 multiplied by 12?"
+    expression, value = solve(question)
+    print(f"{expression} = {format_number(value)}")
@@ -0,0 +1,74 @@
+"""
+Shared HTTP connection pools for the OpenAI clients
+Every LLM built with these pools reuses the same keep-alive connections, and
+its requests are rate-limited and retried by the shared scheduler
+"""
+
+import os
+from functools import lru_cache
+
+_http_client = None
+_async_http_client = None
+
+
+@lru_cache(maxsize=None)
+def load_env():
+    """Load .env once, the first time a client needs its settings"""
+    from dotenv import load_dotenv
+    load_dotenv()
+
+
+def _limits():
+    import httpx
+    load_env()
+    return httpx.Limits(
+        max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "20")),
+    )
+
+
+def _timeout():
+    return float(os.getenv("HTTP_TIMEOUT", "60"))
+
+
+def get_http_client():
+    """Process-wide pooled httpx.Client for synchronous calls"""
+    global _http_client
+    if _http_client is None:
+        import httpx
+        from scheduler import ScheduledTransport
+        transport = ScheduledTransport(httpx.HTTPTransport(limits=_limits()), "openai")
+        _http_client = httpx.Client(transport=transport, timeout=_timeout())
+    return _http_client
+
+
+def get_async_http_client():
+    """Process-wide pooled httpx.AsyncClient for async calls"""
+    global _async_http_client
+    if _async_http_client is None:
+        import httpx
+        from scheduler import AsyncScheduledTransport
+        transport = AsyncScheduledTransport(httpx.AsyncHTTPTransport(limits=_limits()), "openai")
+        _async_http_client = httpx.AsyncClient(transport=transport, timeout=_timeout())
+    return _async_http_client
+
+
+def pooled_client_kwargs() -> dict:
+    """Keyword arguments that make ChatOpenAI / OpenAI use the shared pools"""
+    return {
+        "http_client": get_http_client(),
+        "http_async_client": get_async_http_client(),
+        # The scheduler's transport retries with backoff; the SDK's own retries would stack on top
+        "max_retries": 0,
+    }
+
+
+async def aclose_clients():
+    """Close both pools, e.g. on server shutdown"""
+    global _http_client, _async_http_client
+    if _async_http_client is not None:
+        await _async_http_client.aclose()
+        _async_http_client = None
+    if _http_client is not None:
+        _http_client.close()
+        _http_client = None
@@ -0,0 +1,434 @@
+"""
+Tracing and metrics for agents and chains
+
+Set INSTRUMENTATION=1 (or call enable()) and every LangChain chain, LLM and
+tool run is recorded through a callback handler; wrap other steps with
+`span()`. Finished spans carry latency, token counts, cache hits and errors.
+They are appended to TRACE_PATH as JSONL (see trace_report.py) and
+aggregated for `prometheus_text()`.
+
+    with span("tool.serpapi", kind="tool"):
+        result = search_web(question)
+"""
+
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from functools import lru_cache
+from contextlib import contextmanager
+
+ENV_VAR = "INSTRUMENTATION"
+DEFAULT_TRACE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "traces.jsonl")
+
+# Upper bounds of the latency histogram, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Innermost open span, whether opened by span() or by a LangChain run
+_current_span = contextvars.ContextVar("instrumentation_span", default=None)
+
+
+class Span:
+    """One timed step of a trace"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start", "duration",
+                 "prompt_tokens", "completion_tokens", "cache_hit", "error", "attributes", "_started", "_previous")
+
+    def __init__(self, name, kind, parent=None, attributes=None):
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.kind = kind
+        self.start = time.time()
+        self.duration = None
+        self.prompt_tokens = self.completion_tokens = None
+        self.cache_hit = None
+        self.error = None
+        self.attributes = attributes or {}
+        self._started = time.perf_counter()
+        self._previous = None
+
+    def as_dict(self) -> dict:
+        record = {
+            "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+            "name": self.name, "kind": self.kind, "start": self.start, "duration": self.duration,
+        }
+        if self.prompt_tokens is not None or self.completion_tokens is not None:
+            record["prompt_tokens"] = self.prompt_tokens or 0
+            record["completion_tokens"] = self.completion_tokens or 0
+        if self.cache_hit is not None:
+            record["cache_hit"] = self.cache_hit
+        if self.error:
+            record["error"] = self.error
+        if self.attributes:
+            record["attributes"] = self.attributes
+        return record
+
+
+class _Series:
+    __slots__ = ("count", "errors", "total", "buckets", "prompt_tokens", "completion_tokens", "cache_hits", "cache_misses")
+
+    def __init__(self):
+        self.count = self.errors = 0
+        self.total = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.prompt_tokens = self.completion_tokens = 0
+        self.cache_hits = self.cache_misses = 0
+
+
+class Tracer:
+    """Collects finished spans into metrics and an optional JSONL trace file"""
+
+    def __init__(self, trace_path=None):
+        self.trace_path = trace_path
+        self._series = {}
+        self._runs = {}
+        self._lock = threading.Lock()
+        self._file = None
+        if trace_path:
+            os.makedirs(os.path.dirname(trace_path) or ".", exist_ok=True)
+            self._file = open(trace_path, "a", encoding="utf-8", buffering=1)
+
+    def start(self, name, kind, parent=None, attributes=None) -> Span:
+        return Span(name, kind, parent if parent is not None else _current_span.get(), attributes)
+
+    def finish(self, span, error=None):
+        span.duration = time.perf_counter() - span._started
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error)
+        line = json.dumps(span.as_dict(), default=str) if self._file else None
+        with self._lock:
+            series = self._series.get((span.name, span.kind))
+            if series is None:
+                series = self._series[(span.name, span.kind)] = _Series()
+            series.count += 1
+            series.total += span.duration
+            for i, bound in enumerate(BUCKETS):
+                if span.duration <= bound:
+                    series.buckets[i] += 1
+                    break
+            if span.error:
+                series.errors += 1
+            if span.cache_hit is True:
+                series.cache_hits += 1
+            elif span.cache_hit is False:
+                series.cache_misses += 1
+            # Cached responses cost nothing, so only real calls count toward token usage
+            if not span.cache_hit:
+                series.prompt_tokens += span.prompt_tokens or 0
+                series.completion_tokens += span.completion_tokens or 0
+            if line is not None:
+                self._file.write(line + "\n")
+
+    # LangChain run ids map onto spans so nested runs get the right parent
+
+    def start_run(self, run_id, parent_run_id, name, kind, attributes=None) -> Span:
+        with self._lock:
+            parent = self._runs.get(parent_run_id) if parent_run_id else None
+        span = self.start(name, kind, parent, attributes)
+        with self._lock:
+            self._runs[run_id] = span
+        # Callbacks run inline, so this is the caller's context
+        span._previous = _current_span.get()
+        _current_span.set(span)
+        return span
+
+    def finish_run(self, run_id, error=None):
+        with self._lock:
+            span = self._runs.pop(run_id, None)
+        if span is not None:
+            if _current_span.get() is span:
+                _current_span.set(span._previous)
+            self.finish(span, error)
+        return span
+
+    def run_span(self, run_id):
+        with self._lock:
+            return self._runs.get(run_id)
+
+    def snapshot(self) -> dict:
+        """Aggregated metrics per (name, kind)"""
+        with self._lock:
+            return {
+                key: {
+                    "count": s.count, "errors": s.errors, "seconds": s.total,
+                    "prompt_tokens": s.prompt_tokens, "completion_tokens": s.completion_tokens,
+                    "cache_hits": s.cache_hits, "cache_misses": s.cache_misses,
+                }
+                for key, s in self._series.items()
+            }
+
+    def prometheus_text(self) -> str:
+        """Metrics in the Prometheus text exposition format"""
+        lines = [
+            "# HELP step_duration_seconds Latency of each traced step",
+            "# TYPE step_duration_seconds histogram",
+        ]
+        with self._lock:
+            series = sorted(self._series.items())
+            for (name, kind), s in series:
+                labels = f'name="{_escape(name)}",kind="{kind}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS, s.buckets):
+                    cumulative += count
+                    lines.append(f'step_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'step_duration_seconds_bucket{{{labels},le="+Inf"}} {s.count}')
+                lines.append(f"step_duration_seconds_sum{{{labels}}} {s.total:.6f}")
+                lines.append(f"step_duration_seconds_count{{{labels}}} {s.count}")
+            lines += ["# HELP step_errors_total Traced steps that raised", "# TYPE step_errors_total counter"]
+            lines += [f'step_errors_total{{name="{_escape(n)}",kind="{k}"}} {s.errors}' for (n, k), s in series]
+            lines += ["# HELP llm_tokens_total Tokens used by LLM calls, excluding cache hits", "# TYPE llm_tokens_total counter"]
+            for (name, kind), s in series:
+                if kind == "llm":
+                    lines.append(f'llm_tokens_total{{name="{_escape(name)}",type="prompt"}} {s.prompt_tokens}')
+                    lines.append(f'llm_tokens_total{{name="{_escape(name)}",type="completion"}} {s.completion_tokens}')
+            lines += ["# HELP llm_cache_lookups_total Response cache lookups", "# TYPE llm_cache_lookups_total counter"]
+            for (name, kind), s in series:
+                if s.cache_hits or s.cache_misses:
+                    lines.append(f'llm_cache_lookups_total{{name="{_escape(name)}",result="hit"}} {s.cache_hits}')
+                    lines.append(f'llm_cache_lookups_total{{name="{_escape(name)}",result="miss"}} {s.cache_misses}')
+        lines += _scheduler_metrics()
+        lines += _semantic_cache_metrics()
+        lines += _prompt_metrics()
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _scheduler_metrics():
+    import scheduler
+    if scheduler._scheduler is None:
+        return []
+    lines = [
+        "# HELP scheduler_queue_depth Calls waiting for a rate limit slot",
+        "# TYPE scheduler_queue_depth gauge",
+    ]
+    stats = scheduler._scheduler.stats()
+    rows = [(provider, level, values) for provider, levels in stats.items() for level, values in levels.items()]
+    for provider, level, values in rows:
+        lines.append(f'scheduler_queue_depth{{provider="{provider}",priority="{level}"}} {values["queue_depth"]}')
+    lines += ["# HELP scheduler_wait_seconds_avg Average wait for a slot", "# TYPE scheduler_wait_seconds_avg gauge"]
+    for provider, level, values in rows:
+        lines.append(f'scheduler_wait_seconds_avg{{provider="{provider}",priority="{level}"}} {values["avg_wait"]:.6f}')
+    for metric in ("retries", "rate_limited"):
+        lines += [f"# TYPE scheduler_{metric}_total counter"]
+        for provider, level, values in rows:
+            lines.append(f'scheduler_{metric}_total{{provider="{provider}",priority="{level}"}} {values[metric]}')
+    return lines
+
+
+def _semantic_cache_metrics():
+    import semantic_cache
+    if semantic_cache._semantic_cache is None:
+        return []
+    stats = semantic_cache._semantic_cache.stats()
+    lines = ["# HELP semantic_cache_lookups_total Semantic answer cache lookups", "# TYPE semantic_cache_lookups_total counter"]
+    for namespace, counts in stats["namespaces"].items():
+        lines.append(f'semantic_cache_lookups_total{{namespace="{namespace}",result="hit"}} {counts["hits"]}')
+        lines.append(f'semantic_cache_lookups_total{{namespace="{namespace}",result="miss"}} {counts["misses"]}')
+    lines += ["# TYPE semantic_cache_entries gauge", f"semantic_cache_entries {stats['entries']}"]
+    return lines
+
+
+def _prompt_metrics():
+    import prompts
+    report = prompts.prompt_report()
+    if not report:
+        return []
+    lines = ["# HELP prompt_tokens_total Prompt tokens before (raw) and after (sent) compaction",
+             "# TYPE prompt_tokens_total counter"]
+    for agent, stats in report.items():
+        lines.append(f'prompt_tokens_total{{agent="{agent}",stage="raw"}} {stats["raw_tokens"]}')
+        lines.append(f'prompt_tokens_total{{agent="{agent}",stage="sent"}} {stats["prompt_tokens"]}')
+    lines += ["# HELP prompt_prefix_tokens Static instruction prefix shared by an agent's prompts",
+              "# TYPE prompt_prefix_tokens gauge"]
+    lines += [f'prompt_prefix_tokens{{agent="{agent}"}} {stats["prefix_tokens"]}' for agent, stats in report.items()]
+    return lines
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    from clients import load_env
+    load_env()
+    value = os.getenv(ENV_VAR, "")
+    return value not in ("", "0", "false", "False")
+
+
+def get_tracer() -> Tracer:
+    """Process-wide tracer; writes JSONL to TRACE_PATH when instrumentation is on"""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _install_hook()
+                _tracer = Tracer(os.getenv("TRACE_PATH", DEFAULT_TRACE_PATH) if enabled() else None)
+    return _tracer
+
+
+def enable(trace_path=None):
+    """Turn instrumentation on for this process, optionally writing traces to `trace_path`"""
+    global _tracer
+    os.environ[ENV_VAR] = "1"
+    if trace_path:
+        os.environ["TRACE_PATH"] = trace_path
+    with _tracer_lock:
+        if _tracer is not None:
+            _tracer.close()
+        _tracer = None
+    return get_tracer()
+
+
+@contextmanager
+def span(name, kind="step", **attributes):
+    """Time the enclosed block as a child of the current span"""
+    if not enabled():
+        yield None
+        return
+    tracer = get_tracer()
+    current = tracer.start(name, kind, attributes=attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        tracer.finish(current, e)
+        raise
+    else:
+        tracer.finish(current)
+    finally:
+        _current_span.reset(token)
+
+
+def record_cache_lookup(hit: bool):
+    """Record a response cache lookup on the LLM call being traced
+
+    Completion LLMs check the cache before their run starts, so outside an
+    LLM span the lookup is recorded as a `response_cache` span of its own.
+    """
+    if not enabled():
+        return
+    current = _current_span.get()
+    if current is not None and current.kind == "llm":
+        current.cache_hit = hit
+        return
+    tracer = get_tracer()
+    lookup = tracer.start("response_cache", "cache")
+    lookup.cache_hit = hit
+    tracer.finish(lookup)
+
+
+_hook_installed = False
+
+
+def _install_hook():
+    # LangChain adds a TracingCallbackHandler to every run while ENV_VAR is set
+    global _hook_installed
+    if _hook_installed:
+        return
+    from langchain_core.tracers.context import register_configure_hook
+    register_configure_hook(contextvars.ContextVar("instrumentation_handler", default=None), True, _handler_class(), ENV_VAR)
+    _hook_installed = True
+
+
+def _run_name(serialized, kwargs, default):
+    if kwargs.get("name"):
+        return kwargs["name"]
+    serialized = serialized or {}
+    return serialized.get("name") or (serialized.get("id") or [default])[-1]
+
+
+def _usage(response):
+    """(prompt_tokens, completion_tokens) reported by the provider, if any"""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return usage.get("prompt_tokens"), usage.get("completion_tokens")
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if metadata:
+                return metadata.get("input_tokens"), metadata.get("output_tokens")
+    return None, None
+
+
+@lru_cache(maxsize=None)
+def _handler_class():
+    # Built on first use so importing this module does not pull in langchain_core
+    from langchain_core.callbacks import BaseCallbackHandler
+    return type("TracingCallbackHandler", (_TracingCallbacks, BaseCallbackHandler), {})
+
+
+def __getattr__(name):
+    if name == "TracingCallbackHandler":
+        return _handler_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class _TracingCallbacks:
+    """Turns LangChain chain, LLM and tool runs into spans on the shared tracer"""
+
+    run_inline = True  # keep callbacks in the caller's context so cache lookups find their span
+
+    def __init__(self):
+        self.tracer = get_tracer()
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        self.tracer.start_run(run_id, parent_run_id, _run_name(serialized, kwargs, "chain"), "chain")
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self.tracer.finish_run(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self.tracer.finish_run(run_id, error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        self.tracer.start_run(run_id, parent_run_id, _run_name(serialized, kwargs, "tool"), "tool")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self.tracer.finish_run(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self.tracer.finish_run(run_id, error)
+
+    def _start_llm(self, serialized, prompt_text, run_id, parent_run_id, kwargs):
+        current = self.tracer.start_run(run_id, parent_run_id, _run_name(serialized, kwargs, "llm"), "llm")
+        current.attributes["prompt_chars"] = len(prompt_text)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        self._start_llm(serialized, "".join(prompts), run_id, parent_run_id, kwargs)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        text = "".join(str(m.content) for batch in messages for m in batch)
+        self._start_llm(serialized, text, run_id, parent_run_id, kwargs)
+
+    def _end_llm(self, run_id, response=None, error=None):
+        current = self.tracer.run_span(run_id)
+        if current is None:
+            return
+        if response is not None:
+            prompt_tokens, completion_tokens = _usage(response)
+            if prompt_tokens is None:
+                # Streaming responses carry no usage; estimate at ~4 characters a token
+                text = "".join(g.text for generations in response.generations for g in generations)
+                prompt_tokens = current.attributes["prompt_chars"] // 4
+                completion_tokens = len(text) // 4
+                current.attributes["estimated_tokens"] = True
+            current.prompt_tokens, current.completion_tokens = prompt_tokens, completion_tokens
+        self.tracer.finish_run(run_id, error)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end_llm(run_id, response)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end_llm(run_id, error=error)
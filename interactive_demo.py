@@ -6,13 +6,14 @@ Run this script to test all agents interactively
 
 import os
 import sys
-from dotenv import load_dotenv
+from clients import load_env
 
 # Import our agents
 try:
-    from wikipedia_agent import ask_with_wikipedia
-    from serpapi_agent import ask_with_search
-    from memory_agent import ask_with_memory, show_memory
+    from wikipedia_agent import ask_with_wikipedia, astream_with_wikipedia
+    from serpapi_agent import ask_with_search, astream_with_search
+    from memory_agent import ask_with_memory, astream_with_memory, show_memory
+    from streaming import iter_sync
 except ImportError as e:
     print(f"Error importing agents: {e}")
     print("Make sure all agent files are in the same directory")
@@ -20,7 +21,7 @@ except ImportError as e:
 
 def check_environment():
     """Check if required environment variables are set"""
-    load_dotenv()
+    load_env()
     
     openai_key = os.getenv("OPENAI_API_KEY")
     serpapi_key = os.getenv("SERPAPI_API_KEY")
@@ -119,15 +120,20 @@ def interactive_mode(agent_type):
         
         try:
             if agent_type == "Wikipedia":
-                answer = ask_with_wikipedia(question)
+                stream = astream_with_wikipedia(question)
             elif agent_type == "SerpAPI":
-                answer = ask_with_search(question)
+                stream = astream_with_search(question)
             elif agent_type == "Memory":
-                answer = ask_with_memory(question)
+                stream = astream_with_memory(question)
             else:
-                answer = "Unknown agent type"
+                print("\n🤖 Answer: Unknown agent type")
+                continue
             
-            print(f"\n🤖 Answer: {answer}")
+            # Print tokens as they arrive instead of waiting for the full answer
+            print("\n🤖 Answer: ", end="", flush=True)
+            for text in iter_sync(stream):
+                print(text, end="", flush=True)
+            print()
             
         except Exception as e:
             print(f"\n❌ Error: {e}")
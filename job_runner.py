@@ -0,0 +1,273 @@
+"""
+Bulk generation jobs: restaurant names and/or name + menu for every row of a
+CSV or JSONL file, with bounded concurrency and resumable JSONL output
+
+    python job_runner.py pairs.csv results.jsonl --task names --concurrency 32
+    python job_runner.py pairs.csv results.jsonl --task both   # rerun to resume after a crash
+
+Input rows need a `cuisine_type` (or `cuisine`) column and, for names, an
+`atmosphere` column. Each finished row is appended to the output as one JSON
+line with its input row number, so the output file is also the checkpoint:
+rerunning with the same --task skips rows already written and retries rows
+that failed. When a row appears more than once, the last line wins (see
+load_results).
+"""
+
+import os
+import csv
+import json
+import time
+import asyncio
+import argparse
+
+from scheduler import BATCH, priority
+
+TASKS = ("names", "menu", "both")
+
+
+def read_rows(path):
+    """Yield (row number, row dict) from a CSV or JSONL file without loading it all"""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for number, row in enumerate(rows):
+            yield number, {str(key).strip().lower(): value for key, value in row.items() if key is not None}
+
+
+def count_rows(path) -> int:
+    return sum(1 for _ in read_rows(path))
+
+
+def row_inputs(row) -> dict:
+    """The generation inputs of a row, with blanks stripped"""
+    cuisine = (row.get("cuisine_type") or row.get("cuisine") or "").strip()
+    atmosphere = (row.get("atmosphere") or "").strip()
+    return {"cuisine_type": cuisine, "atmosphere": atmosphere}
+
+
+def load_results(path) -> dict:
+    """{row number: last record} from an output file, ignoring a torn final line"""
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            results[record["row"]] = record
+    return results
+
+
+def _truncate_torn_line(path):
+    # A crash mid-write leaves a partial last line; cut it so appends start on a fresh line
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) == b"\n":
+            return
+        position = size
+        while position > 0:
+            step = min(4096, position)
+            position -= step
+            f.seek(position)
+            block = f.read(step)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                f.truncate(position + newline + 1)
+                return
+        f.truncate(0)
+
+
+class Progress:
+    """Rows/sec and ETA, printed every `interval` seconds"""
+
+    def __init__(self, total, skipped, interval=5.0):
+        self.total = total
+        self.skipped = skipped
+        self.interval = interval
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self._printed = self.started
+
+    def update(self, failed):
+        self.done += 1
+        self.failed += failed
+        now = time.monotonic()
+        if now - self._printed >= self.interval:
+            self._printed = now
+            self.report()
+
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def report(self, final=False):
+        remaining = self.total - self.skipped - self.done
+        rate = self.rate()
+        eta = remaining / rate if rate > 0 else float("inf")
+        finished = self.skipped + self.done
+        percent = finished / self.total if self.total else 1.0
+        line = (f"{finished}/{self.total} rows ({percent:.1%})  {rate:.1f} rows/s  "
+                f"failed {self.failed}  ")
+        line += f"done in {time.monotonic() - self.started:.1f}s" if final else f"ETA {_duration(eta)}"
+        print(line, flush=True)
+
+
+def _duration(seconds) -> str:
+    if seconds == float("inf"):
+        return "--"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+
+async def generate(inputs, task="names", mode=None, unique=False) -> dict:
+    """Outputs of one row: `names` and/or `restaurant_name` with `menu_items`
+
+    With `unique`, names is a list holding only names not generated before.
+    """
+    output = {}
+    if task in ("names", "both"):
+        import restaurant_suggester
+        if not inputs["atmosphere"]:
+            raise ValueError("row has no atmosphere")
+        if unique:
+            output["names"] = await restaurant_suggester.asuggest_unique_restaurant_names(**inputs)
+        else:
+            response = await restaurant_suggester.get_chain().ainvoke(inputs)
+            output["names"] = response.content
+    if task in ("menu", "both"):
+        import app
+        response = await app.get_chain(mode).ainvoke({"cuisine": inputs["cuisine_type"]})
+        menu_items = response["menu_items"]
+        output["restaurant_name"] = response["restaurant_name"].strip()
+        # The two-step chain returns the menu as a message, the structured one as a list
+        output["menu_items"] = app.menu_item_list(getattr(menu_items, "content", menu_items))
+    return output
+
+
+async def _process(number, inputs, task, mode, unique, timeout) -> dict:
+    record = {"row": number, **inputs, "task": task, "error": None}
+    started = time.monotonic()
+    try:
+        if not inputs["cuisine_type"]:
+            raise ValueError("row has no cuisine")
+        record.update(await asyncio.wait_for(generate(inputs, task, mode, unique), timeout))
+    except asyncio.TimeoutError:
+        record["error"] = f"Timed out after {timeout}s"
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = round(time.monotonic() - started, 3)
+    return record
+
+
+async def run_job(input_path, output_path, task="names", concurrency=16, timeout=None, mode=None,
+                  unique=False, retry_failed=True, limit=None, progress_interval=5.0, fsync_interval=1.0):
+    """Process every row not already finished in `output_path`; returns a summary dict
+
+    Rows are read lazily and handed to `concurrency` workers through a
+    bounded queue, so memory stays flat for large files. All calls run at
+    batch priority behind interactive traffic.
+    """
+    if task not in TASKS:
+        raise ValueError(f"task must be one of {TASKS}, got {task!r}")
+
+    _truncate_torn_line(output_path)
+    finished = {
+        number: (record["cuisine_type"], record["atmosphere"])
+        for number, record in load_results(output_path).items()
+        if record.get("task") == task and not (retry_failed and record.get("error"))
+    }
+    total = count_rows(input_path)
+    if limit is not None:
+        total = min(total, limit)
+
+    def pending():
+        for number, row in read_rows(input_path):
+            if limit is not None and number >= limit:
+                break
+            inputs = row_inputs(row)
+            # Skip only if the row was done for this task from the same inputs
+            if finished.get(number) == (inputs["cuisine_type"], inputs["atmosphere"]):
+                continue
+            yield number, inputs
+
+    skipped = sum(1 for number in finished if limit is None or number < limit)
+    progress = Progress(total, min(skipped, total), progress_interval)
+    print(f"{total} rows, {progress.skipped} already done, {concurrency} workers", flush=True)
+
+    queue = asyncio.Queue(maxsize=concurrency * 4)
+    with open(output_path, "a", encoding="utf-8") as out:
+        last_sync = time.monotonic()
+
+        async def worker():
+            nonlocal last_sync
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                record = await _process(*item, task, mode, unique, timeout)
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                if time.monotonic() - last_sync >= fsync_interval:
+                    os.fsync(out.fileno())
+                    last_sync = time.monotonic()
+                progress.update(record["error"] is not None)
+
+        with priority(BATCH):
+            workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+            try:
+                for item in pending():
+                    await queue.put(item)
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                for task_ in workers:
+                    task_.cancel()
+                out.flush()
+                os.fsync(out.fileno())
+
+    progress.report(final=True)
+    return {"total": total, "skipped": progress.skipped, "processed": progress.done,
+            "failed": progress.failed, "rows_per_second": progress.rate()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate restaurant names and menus for a CSV/JSONL file")
+    parser.add_argument("input", help="CSV or JSONL with cuisine_type and atmosphere columns")
+    parser.add_argument("output", help="JSONL results; rerun with the same path to resume")
+    parser.add_argument("--task", choices=TASKS, default="names", help="names, menu (app.chain) or both")
+    parser.add_argument("--mode", choices=("two_step", "structured"), help="app.chain mode for menus")
+    parser.add_argument("--unique", action="store_true", help="skip names generated before (name_index.py)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds per row")
+    parser.add_argument("--limit", type=int, help="only the first N rows")
+    parser.add_argument("--no-retry-failed", action="store_true", help="keep failed rows on resume")
+    parser.add_argument("--progress-interval", type=float, default=5.0)
+    args = parser.parse_args()
+
+    from streaming import run_sync
+    try:
+        # The shared loop keeps pooled async connections usable
+        run_sync(run_job(
+            args.input, args.output, task=args.task, concurrency=args.concurrency, timeout=args.timeout,
+            mode=args.mode, unique=args.unique, retry_failed=not args.no_retry_failed, limit=args.limit,
+            progress_interval=args.progress_interval,
+        ))
+    except KeyboardInterrupt:
+        print("\nInterrupted; rerun the same command to resume")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,54 +1,338 @@
 import os
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
+import asyncio
+import threading
+from functools import lru_cache
+from collections import OrderedDict, deque
+from clients import load_env, pooled_client_kwargs
+from instrumentation import span
+from prompts import Section, build_prompt
+from tokens import count_tokens, truncate_tokens
 
 # Simple memory implementation
 class SimpleMemory:
-    def __init__(self, k=5):
+    """Last k turns of one conversation
+
+    Turns live in a ring buffer and the rendered context is updated as turns
+    are added or evicted, so reading it never rebuilds the whole string.
+
+    With `max_tokens` set, only the most recent turns that fit the budget are
+    kept. Turns that fall out are folded into a running summary by
+    `summarizer(summary, evicted_text)` in batches: they stay in the context
+    word for word until they add up to `summarize_tokens`, so the summarizer
+    runs once per batch rather than on every request once the window is full.
+    If the summarizer fails, the batch stays as it is and is tried again on
+    the next read.
+    """
+    def __init__(self, k=5, max_tokens=None, summarizer=None, summary_max_tokens=200, summarize_tokens=400):
         self.k = k
-        self.conversations = []
+        self.max_tokens = max_tokens
+        self.summarizer = summarizer
+        self.summary_max_tokens = summary_max_tokens
+        self.summarize_tokens = summarize_tokens
+        self.summary = ""
+        # Turns folded into the summary, counted from the session's first turn
+        self.summary_seq = 0
+        self.conversations = deque()
+        self._rendered = deque()
+        self._turn_tokens = deque()
+        self._tokens = 0
+        self._buffer = ""
+        self._evicted = []
+        self._evicted_tokens = 0
+        self._summarizing = False
+        self._lock = threading.Lock()
     
     def save_context(self, inputs, outputs):
-        self.conversations.append({"input": inputs["input"], "output": outputs["output"]})
-        if len(self.conversations) > self.k:
-            self.conversations.pop(0)
+        turn = f"Human: {inputs['input']}\nAI: {outputs['output']}"
+        tokens = count_tokens(turn) if self.max_tokens is not None else 0
+        with self._lock:
+            self.conversations.append({"input": inputs["input"], "output": outputs["output"]})
+            self._rendered.append(turn)
+            self._turn_tokens.append(tokens)
+            self._tokens += tokens
+            self._buffer = f"{self._buffer}\n{turn}" if self._buffer else turn
+            
+            while len(self._rendered) > self.k or (
+                self.max_tokens is not None and self._rendered and self._tokens > self.max_tokens
+            ):
+                self._evict_oldest()
+    
+    def _evict_oldest(self):
+        # Drop the oldest turn and the newline that separated it
+        turn = self._rendered.popleft()
+        self.conversations.popleft()
+        tokens = self._turn_tokens.popleft()
+        self._tokens -= tokens
+        self._buffer = self._buffer[len(turn) + 1:]
+        if self.summarizer is not None:
+            self._evicted.append(turn)
+            self._evicted_tokens += tokens if self.max_tokens is not None else count_tokens(turn)
+    
+    def restore(self, turns, summary="", summary_seq=0):
+        """Refill an empty memory from a stored summary and the logged (input, output) turns after it
+
+        Turns that don't fit the window are pending for the next summary,
+        as they were in the process that logged them.
+        """
+        for input_text, output_text in turns:
+            self.save_context({"input": input_text}, {"output": output_text})
+        self.summary = summary
+        self.summary_seq = summary_seq
+    
+    @property
+    def summary_state(self):
+        """(summary, summary_seq), read together"""
+        with self._lock:
+            return self.summary, self.summary_seq
     
     @property
     def buffer(self):
-        return "\n".join([f"Human: {conv['input']}\nAI: {conv['output']}" for conv in self.conversations])
+        return self._buffer
+    
+    @property
+    def size(self):
+        """Characters held by this memory"""
+        return len(self._buffer) + len(self.summary) + sum(len(turn) + 1 for turn in self._evicted)
     
     def get_context(self):
-        return self.buffer
+        with self._lock:
+            batch = None
+            if self._evicted_tokens >= self.summarize_tokens and not self._summarizing:
+                batch, summary, self._summarizing = list(self._evicted), self.summary, True
+        if batch is not None:
+            # The summarizer may call the LLM, so the lock is not held; readers meanwhile see the turns in full
+            try:
+                summary = truncate_tokens(self.summarizer(summary, "\n".join(batch)).strip(), self.summary_max_tokens)
+            except Exception:
+                # Housekeeping must not fail the request; the batch stays and is tried again on a later call
+                batch = None
+            finally:
+                with self._lock:
+                    self._summarizing = False
+        if batch is not None:
+            with self._lock:
+                self.summary = summary
+                self.summary_seq += len(batch)
+                del self._evicted[:len(batch)]
+                self._evicted_tokens = sum(count_tokens(turn) for turn in self._evicted)
+        with self._lock:
+            parts = [f"Summary of earlier conversation: {self.summary}"] if self.summary else []
+            parts += self._evicted
+            if self._buffer:
+                parts.append(self._buffer)
+            return "\n".join(parts)
 
-load_dotenv()
+class SessionMemoryStore:
+    """Thread-safe SimpleMemory per session id
 
-# Initialize LLM
-api_key = os.getenv("OPENAI_API_KEY")
-llm = ChatOpenAI(temperature=0, openai_api_key=api_key)
+    Idle sessions are evicted least-recently-used first once there are more
+    than `max_sessions` of them or their contexts exceed `max_chars`.
 
-# Initialize memory
-memory = SimpleMemory(k=5)
+    With a MemoryLog as `log`, every turn is also written to disk. Sessions
+    missing from memory (after a restart or an eviction) are reloaded from
+    the log, and a session another process has written to since is reloaded
+    before its context is read.
+    """
+    def __init__(self, k=5, max_sessions=10000, max_chars=50_000_000, log=None, **memory_options):
+        self.k = k
+        self.max_sessions = max_sessions
+        self.max_chars = max_chars
+        self.log = log
+        self.memory_options = memory_options
+        self._sessions = OrderedDict()
+        self._sizes = {}
+        self._seqs = {}
+        self._chars = 0
+        self._lock = threading.Lock()
+    
+    def _get(self, session_id, create=True):
+        with self._lock:
+            memory = self._sessions.get(session_id)
+            if memory is not None:
+                self._sessions.move_to_end(session_id)
+                return memory
+        seq, memory = self._load(session_id) if self.log is not None else (0, None)
+        if memory is None and not create:
+            return None
+        with self._lock:
+            current = self._sessions.get(session_id)
+            if current is not None:
+                memory = current
+            else:
+                memory = self._sessions[session_id] = memory or SimpleMemory(k=self.k, **self.memory_options)
+                self._seqs[session_id] = seq
+            self._sessions.move_to_end(session_id)
+            return memory
+    
+    def _load(self, session_id):
+        # The log read happens outside the store lock, so other sessions aren't held up
+        # Without a summarizer nothing is pending outside the window, so the last k turns are enough
+        limit = None if self.memory_options.get("summarizer") else self.k
+        seq, summary, turns = self.log.load(session_id, self.k, limit)
+        if not seq:
+            return 0, None
+        memory = SimpleMemory(k=self.k, **self.memory_options)
+        memory.restore(turns, summary, seq - len(turns))
+        return seq, memory
+    
+    def _reload(self, session_id):
+        seq, memory = self._load(session_id)
+        with self._lock:
+            if session_id in self._sessions and memory is not None:
+                self._sessions[session_id] = memory
+                self._seqs[session_id] = seq
+        self._account(session_id, memory)
+        return memory
+    
+    def _account(self, session_id, memory):
+        with self._lock:
+            if self._sessions.get(session_id) is not memory:
+                return
+            size = memory.size
+            self._chars += size - self._sizes.get(session_id, 0)
+            self._sizes[session_id] = size
+            while len(self._sessions) > 1 and (
+                len(self._sessions) > self.max_sessions or self._chars > self.max_chars
+            ):
+                evicted_id, _ = self._sessions.popitem(last=False)
+                self._chars -= self._sizes.pop(evicted_id, 0)
+                self._seqs.pop(evicted_id, None)
+    
+    def save_context(self, session_id, inputs, outputs):
+        memory = self._get(session_id)
+        if self.log is not None:
+            # Log first: once it is on disk the turn survives a crash
+            seq = self.log.append(session_id, inputs["input"], outputs["output"])
+            with self._lock:
+                in_step = self._seqs.get(session_id) == seq - 1
+                if in_step:
+                    self._seqs[session_id] = seq
+            if not in_step:
+                # Another process wrote to this session in between; the log has the full picture
+                self._reload(session_id)
+                return
+        memory.save_context(inputs, outputs)
+        self._account(session_id, memory)
+    
+    def get_context(self, session_id):
+        memory = self._get(session_id, create=False)
+        if memory is None:
+            return ""
+        if self.log is not None and self.log.last_seq(session_id) != self._seqs.get(session_id):
+            memory = self._reload(session_id)
+            if memory is None:
+                # Cleared by another process
+                self._forget(session_id)
+                return ""
+        # Summarizing may call the LLM, so no store lock is held
+        summary_seq = memory.summary_seq
+        context = memory.get_context()
+        summary, new_summary_seq = memory.summary_state
+        if self.log is not None and new_summary_seq != summary_seq:
+            self.log.set_summary(session_id, summary, new_summary_seq)
+        self._account(session_id, memory)
+        return context
+    
+    def _forget(self, session_id):
+        with self._lock:
+            if self._sessions.pop(session_id, None) is not None:
+                self._chars -= self._sizes.pop(session_id, 0)
+            self._seqs.pop(session_id, None)
+    
+    def clear(self, session_id):
+        self._forget(session_id)
+        if self.log is not None:
+            self.log.clear(session_id)
+    
+    def __contains__(self, session_id):
+        return session_id in self._sessions or (self.log is not None and self.log.last_seq(session_id) > 0)
+    
+    def __len__(self):
+        return len(self._sessions)
+
+# Clients are built on first use so importing this module stays fast
+
+@lru_cache(maxsize=None)
+def get_llm():
+    """Initialize LLM"""
+    from langchain_openai import ChatOpenAI
+    load_env()
+    api_key = os.getenv("OPENAI_API_KEY")
+    return ChatOpenAI(temperature=0, openai_api_key=api_key, **pooled_client_kwargs())
+
+def summarize_turns(summary: str, turns: str) -> str:
+    """Fold turns that fell out of the memory window into the running summary"""
+    prompt = (
+        "Update the running summary of a conversation with the turns below. "
+        "Keep names, facts and preferences the human shared. "
+        "Reply with the summary only, in at most 100 words.\n\n"
+        f"Current summary:\n{summary or '(none)'}\n\nTurns to add:\n{turns}"
+    )
+    return get_llm().invoke(prompt).content
+
+@lru_cache(maxsize=None)
+def get_memory_store():
+    """Initialize memory: per session, the last 5 turns within a token budget, logged to disk"""
+    from memory_log import get_memory_log
+    load_env()
+    return SessionMemoryStore(
+        k=5,
+        log=get_memory_log(),
+        max_tokens=int(os.getenv("MEMORY_MAX_TOKENS", "1000")),
+        summarize_tokens=int(os.getenv("MEMORY_SUMMARIZE_TOKENS", "400")),
+        summarizer=summarize_turns
+    )
 
-def ask_with_memory(question: str) -> str:
+_LAZY_ATTRIBUTES = {"llm": get_llm, "memory_store": get_memory_store}
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+DEFAULT_SESSION = "default"
+
+# Room for the memory window (MEMORY_MAX_TOKENS) plus its summary; the newest turns are kept if it overflows
+MEMORY_CONTEXT_TOKENS = 1500
+
+def build_memory_prompt(question: str, session_id: str = DEFAULT_SESSION) -> str:
+    """Build a prompt that includes the conversation so far"""
+    with span("memory.context", kind="memory"):
+        context = get_memory_store().get_context(session_id)
+    # Turns repeat themselves on purpose, so they are budgeted but not compacted
+    section = Section("Previous conversation", context, MEMORY_CONTEXT_TOKENS, fit="recent", compact=False)
+    return build_prompt("memory", "", [section], question, "Human: {question}\nAI:")
+
+def ask_with_memory(question: str, session_id: str = DEFAULT_SESSION) -> str:
     """Ask a question with conversation memory"""
-    context = memory.get_context()
-    if context:
-        prompt = f"Previous conversation:\n{context}\n\nHuman: {question}\nAI:"
-    else:
-        prompt = f"Human: {question}\nAI:"
-    
-    response = llm.invoke(prompt)
-    answer = response.content
+    with span("ask_with_memory", kind="agent"):
+        prompt = build_memory_prompt(question, session_id)
+        response = get_llm().invoke(prompt)
+        answer = response.content
+        
+        # Save to memory
+        with span("memory.save", kind="memory"):
+            get_memory_store().save_context(session_id, {"input": question}, {"output": answer})
+        return answer
+
+async def astream_with_memory(question: str, session_id: str = DEFAULT_SESSION):
+    """Stream an answer with conversation memory, saving it once complete"""
+    # Reading and saving memory may hit the SQLite log or the summarizer, so they stay off the event loop
+    prompt = await asyncio.to_thread(build_memory_prompt, question, session_id)
+    parts = []
+    async for chunk in get_llm().astream(prompt):
+        parts.append(chunk.content)
+        yield chunk.content
     
     # Save to memory
-    memory.save_context({"input": question}, {"output": answer})
-    return answer
+    await asyncio.to_thread(get_memory_store().save_context, session_id, {"input": question}, {"output": "".join(parts)})
 
-def show_memory():
+def show_memory(session_id: str = DEFAULT_SESSION):
     """Display current memory buffer"""
+    context = get_memory_store().get_context(session_id)
     print("\n" + "="*50)
     print("CONVERSATION HISTORY:")
-    print(memory.buffer if memory.buffer else "No conversation history yet.")
+    print(context if context else "No conversation history yet.")
     print("="*50)
 
 if __name__ == "__main__":
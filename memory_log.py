@@ -0,0 +1,232 @@
+"""
+Durable conversation memory: an append-only SQLite log of turns in WAL mode
+Every saved turn is one insert, so a crash loses at most the turn being
+written. Turns are numbered per session and indexed on (session, seq), and
+each session records how far its summary reaches, so reloading a session
+reads only the turns the summary does not cover, no matter how long the log
+is. Several processes can share one log file. A background thread compacts
+old turns away.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+
+DEFAULT_LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "memory.sqlite")
+
+
+class MemoryLog:
+    """Append-only turn log with per-session summaries
+
+    Compaction keeps the last `keep_turns` turns of every session and drops
+    sessions idle for longer than `retention` seconds (None keeps them).
+    """
+
+    def __init__(self, path=DEFAULT_LOG_PATH, keep_turns=50, retention=30 * 24 * 3600, compact_interval=300.0):
+        self.path = path
+        self.keep_turns = keep_turns
+        self.retention = retention
+        self.compact_interval = compact_interval
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Autocommit, with explicit BEGIN IMMEDIATE where a write needs to read first
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")  # durable across crashes; a power cut may lose the last commits
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS turns ("
+            "session TEXT NOT NULL, seq INTEGER NOT NULL, input TEXT NOT NULL, output TEXT NOT NULL, "
+            "created_at REAL NOT NULL, PRIMARY KEY (session, seq)) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session TEXT PRIMARY KEY, last_seq INTEGER NOT NULL, summary TEXT NOT NULL DEFAULT '', "
+            "updated_at REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at);"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")]
+        if "summary_seq" not in columns:
+            # NULL marks sessions logged before summaries recorded their reach
+            try:
+                self._conn.execute("ALTER TABLE sessions ADD COLUMN summary_seq INTEGER")
+            except sqlite3.OperationalError:
+                pass  # another process added it first
+
+        self._compactor = None
+        if compact_interval:
+            self._compactor = threading.Thread(target=self._compact_loop, name="memory-log-compactor", daemon=True)
+            self._compactor.start()
+
+    def append(self, session_id, input_text, output_text) -> int:
+        """Log one turn and return its sequence number within the session"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT last_seq FROM sessions WHERE session = ?", (session_id,)).fetchone()
+                seq = row[0] + 1 if row else 1
+                self._conn.execute(
+                    "INSERT INTO turns (session, seq, input, output, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (session_id, seq, input_text, output_text, now),
+                )
+                self._conn.execute(
+                    "INSERT INTO sessions (session, last_seq, summary_seq, updated_at) VALUES (?, ?, 0, ?) "
+                    "ON CONFLICT (session) DO UPDATE SET last_seq = excluded.last_seq, updated_at = excluded.updated_at",
+                    (session_id, seq, now),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return seq
+
+    def load(self, session_id, k, limit=None):
+        """(last seq, summary, turns the summary doesn't cover) of a session in one consistent read
+
+        With `limit`, at most the last `limit` of those turns. Sessions logged
+        before summaries recorded their reach get their last k turns. Seq is
+        0 if the session is unknown.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                row = self._conn.execute(
+                    "SELECT last_seq, summary, summary_seq FROM sessions WHERE session = ?", (session_id,)
+                ).fetchone()
+                last_seq, summary, summary_seq = row if row else (0, "", 0)
+                if summary_seq is None:
+                    summary_seq = last_seq - k
+                turns = self._conn.execute(
+                    "SELECT input, output FROM turns WHERE session = ? AND seq > ? ORDER BY seq DESC LIMIT ?",
+                    (session_id, summary_seq, -1 if limit is None else limit),
+                ).fetchall()
+            finally:
+                self._conn.execute("COMMIT")
+        turns.reverse()
+        return last_seq, summary, turns
+
+    def last_seq(self, session_id) -> int:
+        """Sequence number of the session's latest turn, 0 if it has none"""
+        with self._lock:
+            row = self._conn.execute("SELECT last_seq FROM sessions WHERE session = ?", (session_id,)).fetchone()
+        return row[0] if row else 0
+
+    def set_summary(self, session_id, summary, summary_seq):
+        """Store the running summary of turns that left the memory window, up to turn `summary_seq`"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE sessions SET summary = ?, summary_seq = ?, updated_at = ? WHERE session = ?",
+                (summary, summary_seq, time.time(), session_id),
+            )
+
+    def clear(self, session_id):
+        self._write_batch([
+            ("DELETE FROM turns WHERE session = ?", (session_id,)),
+            ("DELETE FROM sessions WHERE session = ?", (session_id,)),
+        ])
+
+    def compact(self, batch_size=500) -> int:
+        """Drop turns beyond `keep_turns` per session and idle sessions; returns turns removed
+
+        Deletes about `batch_size` turns (or idle sessions) per transaction,
+        so appends from this and other processes are only held up for a
+        moment at a time.
+        """
+        cutoff = time.time() - self.retention if self.retention is not None else None
+        with self._lock:
+            idle = [] if cutoff is None else [row[0] for row in self._conn.execute(
+                "SELECT session FROM sessions WHERE updated_at < ?", (cutoff,)
+            )]
+            # (session, first seq, last seq to drop) for sessions with turns past the limit
+            long = self._conn.execute(
+                "SELECT session, (SELECT MIN(seq) FROM turns WHERE turns.session = sessions.session), last_seq - ? "
+                "FROM sessions WHERE last_seq > ?", (self.keep_turns, self.keep_turns)
+            ).fetchall()
+
+        removed = 0
+        for start in range(0, len(idle), batch_size):
+            batch = idle[start:start + batch_size]
+            marks = ",".join("?" * len(batch))
+            # Checked again inside the transaction: a session may have come back since
+            still_idle = f"SELECT session FROM sessions WHERE session IN ({marks}) AND updated_at < ?"
+            removed += self._write_batch([
+                (f"DELETE FROM turns WHERE session IN ({still_idle})", (*batch, cutoff)),
+                (f"DELETE FROM sessions WHERE session IN ({marks}) AND updated_at < ?", (*batch, cutoff)),
+            ])
+        statements, rows = [], 0
+        for session, first, upto in long:
+            if first is None or first > upto:
+                continue
+            # Long sessions go in slices, so no single transaction holds the lock for long
+            for end in [*range(first + batch_size - 1, upto, batch_size), upto]:
+                statements.append(("DELETE FROM turns WHERE session = ? AND seq <= ?", (session, end)))
+                rows += min(batch_size, end - first + 1)
+                first = end + 1
+                if rows >= batch_size:
+                    removed += self._write_batch(statements)
+                    statements, rows = [], 0
+        if statements:
+            removed += self._write_batch(statements)
+        with self._lock:
+            # Fold the WAL back into the database so it doesn't grow without bound
+            self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        return removed
+
+    def _write_batch(self, statements) -> int:
+        # Turns deleted by one transaction of DELETE statements
+        removed = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    changed = self._conn.execute(sql, params).rowcount
+                    removed += changed if sql.startswith("DELETE FROM turns") else 0
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return removed
+
+    def _compact_loop(self):
+        while not self._closed.wait(self.compact_interval):
+            try:
+                self.compact()
+            except sqlite3.Error:
+                # Another process holding the write lock just means trying again next round
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            turns = self._conn.execute("SELECT COUNT(*) FROM turns").fetchone()[0]
+            sessions = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {"turns": turns, "sessions": sessions, "path": self.path}
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            self._conn.close()
+
+
+_memory_log = None
+_memory_log_lock = threading.Lock()
+
+
+def get_memory_log():
+    """Shared log configured from MEMORY_LOG_PATH; None when MEMORY_LOG=0"""
+    global _memory_log
+    if _memory_log is None:
+        with _memory_log_lock:
+            if _memory_log is None:
+                from clients import load_env
+                load_env()
+                if os.getenv("MEMORY_LOG", "1") in ("0", "false", "False"):
+                    return None
+                retention = os.getenv("MEMORY_LOG_RETENTION")
+                _memory_log = MemoryLog(
+                    path=os.getenv("MEMORY_LOG_PATH", DEFAULT_LOG_PATH),
+                    keep_turns=int(os.getenv("MEMORY_LOG_KEEP_TURNS", 50)),
+                    retention=float(retention) if retention else 30 * 24 * 3600,
+                )
+    return _memory_log
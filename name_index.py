@@ -0,0 +1,286 @@
+"""
+Index of every restaurant name generated so far, for deduplication
+Exact repeats are caught by a 64-bit hash of the normalized name, near
+repeats ("Golden Fork" / "The Golden Forks") by MinHash signatures over
+character trigrams with LSH banding. Hashes and signatures live in compact
+NumPy arrays (about 140 bytes a name), so millions of names fit in memory,
+and the index is saved to disk as a NumPy archive.
+"""
+
+import os
+import re
+import time
+import zlib
+import atexit
+import hashlib
+import threading
+import unicodedata
+
+import numpy as np
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "names.npz")
+DEFAULT_THRESHOLD = 0.65
+PERMUTATIONS = 32
+BANDS = 8  # 4 signature values per band, packed into one 64-bit key
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240611)  # fixed seed, so signatures stay comparable across runs
+_A = _rng.integers(1, _PRIME, PERMUTATIONS, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, PERMUTATIONS, dtype=np.uint64)
+_BAND_SALTS = _rng.integers(0, 1 << 63, BANDS, dtype=np.uint64)
+
+_MARKER = re.compile(r"^\s*(?:\d+\s*[.)]|[-*•])\s*")
+# "Name - a cozy spot", "Name: because...", "Name (meaning ...)"
+_DESCRIPTION = re.compile(r"\s+[-–—]\s+|:\s|\s+\(")
+_NON_WORD = re.compile(r"[^\w]+")
+MAX_NAME_LENGTH = 60
+# Weight of each offered name in the running acceptance rate
+ACCEPTANCE_WEIGHT = 0.05
+
+
+def parse_names(text: str) -> list:
+    """Names from an LLM list response, without markers, markdown or descriptions"""
+    lines = [line for line in text.splitlines() if line.strip()]
+    if any(_MARKER.match(line) for line in lines):
+        # Numbered or bulleted: everything else is preamble or commentary
+        lines = [line for line in lines if _MARKER.match(line)]
+    elif len(lines) == 1:
+        lines = lines[0].split(",")
+
+    names = []
+    for line in lines:
+        name = _MARKER.sub("", line).replace("**", "").replace("__", "").strip()
+        if name.endswith(":"):
+            continue
+        name = _DESCRIPTION.split(name, 1)[0].strip(" \t\"'“”‘’*.")
+        if name and len(name) <= MAX_NAME_LENGTH:
+            names.append(name)
+    return names
+
+
+def normalize_name(name: str) -> str:
+    """Case, accents, punctuation, "&" and a leading "The" don't make a name new"""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c)).casefold()
+    name = name.replace("&", " and ").replace("'", "").replace("’", "")
+    name = _NON_WORD.sub(" ", name).strip()
+    return name[4:] if name.startswith("the ") else name
+
+
+def name_hash(normalized: str) -> int:
+    return int.from_bytes(hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def signature(normalized: str) -> np.ndarray:
+    """MinHash of the name's character trigrams, 16 bits per permutation"""
+    padded = f" {normalized} "
+    shingles = {padded[i:i + 3] for i in range(max(1, len(padded) - 2))}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    hashes %= np.uint64(_PRIME)
+    values = (hashes[:, None] * _A + _B) % np.uint64(_PRIME)
+    return (values.min(axis=0) & np.uint64(0xFFFF)).astype(np.uint16)
+
+
+def _band_keys(signatures: np.ndarray) -> np.ndarray:
+    # 32 uint16 values per row viewed as 8 uint64s, one per band, salted so all bands share one
+    # sorted array, then folded to 32 bits; the odd collision only adds a candidate to verify
+    keys = np.ascontiguousarray(signatures).view(np.uint64) ^ _BAND_SALTS
+    return ((keys >> np.uint64(32)) ^ keys).astype(np.uint32)
+
+
+class NameIndex:
+    """Thread-safe set of names with near-duplicate lookup
+
+    A name is a duplicate when its normalized form was seen before, or when
+    the MinHash estimate of its trigram Jaccard similarity to an indexed
+    name reaches `threshold`. New names go to a small in-memory tail that
+    is merged into the sorted arrays once it grows, so adds stay cheap.
+    `acceptance` follows the recent share of offered names that were new.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, path=None, save_interval=30.0):
+        self.threshold = threshold
+        self.path = path
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._saved_at = time.monotonic()
+        self._reset()
+        if path and os.path.exists(path):
+            self._load()
+
+    def _reset(self):
+        # Empty arrays and tail; the lock and settings stay as they are
+        self.acceptance = 1.0
+        self._signatures = np.zeros((1024, PERMUTATIONS), dtype=np.uint16)
+        self._size = 0
+        # Merged part: sorted hashes, and sorted band keys with the row each came from
+        self._hashes = np.zeros(0, dtype=np.uint64)
+        self._bands = np.zeros(0, dtype=np.uint32)
+        self._band_rows = np.zeros(0, dtype=np.uint32)
+        self._merged = 0
+        # Tail added since the last merge
+        self._recent_hashes = set()
+        self._recent_bands = {}
+        self._dirty = False
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, name):
+        return self.match(name) is not None
+
+    def match(self, name: str):
+        """"exact" or "similar" if `name` duplicates an indexed name, else None"""
+        normalized = normalize_name(name)
+        with self._lock:
+            return self._match(name_hash(normalized), signature(normalized))
+
+    def add(self, name: str) -> bool:
+        """Index `name`; False (and nothing added) when it duplicates an indexed name"""
+        normalized = normalize_name(name)
+        if not normalized:
+            return False
+        h, sig = name_hash(normalized), signature(normalized)
+        with self._lock:
+            new = not self._match(h, sig)
+            if new:
+                self._append(h, sig)
+            self.acceptance += ACCEPTANCE_WEIGHT * (new - self.acceptance)
+            return new
+
+    def add_new(self, names, limit=None) -> list:
+        """Index and return the names that are new, in order, stopping after `limit`
+
+        Duplicates within `names` count too, so the second of two near
+        identical names is dropped. The index is saved once `save_interval`
+        seconds have passed since the last save.
+        """
+        new = []
+        for name in names:
+            if limit is not None and len(new) >= limit:
+                break
+            if self.add(name):
+                new.append(name)
+        if self.save_interval is not None and time.monotonic() - self._saved_at >= self.save_interval:
+            self.save()
+        return new
+
+    def _match(self, h, sig):
+        if h in self._recent_hashes or _contains(self._hashes, h):
+            return "exact"
+        keys = _band_keys(sig[None, :])[0]
+        rows = set()
+        for key in keys.tolist():
+            rows.update(self._recent_bands.get(key, ()))
+        starts = np.searchsorted(self._bands, keys, "left")
+        ends = np.searchsorted(self._bands, keys, "right")
+        for band in np.flatnonzero(ends > starts).tolist():
+            rows.update(self._band_rows[starts[band]:ends[band]].tolist())
+        if not rows:
+            return None
+        candidates = self._signatures[np.fromiter(rows, dtype=np.int64, count=len(rows))]
+        agreeing = np.count_nonzero(candidates == sig, axis=1).max()
+        return "similar" if agreeing >= self.threshold * PERMUTATIONS else None
+
+    def _append(self, h, sig):
+        if self._size == len(self._signatures):
+            grown = np.zeros((len(self._signatures) * 3 // 2, PERMUTATIONS), dtype=np.uint16)
+            grown[:self._size] = self._signatures
+            self._signatures = grown
+        row = self._size
+        self._signatures[row] = sig
+        self._size += 1
+        self._recent_hashes.add(h)
+        for key in _band_keys(sig[None, :])[0].tolist():
+            self._recent_bands.setdefault(key, []).append(row)
+        self._dirty = True
+        # Merging costs a sort of everything, so let the tail grow with the index
+        if len(self._recent_hashes) >= max(4096, self._merged // 8):
+            self._merge()
+
+    def _merge(self):
+        self._hashes = np.sort(np.concatenate([
+            self._hashes, np.fromiter(self._recent_hashes, dtype=np.uint64, count=len(self._recent_hashes))
+        ]))
+        self._build_bands()
+        self._recent_hashes = set()
+        self._recent_bands = {}
+
+    def _build_bands(self):
+        keys = _band_keys(self._signatures[:self._size]).ravel()
+        order = np.argsort(keys)
+        self._bands = keys[order]
+        self._band_rows = (order // BANDS).astype(np.uint32)
+        self._merged = self._size
+
+    def nbytes(self) -> int:
+        """Memory held by the merged arrays and signatures"""
+        return self._size * PERMUTATIONS * 2 + self._hashes.nbytes + self._bands.nbytes + self._band_rows.nbytes
+
+    def save(self):
+        """Write the index to `path` atomically"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            self._merge()
+            arrays = {"hashes": self._hashes.copy(), "signatures": self._signatures[:self._size].copy()}
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, self.path)
+
+    def _load(self):
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                hashes, signatures = data["hashes"], data["signatures"]
+            if signatures.ndim != 2 or signatures.shape[1] != PERMUTATIONS:
+                return
+            self._signatures = np.zeros((max(1024, len(signatures) * 3 // 2), PERMUTATIONS), dtype=np.uint16)
+            self._signatures[:len(signatures)] = signatures
+            self._size = len(signatures)
+            self._hashes = np.sort(hashes.astype(np.uint64))
+            self._build_bands()
+        except (OSError, ValueError, KeyError):
+            # A corrupt or foreign file just means starting empty, and overwriting it on the next save
+            self._reset()
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+            self._dirty = True
+
+    def stats(self) -> dict:
+        return {"names": self._size, "bytes": self.nbytes(), "threshold": self.threshold, "acceptance": self.acceptance}
+
+
+def _contains(sorted_array, value) -> bool:
+    value = np.uint64(value)
+    i = np.searchsorted(sorted_array, value)
+    return i < len(sorted_array) and sorted_array[i] == value
+
+
+_name_index = None
+_name_index_lock = threading.Lock()
+
+
+def get_name_index() -> NameIndex:
+    """Shared index configured from NAME_INDEX_* settings, saved as names arrive and at exit"""
+    global _name_index
+    if _name_index is None:
+        with _name_index_lock:
+            if _name_index is None:
+                from clients import load_env
+                load_env()
+                index = NameIndex(
+                    threshold=float(os.getenv("NAME_INDEX_THRESHOLD", DEFAULT_THRESHOLD)),
+                    path=os.getenv("NAME_INDEX_PATH", DEFAULT_INDEX_PATH),
+                    save_interval=float(os.getenv("NAME_INDEX_SAVE_INTERVAL", "30")),
+                )
+                atexit.register(index.save)
+                _name_index = index
+    return _name_index
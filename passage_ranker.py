@@ -0,0 +1,100 @@
+"""
+Relevance-ranked passage extraction for tool output
+Splits retrieved text into passages, scores them against the question with
+BM25 and keeps the best ones that fit a size budget
+"""
+
+import re
+
+import numpy as np
+
+from tokens import count_tokens
+from wiki_index import STOPWORDS
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list:
+    """Lowercased keywords with stopwords and plural endings removed"""
+    words = []
+    for word in _WORD.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def split_passages(text: str, max_chars=300) -> list:
+    """Group consecutive sentences into passages of at most `max_chars`"""
+    passages = []
+    for block in re.split(r"\n\s*\n", text):
+        current = ""
+        for sentence in _SENTENCE_END.split(block):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            if current and len(current) + 1 + len(sentence) > max_chars:
+                passages.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}" if current else sentence
+        if current:
+            passages.append(current)
+    return passages
+
+
+def bm25_scores(query: str, passages: list, k1=1.5, b=0.75) -> np.ndarray:
+    """BM25 score of every passage for the query terms"""
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms or not passages:
+        return np.zeros(len(passages))
+
+    column = {term: i for i, term in enumerate(terms)}
+    tf = np.zeros((len(passages), len(terms)))
+    lengths = np.empty(len(passages))
+    for row, passage in enumerate(passages):
+        words = tokenize(passage)
+        lengths[row] = len(words)
+        for word in words:
+            i = column.get(word)
+            if i is not None:
+                tf[row, i] += 1
+
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log1p((len(passages) - df + 0.5) / (df + 0.5))
+    norm = k1 * (1 - b + b * lengths / max(lengths.mean(), 1.0))
+    return (idf * tf * (k1 + 1) / (tf + norm[:, None])).sum(axis=1)
+
+
+def top_passages(question: str, text: str, max_chars=500, max_tokens=None, passage_chars=250) -> str:
+    """Best passages of `text` for `question` within the budget, in original order
+
+    Falls back to the leading passages when nothing matches the question.
+    """
+    if len(text) <= max_chars and (max_tokens is None or count_tokens(text) <= max_tokens):
+        return text
+
+    passages = split_passages(text, min(passage_chars, max_chars))
+    scores = bm25_scores(question, passages)
+    if scores.any():
+        order = [i for i in np.argsort(-scores, kind="stable") if scores[i] > 0]
+    else:
+        order = range(len(passages))
+
+    chosen, used_chars, used_tokens = [], 0, 0
+    for i in order:
+        passage = passages[i]
+        extra = len(passage) + (5 if chosen else 0)
+        tokens = count_tokens(passage) if max_tokens is not None else 0
+        if used_chars + extra > max_chars or (max_tokens is not None and used_tokens + tokens > max_tokens):
+            continue
+        chosen.append(i)
+        used_chars += extra
+        used_tokens += tokens
+
+    if not chosen:
+        return text[:max_chars] + "..."
+    return " ... ".join(passages[i] for i in sorted(chosen))
@@ -0,0 +1,186 @@
+"""
+Prompt assembly for the agents
+Every prompt is laid out as fixed instructions, then the retrieved context,
+then the question. Tool output is compacted (URLs, boilerplate fields and
+repeated snippets dropped) and each section is held to its own token budget;
+that is where the savings come from. The instructions are a few dozen tokens,
+far below the smallest prefix providers cache (1024 tokens for OpenAI), so
+the fixed-first layout only pays off through prompt caching if they grow.
+Token counts before and after compaction are kept per agent; see
+prompt_report().
+"""
+
+import re
+import ast
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+
+from tokens import count_tokens, truncate_tokens
+
+# SerpAPI fields that only matter to a browser
+_BOILERPLATE_KEYS = re.compile(
+    r"(^|_)(link|links|url|thumbnail|favicon|logo|icon|image|images|position|id|kgmid|type|serpapi\w*|"
+    r"search_\w+|sitelinks|cached_page|about_this_result)$"
+)
+_URL = re.compile(r"^https?://\S+$")
+# Google's own notes, not content
+_BOILERPLATE_LINE = re.compile(r"^(read more|people also ask|see more)\b", re.I)
+_BOILERPLATE_TAIL = re.compile(r"\s*\b(missing|show results with):.*$", re.I)
+_NON_WORD = re.compile(r"\W+")
+# Lines this long or longer also count as repeats when another line contains them
+MIN_CONTAINED_CHARS = 20
+
+
+@dataclass(slots=True, frozen=True)
+class Section:
+    """One block of variable context in a prompt
+
+    `fit` says what to keep when the text is over `max_tokens`: "relevant"
+    passages for the question, the "recent" end or the "start". Only tool
+    output should be `compact`ed; a conversation may repeat itself on purpose.
+    """
+
+    title: str
+    text: str
+    max_tokens: int = None
+    fit: str = "relevant"
+    compact: bool = True
+
+
+@lru_cache(maxsize=1024)
+def _is_boilerplate(key):
+    return _BOILERPLATE_KEYS.search(key) is not None
+
+
+def _flatten(value, key=""):
+    # Lines of "key: value" text from parsed tool output, without boilerplate fields
+    if isinstance(value, dict):
+        for k, v in value.items():
+            if not _is_boilerplate(str(k)):
+                yield from _flatten(v, str(k))
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _flatten(item, key)
+    elif value is not None and str(value).strip():
+        text = str(value).strip()
+        if _URL.match(text):
+            return
+        label = key.replace("_", " ")
+        # Lists of snippets carry no useful key; "snippet: " on every line would only cost tokens
+        yield f"{label}: {text}" if label and label not in ("snippet", "snippets", "text") else text
+
+
+def compact_tool_output(text: str) -> str:
+    """Tool output as short lines, without URLs, boilerplate or repeated snippets
+
+    SerpAPI results arrive as the repr of a list or dict; they are parsed and
+    flattened. Other text is cleaned up line by line.
+    """
+    stripped = text.strip()
+    parsed = False
+    if stripped[:1] in "[{(":
+        try:
+            lines, parsed = list(_flatten(ast.literal_eval(stripped))), True
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            pass
+    if not parsed:
+        lines = stripped.splitlines()
+    kept, keys = [], []
+    for line in lines:
+        line = " ".join(line.split())
+        if parsed:
+            # Only in search snippets; an error message may well contain "missing:"
+            line = _BOILERPLATE_TAIL.sub("", line)
+        if not line or _BOILERPLATE_LINE.match(line):
+            continue
+        key = _NON_WORD.sub(" ", line.casefold()).strip()
+        if not key or key in keys:
+            continue
+        if len(key) >= MIN_CONTAINED_CHARS:
+            if any(key in seen for seen in keys):
+                continue
+            # A longer version of a line already kept replaces it
+            shorter = [i for i, seen in enumerate(keys) if len(seen) >= MIN_CONTAINED_CHARS and seen in key]
+            for i in reversed(shorter):
+                del kept[i], keys[i]
+        kept.append(line)
+        keys.append(key)
+    return "\n".join(kept)
+
+
+def fit_tokens(text: str, max_tokens: int, question: str = "", fit="relevant") -> str:
+    """Cut `text` down to `max_tokens`, keeping what `fit` asks for"""
+    if max_tokens is None or count_tokens(text) <= max_tokens:
+        return text
+    if fit == "relevant":
+        from passage_ranker import top_passages
+        text = top_passages(question, text, max_chars=len(text), max_tokens=max_tokens)
+    elif fit == "recent":
+        # Whole lines from the end, so the latest turns survive intact
+        kept, used = [], 0
+        for line in reversed(text.splitlines()):
+            used += count_tokens(line) + 1
+            if used > max_tokens:
+                break
+            kept.append(line)
+        text = "\n".join(reversed(kept))
+    return text if count_tokens(text) <= max_tokens else truncate_tokens(text, max_tokens)
+
+
+class PromptStats:
+    """Prompt tokens per agent, as the raw material would have cost and as sent"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._agents = {}
+
+    def record(self, agent, raw_tokens, prompt_tokens, prefix_tokens):
+        with self._lock:
+            stats = self._agents.setdefault(agent, {"calls": 0, "raw_tokens": 0, "prompt_tokens": 0, "prefix_tokens": 0})
+            stats["calls"] += 1
+            stats["raw_tokens"] += raw_tokens
+            stats["prompt_tokens"] += prompt_tokens
+            stats["prefix_tokens"] = prefix_tokens
+
+    def report(self) -> dict:
+        """{agent: calls, token totals before and after compaction, share compaction removed, instruction size}"""
+        with self._lock:
+            return {
+                agent: {**stats, "saved": 1 - stats["prompt_tokens"] / stats["raw_tokens"] if stats["raw_tokens"] else 0.0}
+                for agent, stats in self._agents.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._agents.clear()
+
+
+prompt_stats = PromptStats()
+
+
+def prompt_report() -> dict:
+    return prompt_stats.report()
+
+
+def _layout(instructions, sections, question_line):
+    parts = [instructions] + [f"{title}:\n{text}" for title, text in sections if text] + [question_line]
+    return "\n\n".join(part for part in parts if part)
+
+
+def build_prompt(agent, instructions, sections, question, question_format="Question: {question}") -> str:
+    """Instructions, then each non-empty section within its budget, then the question
+
+    `instructions` is the same on every call and may be empty. The question
+    goes last because it always differs.
+    """
+    fitted = []
+    for section in sections:
+        text = compact_tool_output(section.text) if section.compact else section.text.strip()
+        fitted.append((section.title, fit_tokens(text, section.max_tokens, question, section.fit)))
+    question_line = question_format.format(question=question)
+    prompt = _layout(instructions, fitted, question_line)
+
+    raw = _layout(instructions, [(section.title, section.text) for section in sections], question_line)
+    prompt_stats.record(agent, count_tokens(raw), count_tokens(prompt), count_tokens(instructions))
+    return prompt
@@ -0,0 +1,164 @@
+"""
+Persistent response cache for LangChain LLM calls
+Two tiers: an in-memory LRU in front of an on-disk SQLite table
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import warnings
+from collections import OrderedDict
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+from instrumentation import record_cache_lookup
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "responses.sqlite")
+
+
+class ResponseCache(BaseCache):
+    """Content-addressed cache keyed on prompt text and LLM settings
+
+    LangChain passes the model name, temperature and the other invocation
+    parameters as `llm_string`, so the same prompt sent to a different model
+    or temperature gets its own entry.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, memory_size=256, max_entries=10000, ttl=7 * 24 * 3600):
+        self.path = path
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(prompt: str, llm_string: str) -> str:
+        """Hash the prompt and LLM settings into a cache key"""
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def lookup(self, prompt: str, llm_string: str):
+        """Return cached generations or None on a miss"""
+        value = self._lookup(prompt, llm_string)
+        record_cache_lookup(value is not None)
+        return value
+
+    def _lookup(self, prompt: str, llm_string: str):
+        key = self.make_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or self._expired(row[1], now):
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            value = _deserialize(row[0])
+            self._remember(key, row[1], value)
+            self.hits += 1
+            self.disk_hits += 1
+            return value
+
+    def update(self, prompt: str, llm_string: str, return_val) -> None:
+        """Store generations in both tiers"""
+        key = self.make_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, return_val)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, dumps(return_val), now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def clear(self, **kwargs) -> None:
+        """Drop every cached response"""
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def _remember(self, key, created_at, value):
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now):
+        # Expired rows first, then least recently used rows over the size cap
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+def _deserialize(value: str):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return loads(value)
+
+
+_response_cache = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Shared cache instance configured from the environment"""
+    global _response_cache
+    if _response_cache is None:
+        ttl = os.getenv("RESPONSE_CACHE_TTL")
+        _response_cache = ResponseCache(
+            path=os.getenv("RESPONSE_CACHE_PATH", DEFAULT_CACHE_PATH),
+            ttl=float(ttl) if ttl else 7 * 24 * 3600,
+        )
+    return _response_cache
@@ -0,0 +1,108 @@
+"""
+Structured output for the single-call restaurant chain
+Validates the model's JSON and repairs the common ways it comes back malformed
+"""
+
+import re
+import json
+
+from pydantic import BaseModel, Field, ValidationError, field_validator
+from langchain_core.exceptions import OutputParserException
+
+from streaming import MenuItemParser, clean_menu_item
+
+
+class RestaurantPlan(BaseModel):
+    """A restaurant name together with its menu"""
+
+    restaurant_name: str = Field(description="one creative name for the restaurant")
+    menu_items: list[str] = Field(description="10 menu items, each a short dish name", min_length=1)
+
+    @field_validator("restaurant_name")
+    @classmethod
+    def _clean_name(cls, value):
+        value = value.strip().strip('"').strip()
+        if not value:
+            raise ValueError("restaurant_name is empty")
+        return value
+
+    @field_validator("menu_items", mode="before")
+    @classmethod
+    def _split_menu(cls, value):
+        # Models sometimes return the menu as one comma separated or numbered string
+        if isinstance(value, str):
+            parser = MenuItemParser()
+            return parser.feed(value) + parser.close()
+        return value
+
+    @field_validator("menu_items")
+    @classmethod
+    def _clean_items(cls, value):
+        items = [item for item in map(clean_menu_item, value) if item]
+        if not items:
+            raise ValueError("menu_items is empty")
+        return items
+
+
+FORMAT_INSTRUCTIONS = (
+    'Respond with only a JSON object of the form '
+    '{"restaurant_name": "<name>", "menu_items": ["<item>", "<item>", ...]} '
+    "and no other text."
+)
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.S | re.I)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+
+
+def repair_json(text: str) -> str:
+    """Best-effort cleanup of almost-JSON model output
+
+    Strips code fences and surrounding prose, smart quotes and trailing
+    commas, and closes brackets left open by a truncated response.
+    """
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    start = text.find("{")
+    if start == -1:
+        return text.strip()
+    end = text.rfind("}")
+    text = text[start:end + 1] if end > start else text[start:]
+    text = _TRAILING_COMMA.sub(r"\1", text.translate(_SMART_QUOTES))
+
+    # Close whatever a cut-off response left open
+    closers = []
+    in_string = escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+        elif char in "}]" and closers:
+            closers.pop()
+    if in_string:
+        text += '"'
+    return _TRAILING_COMMA.sub(r"\1", text + "".join(reversed(closers)))
+
+
+def parse_plan(text: str) -> RestaurantPlan:
+    """Parse model output into a RestaurantPlan, repairing it when needed
+
+    Raises OutputParserException when the output cannot be salvaged.
+    """
+    try:
+        return RestaurantPlan.model_validate_json(text.strip())
+    except ValidationError:
+        pass
+    try:
+        return RestaurantPlan.model_validate(json.loads(repair_json(text)))
+    except (ValueError, ValidationError) as e:
+        raise OutputParserException(f"Invalid restaurant plan: {e}", llm_output=text) from e
@@ -1,19 +1,29 @@
 import os
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+import math
+import asyncio
+from functools import lru_cache
+from clients import load_env, pooled_client_kwargs
+from scheduler import BATCH, priority
+from streaming import astream_llm, iter_sync, run_sync
 
-load_dotenv()
+# LangChain objects are built on first use so importing this module stays fast
 
-# Initialize the LLM
-llm = ChatOpenAI(
-    temperature=0.7,  # Higher temperature for creative names
-    openai_api_key=os.getenv("OPENAI_API_KEY")
-)
+@lru_cache(maxsize=None)
+def get_llm():
+    """Initialize the LLM"""
+    from langchain_openai import ChatOpenAI
+    from response_cache import get_response_cache
+    
+    load_env()
+    return ChatOpenAI(
+        temperature=0.7,  # Higher temperature for creative names
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        cache=get_response_cache(),  # Nightly reruns of the same pairs skip the API
+        **pooled_client_kwargs()
+    )
 
-# Create a prompt template
-prompt_template = ChatPromptTemplate.from_template(
-    """You are a creative restaurant naming expert. 
+# Prompt for the name suggestions
+NAME_PROMPT = """You are a creative restaurant naming expert. 
     Generate 5 unique and catchy restaurant names for a {cuisine_type} restaurant.
     The restaurant should have a {atmosphere} atmosphere.
     
@@ -26,21 +36,158 @@ prompt_template = ChatPromptTemplate.from_template(
     Atmosphere: {atmosphere}
     
     Restaurant Names:"""
-)
+NAME_PROMPT_COUNT = 5
+
+# For unique names: any number of names, optionally with names to avoid
+MORE_NAMES_PROMPT = """You are a creative restaurant naming expert. 
+    Generate {count} unique and catchy restaurant names for a {cuisine_type} restaurant.
+    The restaurant should have a {atmosphere} atmosphere.
+    {taken}
+    Restaurant Names:"""
+
+TAKEN_NAMES = """
+    These names are already taken, so make yours clearly different from them:
+    {}
+    """
+
+MAX_TAKEN_NAMES = 30
+# Upper bound on names asked for in one call, however many recent names were repeats
+MAX_NAMES_PER_REQUEST = 20
+MIN_ACCEPTANCE = 0.1
+
+@lru_cache(maxsize=None)
+def get_prompt_template():
+    """Create a prompt template"""
+    from langchain_core.prompts import ChatPromptTemplate
+    return ChatPromptTemplate.from_template(NAME_PROMPT)
+
+@lru_cache(maxsize=None)
+def get_chain():
+    """Build the chain once and reuse it for every call"""
+    return (get_prompt_template() | get_llm()).with_config(run_name="restaurant_suggester")
+
+@lru_cache(maxsize=None)
+def get_more_names_chain():
+    """Chain for suggest_unique_restaurant_names, which sizes its own requests"""
+    from langchain_core.prompts import ChatPromptTemplate
+    prompt = ChatPromptTemplate.from_template(MORE_NAMES_PROMPT)
+    return (prompt | get_llm()).with_config(run_name="restaurant_suggester.more_names")
+
+_LAZY_ATTRIBUTES = {
+    "llm": get_llm,
+    "prompt_template": get_prompt_template,
+    "chain": get_chain,
+}
+
+def __getattr__(name):
+    # Keeps `restaurant_suggester.chain` working without building anything at import
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def suggest_restaurant_names(cuisine_type, atmosphere):
     """Generate restaurant name suggestions"""
-    # Create the chain
-    chain = prompt_template | llm
-    
-    # Execute the chain
-    response = chain.invoke({
+    response = get_chain().invoke({
         "cuisine_type": cuisine_type,
         "atmosphere": atmosphere
     })
     
     return response.content
 
+def _names_to_request(missing, acceptance):
+    # Enough that, at the index's recent acceptance rate, one response should cover what is missing
+    return min(max(missing, MAX_NAMES_PER_REQUEST), math.ceil(missing / max(acceptance, MIN_ACCEPTANCE)))
+
+async def asuggest_unique_restaurant_names(cuisine_type, atmosphere, count=5, max_requests=3, index=None):
+    """Up to `count` names that are not (near) duplicates of any name generated before
+
+    Accepted names are added to the shared name index. Each call asks for
+    the missing number of names, scaled up by how many recent names turned
+    out to be repeats; follow-ups list the names to avoid. At most
+    `max_requests` calls are made.
+    """
+    from name_index import get_name_index, parse_names
+    
+    index = index if index is not None else get_name_index()
+    inputs = {"cuisine_type": cuisine_type, "atmosphere": atmosphere}
+    names, taken = [], []
+    for _ in range(max_requests):
+        missing = count - len(names)
+        if missing <= 0:
+            break
+        request = _names_to_request(missing, index.acceptance)
+        if request <= NAME_PROMPT_COUNT and not taken:
+            # The plain prompt, shared with suggest_restaurant_names
+            response = await get_chain().ainvoke(inputs)
+        else:
+            response = await get_more_names_chain().ainvoke({
+                **inputs,
+                "count": request,
+                # Everything offered so far, so the model stops coming back to the same names
+                "taken": TAKEN_NAMES.format("\n".join(dict.fromkeys(taken[-MAX_TAKEN_NAMES:]))) if taken else "",
+            })
+        candidates = parse_names(response.content)
+        names += index.add_new(candidates, limit=missing)
+        taken.extend(candidates)
+    return names
+
+def suggest_unique_restaurant_names(cuisine_type, atmosphere, count=5, max_requests=3, index=None):
+    """Blocking wrapper around asuggest_unique_restaurant_names"""
+    return run_sync(asuggest_unique_restaurant_names(cuisine_type, atmosphere, count, max_requests, index))
+
+async def astream_restaurant_names(cuisine_type, atmosphere):
+    """Stream restaurant name suggestions as they are generated"""
+    prompt_value = await get_prompt_template().ainvoke({
+        "cuisine_type": cuisine_type,
+        "atmosphere": atmosphere
+    })
+    async for text in astream_llm(get_llm(), prompt_value):
+        yield text
+
+def _with_timeout(runnable, timeout):
+    """Wrap a runnable so each invocation is cancelled after `timeout` seconds"""
+    from langchain_core.runnables import RunnableLambda
+    
+    async def _ainvoke(inputs, config):
+        return await asyncio.wait_for(runnable.ainvoke(inputs, config), timeout)
+    return RunnableLambda(_ainvoke)
+
+async def asuggest_restaurant_names_batch(pairs, max_concurrency=8, timeout=None, runnable=None):
+    """Generate restaurant names for many (cuisine_type, atmosphere) pairs concurrently
+
+    Results are returned in input order as dicts with `names` on success or
+    `error` on failure, so one bad item never aborts the rest of the batch.
+    Calls run at batch priority, so interactive requests are served first.
+    """
+    pairs = list(pairs)
+    runnable = runnable or get_chain()
+    if timeout is not None:
+        runnable = _with_timeout(runnable, timeout)
+    
+    inputs = [{"cuisine_type": cuisine, "atmosphere": atmosphere} for cuisine, atmosphere in pairs]
+    with priority(BATCH):
+        outputs = await runnable.abatch(
+            inputs,
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True
+        )
+    
+    results = []
+    for (cuisine, atmosphere), output in zip(pairs, outputs):
+        result = {"cuisine_type": cuisine, "atmosphere": atmosphere, "names": None, "error": None}
+        if isinstance(output, asyncio.TimeoutError):
+            result["error"] = f"Timed out after {timeout}s"
+        elif isinstance(output, Exception):
+            result["error"] = f"{type(output).__name__}: {output}"
+        else:
+            result["names"] = output.content
+        results.append(result)
+    return results
+
+def suggest_restaurant_names_batch(pairs, max_concurrency=8, timeout=None, runnable=None):
+    """Blocking wrapper around asuggest_restaurant_names_batch"""
+    return run_sync(asuggest_restaurant_names_batch(pairs, max_concurrency, timeout, runnable))
+
 # Example usage
 if __name__ == "__main__":
     print("🍽️ Restaurant Name Suggester")
@@ -77,8 +224,9 @@ if __name__ == "__main__":
             
             if cuisine and atmosphere:
                 print(f"\n🎯 Generating names for {cuisine} restaurant with {atmosphere} atmosphere...")
-                names = suggest_restaurant_names(cuisine, atmosphere)
-                print(names)
+                for text in iter_sync(astream_restaurant_names(cuisine, atmosphere)):
+                    print(text, end="", flush=True)
+                print()
             else:
                 print("Please enter both cuisine type and atmosphere.")
                 
@@ -0,0 +1,156 @@
+"""
+Intent router for the combined agent
+Splits a question into clauses and scores each one against precompiled,
+weighted patterns (a small linear model over regex features), so
+"What is the capital of France? Also, what is 15 multiplied by 12?" becomes a
+chat route plus a calculator route. Each route carries the query to send to
+its tool. Routing a question takes tens of microseconds.
+"""
+
+import re
+from typing import NamedTuple
+
+from calculator import extract_expression
+
+INTENTS = ("weather", "search", "wiki", "calc", "chat")
+
+# Chat is the fallback, so it starts with a small bias the others must beat
+CHAT_BIAS = 1.0
+
+# intent -> [(pattern, weight)]; a clause scores the sum of the weights that match
+FEATURES = {
+    "weather": [
+        (r"\b(weather|forecast|temperatures?|rain(ing|y)?|snow(ing|y)?|sunny|cloudy|humid(ity)?|windy|umbrella)\b", 3.0),
+        (r"\b(hot|cold|warm|degrees)\b", 0.5),
+    ],
+    "search": [
+        (r"\b(latest|news|headlines?|today|tonight|currently|right now|this (week|month|year)|breaking|trending)\b", 1.5),
+        (r"\b(price|stocks?|shares?|market|score|results?|released?|release date|open now|near me|schedule)\b", 1.5),
+        (r"\b(current|recent|new)\b", 0.5),
+        (r"\b(search|google|look up|find online)\b", 2.5),
+        (r"\b20\d\d\b", 1.0),
+    ],
+    "wiki": [
+        (r"^(please\s+)?(what|who)\s+(is|was|are|were)\b", 1.5),
+        (r"\b(tell me (more )?about|history of|biography|explain|describe|overview of|summary of)\b", 2.0),
+        (r"\b(invented|discovered|founded|built|born|died|wrote|painted)\b", 1.0),
+        (r"\bwikipedia\b", 3.0),
+    ],
+    "calc": [
+        (r"\d\s*(\*\*|[-+*/^x×÷%])\s*\(?\d", 3.0),
+        (r"\b(multiplied by|times|plus|minus|divided by|sum of|product of|squared|cubed|to the power of)\b", 2.5),
+        (r"\d\s*(%|percent)\s+of\b", 2.5),
+        (r"\b(square root|cube root|sqrt|factorial|logarithm|log|sin|cos|tan)\b|\d\s*!", 2.5),
+        (r"\b(calculate|compute|solve|evaluate|how much is)\b", 1.5),
+    ],
+    "chat": [
+        (r"\b(capital of|you|your|my|we|our|remember|recommend|suggest|should i|hello|hi|thanks|thank you)\b", 1.5),
+        (r"\b(there|that|it|them)\b", 0.25),
+    ],
+}
+
+_COMPILED = {intent: [(re.compile(p, re.IGNORECASE), w) for p, w in patterns] for intent, patterns in FEATURES.items()}
+_DIGIT = re.compile(r"\d")
+
+# Clause boundaries: sentence ends, semicolons, and "also" / "and what ..." joins
+_CLAUSE_SPLIT = re.compile(
+    r"(?<=[?!.])\s+(?=\D)|;\s*|,?\s+and\s+(?=(?:also|what|who|how|where|when|tell|give|calculate)\b)",
+    re.IGNORECASE,
+)
+_LEADING_JOIN = re.compile(r"^(also|and|then|plus|oh)\b[,\s]*", re.IGNORECASE)
+
+_LOCATION = re.compile(r"\b(?:in|for|at|of|near)\s+((?:[A-Z][\w'-]*)(?:(?:\s+|,\s*)[A-Z][\w'-]*)*)")
+_WIKI_FRAMING = re.compile(
+    r"^(please\s+)?(can you\s+)?(tell me (more )?about|what (is|are|was|were)|who (is|was|are|were)|"
+    r"explain|describe|give me (an? )?(overview|summary) of)\s+(the\s+)?",
+    re.IGNORECASE,
+)
+_SEARCH_FRAMING = re.compile(r"^(please\s+)?(search( the web)? for|google|look up|find online)\s+", re.IGNORECASE)
+
+
+class Route(NamedTuple):
+    intent: str
+    text: str   # the clause this route answers
+    query: str  # what to send to the tool; the clause itself for chat
+    score: float
+
+
+def split_clauses(question: str) -> list:
+    """Independent parts of a question, with joining words like "Also," removed"""
+    clauses = []
+    for part in _CLAUSE_SPLIT.split(question):
+        part = _LEADING_JOIN.sub("", part.strip())
+        if part:
+            clauses.append(part[0].upper() + part[1:])
+    return clauses
+
+
+def score(text: str) -> dict:
+    """Score of every intent for one clause"""
+    scores = {intent: 0.0 for intent in INTENTS}
+    scores["chat"] = CHAT_BIAS
+    has_digit = _DIGIT.search(text) is not None
+    for intent, patterns in _COMPILED.items():
+        # Arithmetic needs numbers to work on
+        if intent == "calc" and not has_digit:
+            continue
+        for pattern, weight in patterns:
+            if pattern.search(text):
+                scores[intent] += weight
+    return scores
+
+
+def classify(text: str):
+    """(intent, score) of the best-scoring intent for one clause"""
+    scores = score(text)
+    intent = max(scores, key=scores.get)
+    return intent, scores[intent]
+
+
+def find_location(text: str):
+    """Last capitalized place name after in/for/at/of/near, or None"""
+    matches = _LOCATION.findall(text)
+    return matches[-1].rstrip(",") if matches else None
+
+
+def _query(intent: str, text: str, context: str) -> str:
+    if intent == "weather":
+        location = find_location(text) or (find_location(context) if context else None)
+        return f"current weather in {location}" if location else text.rstrip("?")
+    if intent == "calc":
+        return extract_expression(text) or text
+    if intent == "wiki":
+        return _WIKI_FRAMING.sub("", text).rstrip("?.! ") or text
+    if intent == "search":
+        return _SEARCH_FRAMING.sub("", text).rstrip("?.! ") or text
+    return text
+
+
+def route(question: str, context: str = "") -> list:
+    """Routes for every clause of `question`, in order
+
+    Neighbouring chat clauses are merged so they go to the LLM together.
+    `context` (e.g. earlier questions) resolves "there" for weather lookups.
+    """
+    routes = []
+    for clause in split_clauses(question) or [question]:
+        intent, best = classify(clause)
+        if intent == "calc" and extract_expression(clause) is None:
+            intent, best = "chat", CHAT_BIAS
+        if intent == "chat" and routes and routes[-1].intent == "chat":
+            previous = routes.pop()
+            clause = f"{previous.text} {clause}"
+            best = max(best, previous.score)
+        routes.append(Route(intent, clause, _query(intent, clause, context), best))
+    return routes
+
+
+def intents(question: str) -> list:
+    """Distinct intents of a question, in order"""
+    return list(dict.fromkeys(r.intent for r in route(question)))
+
+
+if __name__ == "__main__":
+    import sys
+    for r in route(" ".join(sys.argv[1:]) or "What is the capital of France? Also, what is 15 multiplied by 12?"):
+        print(f"{r.intent:<8} {r.score:4.1f}  {r.query!r}  <- {r.text!r}")
@@ -0,0 +1,518 @@
+"""
+Shared rate-limit-aware scheduler for LLM and tool calls
+
+Every provider gets token buckets for requests/min and tokens/min. Callers
+wait in a priority queue (interactive before batch), and failed calls are
+retried with jittered exponential backoff. OpenAI traffic is scheduled in
+the pooled HTTP transport (see clients.py); tools go through `call`.
+
+    with priority(BATCH):
+        scheduler.call("serpapi", serpapi.run, query)
+"""
+
+import os
+import json
+import time
+import heapq
+import random
+import asyncio
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = {INTERACTIVE: 0, BATCH: 1}
+
+# requests/min, tokens/min (None = unlimited); override with e.g. OPENAI_RPM, OPENAI_TPM
+DEFAULT_LIMITS = {
+    "openai": (500, 200_000),
+    "serpapi": (60, None),
+    "wikipedia": (200, None),
+}
+DEFAULT_LIMIT = (600, None)
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+_priority = contextvars.ContextVar("scheduler_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def priority(name):
+    """Run the calls made inside this block at priority `name`"""
+    if name not in PRIORITIES:
+        raise ValueError(f"priority must be one of {tuple(PRIORITIES)}, got {name!r}")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    return _priority.get()
+
+
+class RetryableError(Exception):
+    """Raised by a call to ask the scheduler to retry it"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Refills `per_minute` units a minute, holding at most `burst_seconds` worth"""
+
+    def __init__(self, per_minute, burst_seconds=10.0):
+        self.rate = per_minute / 60.0
+        # Well under a minute's worth, so a cold start cannot burst the whole quota at once
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount, now) -> float:
+        """Seconds until `amount` units are available"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount):
+        """Charge (or refund, when negative) the difference once real usage is known"""
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class _Waiter:
+    __slots__ = ("rank", "seq", "tokens", "wake")
+
+    def __init__(self, rank, seq, tokens, wake):
+        self.rank = rank
+        self.seq = seq
+        self.tokens = tokens
+        self.wake = wake
+
+    def __lt__(self, other):
+        return (self.rank, self.seq) < (other.rank, other.seq)
+
+
+class _Provider:
+    def __init__(self, name, rpm, tpm, burst_seconds):
+        self.name = name
+        self.requests = TokenBucket(rpm, burst_seconds)
+        self.tokens = TokenBucket(tpm, burst_seconds) if tpm else None
+        self.paused_until = 0.0
+        self.queue = []
+        self.metrics = {level: _Metrics() for level in PRIORITIES}
+
+    def delay(self, tokens, now) -> float:
+        delay = max(self.paused_until - now, self.requests.delay(1, now))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.delay(tokens, now))
+        return delay
+
+    def consume(self, tokens):
+        self.requests.consume(1)
+        if self.tokens is not None:
+            self.tokens.consume(tokens)
+
+
+class _Metrics:
+    __slots__ = ("queued", "max_queued", "granted", "wait_total", "wait_max", "retries", "rate_limited", "failed")
+
+    def __init__(self):
+        self.queued = self.max_queued = self.granted = 0
+        self.wait_total = self.wait_max = 0.0
+        self.retries = self.rate_limited = self.failed = 0
+
+    def as_dict(self):
+        return {
+            "queue_depth": self.queued,
+            "max_queue_depth": self.max_queued,
+            "granted": self.granted,
+            "avg_wait": self.wait_total / self.granted if self.granted else 0.0,
+            "max_wait": self.wait_max,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "failed": self.failed,
+        }
+
+
+class Scheduler:
+    """Admit calls per provider within their rate limits, highest priority first"""
+
+    def __init__(self, limits=None, max_retries=4, base_delay=0.5, max_delay=30.0, burst_seconds=10.0):
+        self.limits = dict(limits or {})
+        self.burst_seconds = burst_seconds
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._providers = {}
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+
+    def _provider(self, name) -> _Provider:
+        provider = self._providers.get(name)
+        if provider is None:
+            with self._lock:
+                provider = self._providers.get(name)
+                if provider is None:
+                    rpm, tpm = self.limits.get(name) or _limits_from_env(name)
+                    provider = self._providers[name] = _Provider(name, rpm, tpm, self.burst_seconds)
+        return provider
+
+    def configure(self, name, rpm, tpm=None):
+        """Set (or reset) the limits for one provider"""
+        with self._lock:
+            self.limits[name] = (rpm, tpm)
+            self._providers.pop(name, None)
+
+    # Admission
+
+    def _enqueue(self, provider, tokens, wake):
+        name = current_priority()
+        waiter = _Waiter(PRIORITIES[name], next(self._seq), tokens, wake)
+        with self._lock:
+            heapq.heappush(provider.queue, waiter)
+            metrics = provider.metrics[name]
+            metrics.queued += 1
+            metrics.max_queued = max(metrics.max_queued, metrics.queued)
+        return waiter, metrics
+
+    def _try_grant(self, provider, waiter, metrics, started):
+        """Grant the slot if `waiter` is first in line and the buckets allow it
+
+        Returns (granted, delay): when not granted, how long to sleep before
+        checking again (None = until woken by the waiter ahead).
+        """
+        with self._lock:
+            if provider.queue[0] is not waiter:
+                return False, None
+            now = time.monotonic()
+            delay = provider.delay(waiter.tokens, now)
+            if delay > 0:
+                return False, delay
+            provider.consume(waiter.tokens)
+            heapq.heappop(provider.queue)
+            waited = now - started
+            metrics.queued -= 1
+            metrics.granted += 1
+            metrics.wait_total += waited
+            metrics.wait_max = max(metrics.wait_max, waited)
+            if provider.queue:
+                provider.queue[0].wake()
+            return True, None
+
+    def _abandon(self, provider, waiter, metrics):
+        with self._lock:
+            if waiter in provider.queue:
+                provider.queue.remove(waiter)
+                heapq.heapify(provider.queue)
+                metrics.queued -= 1
+                if provider.queue:
+                    provider.queue[0].wake()
+
+    def acquire(self, name, tokens=0):
+        """Block until a call to provider `name` costing `tokens` may start"""
+        provider = self._provider(name)
+        event = threading.Event()
+        waiter, metrics = self._enqueue(provider, tokens, event.set)
+        started = time.monotonic()
+        try:
+            while True:
+                granted, delay = self._try_grant(provider, waiter, metrics, started)
+                if granted:
+                    return
+                event.wait(delay)
+                event.clear()
+        except BaseException:
+            self._abandon(provider, waiter, metrics)
+            raise
+
+    async def aacquire(self, name, tokens=0):
+        """Async version of acquire"""
+        provider = self._provider(name)
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter, metrics = self._enqueue(provider, tokens, lambda: loop.call_soon_threadsafe(event.set))
+        started = time.monotonic()
+        try:
+            while True:
+                granted, delay = self._try_grant(provider, waiter, metrics, started)
+                if granted:
+                    return
+                try:
+                    await asyncio.wait_for(event.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+        except BaseException:
+            self._abandon(provider, waiter, metrics)
+            raise
+
+    def adjust(self, name, tokens):
+        """Correct the tokens/min bucket once a call's real usage is known"""
+        provider = self._provider(name)
+        if provider.tokens is not None and tokens:
+            with self._lock:
+                provider.tokens.adjust(tokens)
+
+    # Retries
+
+    def backoff(self, attempt, retry_after=None) -> float:
+        """Full-jitter exponential backoff, never shorter than the server's Retry-After"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    def _failed(self, name, attempt, error):
+        """Record a failed attempt; return the backoff delay, or None to give up"""
+        provider = self._provider(name)
+        metrics = provider.metrics[current_priority()]
+        retryable, retry_after, rate_limited = classify_error(error)
+        with self._lock:
+            if rate_limited:
+                metrics.rate_limited += 1
+                # Everyone waiting on this provider backs off, not just this caller
+                provider.paused_until = max(provider.paused_until, time.monotonic() + (retry_after or self.base_delay))
+            if not retryable or attempt >= self.max_retries:
+                metrics.failed += 1
+                return None
+            metrics.retries += 1
+        return self.backoff(attempt, retry_after)
+
+    def call(self, name, fn, *args, tokens=0, **kwargs):
+        """Run fn(*args, **kwargs) within provider `name`'s limits, retrying transient failures"""
+        for attempt in itertools.count():
+            self.acquire(name, tokens)
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._failed(name, attempt, e)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+
+    async def acall(self, name, fn, *args, tokens=0, **kwargs):
+        """Async version of call; `fn` returns an awaitable"""
+        for attempt in itertools.count():
+            await self.aacquire(name, tokens)
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._failed(name, attempt, e)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        """Queue depth, wait time and retry counters per provider and priority"""
+        with self._lock:
+            return {
+                name: {level: metrics.as_dict() for level, metrics in provider.metrics.items()}
+                for name, provider in self._providers.items()
+            }
+
+
+def _limits_from_env(name):
+    from clients import load_env
+    load_env()
+    rpm, tpm = DEFAULT_LIMITS.get(name, DEFAULT_LIMIT)
+    prefix = name.upper()
+    rpm = float(os.getenv(f"{prefix}_RPM", rpm))
+    tpm = os.getenv(f"{prefix}_TPM", tpm)
+    return rpm, float(tpm) if tpm else None
+
+
+def _status_code(error):
+    for source in (error, getattr(error, "response", None)):
+        status = getattr(source, "status_code", None)
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def _retry_after(error):
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if getattr(error, "retry_after", None) is not None:
+        return error.retry_after
+    return parse_retry_after(headers.get("retry-after")) if headers else None
+
+
+def parse_retry_after(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(error):
+    """(retryable, retry_after, rate_limited) for an exception raised by a call"""
+    if isinstance(error, RetryableError):
+        return True, error.retry_after, False
+    status = _status_code(error)
+    message = str(error).lower()
+    rate_limited = status == 429 or "rate limit" in message or "too many requests" in message
+    if rate_limited:
+        return True, _retry_after(error), True
+    if status is not None:
+        return status in RETRYABLE_STATUS, _retry_after(error), False
+    transient = (TimeoutError, ConnectionError, asyncio.TimeoutError)
+    name = type(error).__name__
+    return isinstance(error, transient) or name in ("APIConnectionError", "APITimeoutError", "ConnectTimeout", "ReadTimeout", "ConnectError"), None, False
+
+
+# OpenAI traffic: scheduled where every client's requests meet, the pooled HTTP transport
+
+def estimate_request_tokens(content: bytes) -> int:
+    """Rough token cost of an OpenAI request body: prompt plus the completion allowance"""
+    try:
+        payload = json.loads(content or b"{}")
+    except ValueError:
+        return 0
+    if not isinstance(payload, dict):
+        return 0
+    prompt = payload.get("messages") or payload.get("prompt") or payload.get("input") or ""
+    completion = payload.get("max_completion_tokens") or payload.get("max_tokens") or 256
+    return len(json.dumps(prompt)) // 4 + int(completion)
+
+
+def _response_tokens(content: bytes):
+    try:
+        usage = json.loads(content).get("usage") or {}
+    except (ValueError, AttributeError):
+        return None
+    return usage.get("total_tokens")
+
+
+class ScheduledTransport:
+    """httpx transport that rate-limits and retries requests to one provider"""
+
+    def __init__(self, transport, provider="openai", scheduler=None):
+        self._transport = transport
+        self.provider = provider
+        self.scheduler = scheduler or get_scheduler()
+
+    def _rebuild(self, response, request, raw):
+        import httpx
+        return httpx.Response(
+            response.status_code, headers=response.headers, content=raw,
+            request=request, extensions=response.extensions,
+        )
+
+    def handle_request(self, request):
+        tokens = estimate_request_tokens(request.content)
+        for attempt in itertools.count():
+            self.scheduler.acquire(self.provider, tokens)
+            try:
+                response = self._transport.handle_request(request)
+            except Exception as e:
+                delay = self.scheduler._failed(self.provider, attempt, e)
+                if delay is None:
+                    raise
+            else:
+                if response.status_code not in RETRYABLE_STATUS:
+                    raw = None
+                    if _is_json(response):
+                        raw = b"".join(response.iter_raw())
+                        response.close()
+                    return self._settle(response, request, tokens, raw)
+                response.read()
+                delay = self.scheduler._failed(self.provider, attempt, _HTTPStatus(response))
+                if delay is None:
+                    return response
+                response.close()
+            time.sleep(delay)
+
+    def _settle(self, response, request, tokens, raw):
+        # Charge the tokens/min bucket for what the call really used
+        if raw is None:
+            return response
+        response = self._rebuild(response, request, raw)
+        used = _response_tokens(response.content)
+        if used is not None:
+            self.scheduler.adjust(self.provider, used - tokens)
+        return response
+
+    def close(self):
+        self._transport.close()
+
+    def __enter__(self):
+        self._transport.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self._transport.__exit__(*exc)
+
+
+class AsyncScheduledTransport(ScheduledTransport):
+    """Async version of ScheduledTransport"""
+
+    async def handle_async_request(self, request):
+        tokens = estimate_request_tokens(request.content)
+        for attempt in itertools.count():
+            await self.scheduler.aacquire(self.provider, tokens)
+            try:
+                response = await self._transport.handle_async_request(request)
+            except Exception as e:
+                delay = self.scheduler._failed(self.provider, attempt, e)
+                if delay is None:
+                    raise
+            else:
+                if response.status_code not in RETRYABLE_STATUS:
+                    raw = None
+                    if _is_json(response):
+                        raw = b"".join([chunk async for chunk in response.aiter_raw()])
+                        await response.aclose()
+                    return self._settle(response, request, tokens, raw)
+                await response.aread()
+                delay = self.scheduler._failed(self.provider, attempt, _HTTPStatus(response))
+                if delay is None:
+                    return response
+                await response.aclose()
+            await asyncio.sleep(delay)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+    async def __aenter__(self):
+        await self._transport.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._transport.__aexit__(*exc)
+
+
+def _is_json(response):
+    # Streamed (SSE) responses pass straight through; only JSON bodies report usage
+    return response.headers.get("content-type", "").startswith("application/json")
+
+
+class _HTTPStatus(Exception):
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+        self.status_code = response.status_code
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Scheduler:
+    """Process-wide scheduler shared by every module"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = Scheduler(
+                    max_retries=int(os.getenv("SCHEDULER_MAX_RETRIES", "4")),
+                    burst_seconds=float(os.getenv("SCHEDULER_BURST_SECONDS", "10")),
+                )
+    return _scheduler
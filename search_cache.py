@@ -0,0 +1,144 @@
+"""
+Local cache for web search results
+Normalized query keys, per-class TTLs, single-flight requests and
+stale-while-revalidate refreshes
+"""
+
+import re
+import time
+import threading
+from collections import OrderedDict
+
+# (name, pattern, ttl seconds) checked in order; the first match wins
+DEFAULT_TTL_CLASSES = [
+    ("finance", re.compile(r"\b(stocks?|shares?|price|market|nasdaq|dow|crypto|bitcoin|exchange rate)\b"), 60),
+    ("weather", re.compile(r"\b(weather|forecast|temperature|rain|snow|humidity|wind)\b"), 10 * 60),
+    ("news", re.compile(r"\b(news|latest|today|tonight|current|breaking|live|score)\b"), 30 * 60),
+]
+EVERGREEN_TTL = 7 * 24 * 3600
+
+
+class _Flight:
+    """One in-progress fetch that concurrent callers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SearchCache:
+    """Thread-safe search result cache
+
+    Entries past their TTL are still served for `stale_window` seconds while
+    a background refresh runs, so callers rarely wait on the network.
+    """
+
+    def __init__(self, ttl_classes=None, default_ttl=EVERGREEN_TTL, stale_window=300, max_entries=2048):
+        self.ttl_classes = DEFAULT_TTL_CLASSES if ttl_classes is None else ttl_classes
+        self.default_ttl = default_ttl
+        self.stale_window = stale_window
+        self.max_entries = max_entries
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.fetches = 0
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Case, punctuation and whitespace insensitive cache key"""
+        return " ".join(re.sub(r"[^\w\s$%.-]", " ", query.lower()).split()).strip(" .")
+
+    def classify(self, key: str):
+        """Return (class name, ttl) for a normalized query"""
+        for name, pattern, ttl in self.ttl_classes:
+            if pattern.search(key):
+                return name, ttl
+        return "evergreen", self.default_ttl
+
+    def get(self, query: str, fetch):
+        """Return the cached result for `query`, calling `fetch(query)` when needed"""
+        key = self.normalize(query)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if now < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                if now < expires_at + self.stale_window:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    if key not in self._inflight:
+                        # Revalidate in the background; errors keep the stale value
+                        flight = self._inflight[key] = _Flight()
+                        threading.Thread(target=self._fetch, args=(key, query, fetch, flight), daemon=True).start()
+                    return value
+
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = self._inflight[key] = _Flight()
+                self.misses += 1
+                leader = True
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        self._fetch(key, query, fetch, flight)
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _fetch(self, key, query, fetch, flight):
+        with self._lock:
+            self.fetches += 1
+        try:
+            flight.value = fetch(query)
+            self._store(key, flight.value)
+        except Exception as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def put(self, query: str, value):
+        """Cache a result fetched some other way, e.g. by another tool's search"""
+        self._store(self.normalize(query), value)
+
+    def _store(self, key, value):
+        _, ttl = self.classify(key)
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Counters for this process"""
+        lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "fetches": self.fetches,
+            "hit_rate": (self.hits + self.stale_hits + self.coalesced) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
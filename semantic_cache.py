@@ -0,0 +1,252 @@
+"""
+Semantic answer cache for the question-answering agents
+Questions are embedded locally with a hashing vectorizer and matched by
+cosine similarity, so "What is the Eiffel Tower?" and "Tell me about the
+Eiffel Tower" share one answer. Bounded with LRU eviction and saved to disk
+as a NumPy archive.
+"""
+
+import os
+import re
+import time
+import zlib
+import atexit
+import threading
+
+import numpy as np
+
+from instrumentation import span
+from wiki_index import STOPWORDS
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "semantic.npz")
+DEFAULT_THRESHOLD = 0.9
+DEFAULT_TTL = 7 * 24 * 3600
+DIMENSIONS = 512
+
+_WORD = re.compile(r"\w+")
+# Words that only frame the question; who/when/where/why/how change what is asked, so they count
+_FILLER = STOPWORDS - {"who", "when", "where", "why", "how", "which"}
+# "Who is" and "Who was" ask different things, so past-tense questions are matched separately
+_PAST = frozenset({"was", "were", "did", "had"})
+
+
+def features(text: str) -> list:
+    """Content words of a question, lowercased with plural endings removed"""
+    words = []
+    for word in _WORD.findall(text.lower()):
+        if word in _FILLER:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def _partition(namespace, question):
+    # Entries are only compared within a namespace and tense
+    return f"{namespace}:past" if _PAST.intersection(_WORD.findall(question.lower())) else namespace
+
+
+def embed(text: str, dimensions=DIMENSIONS) -> np.ndarray:
+    """Unit-length signed hashing embedding; all zeros when nothing is left to match on"""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for word in features(text):
+        # crc32 rather than hash() so vectors stay stable across processes
+        h = zlib.crc32(word.encode("utf-8"))
+        vector[h % dimensions] += 1.0 if h & 0x80000000 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticCache:
+    """Thread-safe nearest-neighbour cache of answers, one namespace per agent
+
+    A lookup returns the answer of the most similar stored question in the
+    same namespace and tense when the cosine similarity reaches `threshold`.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, threshold=DEFAULT_THRESHOLD, max_entries=1000,
+                 ttl=DEFAULT_TTL, dimensions=DIMENSIONS, save_interval=5.0, enabled=True):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.dimensions = dimensions
+        self.save_interval = save_interval
+        self.enabled = enabled
+        self.hits = {}
+        self.misses = {}
+        self._vectors = np.zeros((max_entries, dimensions), dtype=np.float32)
+        self._namespaces = [None] * max_entries
+        self._namespace_ids = np.full(max_entries, -1, dtype=np.int32)
+        self._namespace_codes = {}
+        self._questions = [None] * max_entries
+        self._answers = [None] * max_entries
+        self._expires = np.zeros(max_entries)
+        self._used = np.zeros(max_entries, dtype=np.int64)
+        self._size = 0
+        self._tick = 0
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self._load()
+
+    def _best(self, namespace, vector, now):
+        # Index and score of the closest live entry in the namespace, or (-1, 0.0)
+        n = self._size
+        if n == 0 or not vector.any():
+            return -1, 0.0
+        scores = self._vectors[:n] @ vector
+        code = self._namespace_codes.get(namespace, -2)
+        live = (self._namespace_ids[:n] == code) & (self._expires[:n] > now)
+        scores[~live] = -1.0
+        best = int(scores.argmax())
+        return (best, float(scores[best])) if live[best] else (-1, 0.0)
+
+    def get(self, namespace: str, question: str):
+        """Cached answer for a question similar enough to `question`, or None"""
+        if not self.enabled:
+            return None
+        with span("semantic_cache", kind="cache", namespace=namespace) as lookup:
+            vector = embed(question, self.dimensions)
+            with self._lock:
+                best, score = self._best(_partition(namespace, question), vector, time.time())
+                hit = best >= 0 and score >= self.threshold
+                if hit:
+                    self._tick += 1
+                    self._used[best] = self._tick
+                    answer = self._answers[best]
+                counter = self.hits if hit else self.misses
+                counter[namespace] = counter.get(namespace, 0) + 1
+            if lookup is not None:
+                lookup.cache_hit = hit
+                lookup.attributes["similarity"] = round(score, 3)
+            return answer if hit else None
+
+    def put(self, namespace: str, question: str, answer: str, ttl=None):
+        """Store an answer, replacing a near-identical question or the least recently used entry"""
+        if not self.enabled or not answer:
+            return
+        vector = embed(question, self.dimensions)
+        if not vector.any():
+            return
+        now = time.time()
+        partition = _partition(namespace, question)
+        with self._lock:
+            best, score = self._best(partition, vector, now)
+            if best >= 0 and score >= 0.999:
+                slot = best
+            elif self._size < self.max_entries:
+                slot = self._size
+                self._size += 1
+            else:
+                # Expired entries go first, then the least recently used
+                expired = np.flatnonzero(self._expires[:self._size] <= now)
+                slot = int(expired[0]) if len(expired) else int(self._used[:self._size].argmin())
+            self._tick += 1
+            self._vectors[slot] = vector
+            self._namespaces[slot] = partition
+            self._namespace_ids[slot] = self._namespace_codes.setdefault(partition, len(self._namespace_codes))
+            self._questions[slot] = question
+            self._answers[slot] = answer
+            self._expires[slot] = now + (self.ttl if ttl is None else ttl)
+            self._used[slot] = self._tick
+            self._dirty = True
+            due = time.monotonic() - self._saved_at >= self.save_interval
+        if due:
+            self.save()
+
+    def save(self):
+        """Write the live entries to `path` atomically"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            n = self._size
+            keep = np.flatnonzero(self._expires[:n] > time.time())
+            arrays = {
+                "vectors": self._vectors[keep],
+                "namespaces": np.array([self._namespaces[i] for i in keep], dtype=str),
+                "questions": np.array([self._questions[i] for i in keep], dtype=str),
+                "answers": np.array([self._answers[i] for i in keep], dtype=str),
+                "expires": self._expires[keep],
+                "used": self._used[keep],
+            }
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, self.path)
+
+    def _load(self):
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                vectors = data["vectors"]
+                if vectors.ndim != 2 or vectors.shape[1] != self.dimensions:
+                    return
+                # Most recently used first, so a smaller cache keeps the right entries
+                order = np.argsort(-data["used"])[:self.max_entries]
+                n = len(order)
+                self._vectors[:n] = vectors[order]
+                self._namespaces[:n] = data["namespaces"][order].tolist()
+                for i, namespace in enumerate(self._namespaces[:n]):
+                    self._namespace_ids[i] = self._namespace_codes.setdefault(namespace, len(self._namespace_codes))
+                self._questions[:n] = data["questions"][order].tolist()
+                self._answers[:n] = data["answers"][order].tolist()
+                self._expires[:n] = data["expires"][order]
+                self._used[:n] = np.arange(n, 0, -1)
+                self._size = n
+                self._tick = n
+        except (OSError, ValueError, KeyError):
+            # A corrupt or foreign file just means starting empty
+            self._size = 0
+
+    def clear(self):
+        with self._lock:
+            self._size = 0
+            self._dirty = True
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process, overall and per namespace"""
+        with self._lock:
+            namespaces = sorted(set(self.hits) | set(self.misses))
+            hits = sum(self.hits.values())
+            lookups = hits + sum(self.misses.values())
+            return {
+                "hits": hits,
+                "misses": lookups - hits,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "entries": self._size,
+                "namespaces": {
+                    ns: {"hits": self.hits.get(ns, 0), "misses": self.misses.get(ns, 0)} for ns in namespaces
+                },
+            }
+
+
+_semantic_cache = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> SemanticCache:
+    """Shared cache configured from the environment; SEMANTIC_CACHE=0 turns it off"""
+    global _semantic_cache
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                from clients import load_env
+                load_env()
+                ttl = os.getenv("SEMANTIC_CACHE_TTL")
+                cache = SemanticCache(
+                    path=os.getenv("SEMANTIC_CACHE_PATH", DEFAULT_CACHE_PATH),
+                    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", DEFAULT_THRESHOLD)),
+                    max_entries=int(os.getenv("SEMANTIC_CACHE_SIZE", 1000)),
+                    ttl=float(ttl) if ttl else DEFAULT_TTL,
+                    enabled=os.getenv("SEMANTIC_CACHE", "1") not in ("0", "false", "False"),
+                )
+                atexit.register(cache.save)
+                _semantic_cache = cache
+    return _semantic_cache
@@ -1,35 +1,143 @@
 import os
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_community.utilities import SerpAPIWrapper
+import asyncio
+from functools import lru_cache
+from clients import load_env, pooled_client_kwargs
+from instrumentation import span
+from prompts import Section, build_prompt
+from scheduler import get_scheduler
+from search_cache import SearchCache
+from weather import NoWeatherResult, get_weather
 
-load_dotenv()
+# Clients are built on first use so importing this module stays fast
 
-# Initialize LLM
-api_key = os.getenv("OPENAI_API_KEY")
-serpapi_key = os.getenv("SERPAPI_API_KEY")
-llm = ChatOpenAI(temperature=0, openai_api_key=api_key)
+@lru_cache(maxsize=None)
+def get_llm():
+    """Initialize LLM"""
+    from langchain_openai import ChatOpenAI
+    load_env()
+    api_key = os.getenv("OPENAI_API_KEY")
+    return ChatOpenAI(temperature=0, openai_api_key=api_key, **pooled_client_kwargs())
 
-# Create SerpAPI tool
-serpapi = SerpAPIWrapper(serpapi_api_key=serpapi_key)
+@lru_cache(maxsize=None)
+def get_serpapi():
+    """Create SerpAPI tool"""
+    from langchain_community.utilities import SerpAPIWrapper
+    load_env()
+    serpapi = SerpAPIWrapper(serpapi_api_key=os.getenv("SERPAPI_API_KEY"))
+    
+    # Point SerpAPI at another backend, e.g. a local fake server for testing
+    serpapi_base_url = os.getenv("SERPAPI_BASE_URL")
+    if serpapi_base_url:
+        serpapi.search_engine = type("SerpAPIBackend", (serpapi.search_engine,), {"BACKEND": serpapi_base_url.rstrip("/")})
+    return serpapi
+
+_LAZY_ATTRIBUTES = {"llm": get_llm, "serpapi": get_serpapi}
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Cache search results; identical concurrent queries share one request
+search_cache = SearchCache()
+
+def _run_search(query: str) -> str:
+    # Rate-limited and retried by the shared scheduler
+    return str(get_scheduler().call("serpapi", get_serpapi().run, query))
+
+# Prefix of search failures; answers built on one are not cached
+SEARCH_ERROR = "Error searching web:"
+
+# Fixed opening of every search prompt
+SEARCH_INSTRUCTIONS = "Answer the question at the end using the web search results below."
+# Budget for the compacted search results
+SEARCH_RESULT_TOKENS = 500
 
 def search_web(query: str) -> str:
     """Search the web using SerpAPI"""
     try:
-        result = serpapi.run(query)
-        return str(result)
+        return search_cache.get(query, _run_search)
     except Exception as e:
-        return f"Error searching web: {str(e)}"
+        return f"{SEARCH_ERROR} {str(e)}"
 
-def ask_with_search(question: str) -> str:
-    """Answer questions using web search"""
+def build_search_prompt(question: str) -> str:
+    """Search the web for the question and build the answer prompt"""
     # Search the web for current information
-    search_result = search_web(question)
+    with span("tool.serpapi", kind="tool"):
+        search_result = search_web(question)
     
     # Use LLM to provide a better answer based on search results
-    prompt = f"Based on this web search result: {search_result}\n\nAnswer this question: {question}"
-    response = llm.invoke(prompt)
-    return response.content
+    with span("prompt.search", kind="prompt"):
+        return build_prompt("search", SEARCH_INSTRUCTIONS,
+                            [Section("Web search results", search_result, SEARCH_RESULT_TOKENS)], question)
+
+def weather_answer(question: str):
+    """Answer a weather question from the search answer box without the LLM, or None"""
+    from router import classify
+    if classify(question)[0] != "weather":
+        return None
+    with span("tool.weather", kind="tool") as current:
+        try:
+            return get_weather(question, get_serpapi().results).render()
+        except NoWeatherResult as e:
+            # The regular search path answers from these results instead of searching again
+            _reuse_search(question, e.payload)
+            return None
+        except Exception as e:
+            # The regular search path reports the error to the caller; the trace keeps this one
+            if current is not None:
+                current.error = f"{type(e).__name__}: {e}"
+            return None
+
+def _reuse_search(question: str, payload):
+    from langchain_community.utilities import SerpAPIWrapper
+    try:
+        search_cache.put(question, str(SerpAPIWrapper._process_response(dict(payload))))
+    except Exception:
+        # An error payload; let the search path ask again and report it
+        pass
+
+def _answer_ttl(question: str) -> float:
+    # Answers about prices, weather or news go stale as fast as the search results behind them
+    return search_cache.classify(search_cache.normalize(question))[1]
+
+def ask_with_search(question: str) -> str:
+    """Answer questions using web search"""
+    with span("ask_with_search", kind="agent"):
+        answer = weather_answer(question)
+        if answer is not None:
+            return answer
+        # Reworded repeats of an earlier question reuse its answer
+        from semantic_cache import get_semantic_cache
+        cache = get_semantic_cache()
+        answer = cache.get("search", question)
+        if answer is not None:
+            return answer
+        prompt = build_search_prompt(question)
+        response = get_llm().invoke(prompt)
+        if SEARCH_ERROR not in prompt:
+            cache.put("search", question, response.content, ttl=_answer_ttl(question))
+        return response.content
+
+async def astream_with_search(question: str):
+    """Stream an answer based on web search"""
+    answer = await asyncio.to_thread(weather_answer, question)
+    if answer is not None:
+        yield answer
+        return
+    from semantic_cache import get_semantic_cache
+    cache = get_semantic_cache()
+    answer = cache.get("search", question)
+    if answer is not None:
+        yield answer
+        return
+    prompt = await asyncio.to_thread(build_search_prompt, question)
+    parts = []
+    async for chunk in get_llm().astream(prompt):
+        parts.append(chunk.content)
+        yield chunk.content
+    if SEARCH_ERROR not in prompt:
+        cache.put("search", question, "".join(parts), ttl=_answer_ttl(question))
 
 if __name__ == "__main__":
     questions = [
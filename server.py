@@ -0,0 +1,162 @@
+"""
+HTTP service for the restaurant suggester
+
+    python server.py --port 8080
+
+    POST /suggest     {"cuisine_type": "Italian", "atmosphere": "romantic"}
+    POST /restaurant  {"cuisine": "bengali"}
+    GET  /healthz
+    GET  /metrics     Prometheus text format (set INSTRUMENTATION=1 for step metrics)
+"""
+
+import asyncio
+import argparse
+
+from aiohttp import web
+
+from clients import aclose_clients
+from instrumentation import get_tracer
+import app
+import restaurant_suggester
+
+
+class Backpressure:
+    """Limit concurrent work and reject requests once the wait queue is full"""
+
+    def __init__(self, max_concurrency=32, max_queue=256):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.completed = 0
+        self.draining = False
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def admit(self) -> bool:
+        return not self.draining and self.waiting + self.in_flight < self.max_concurrency + self.max_queue
+
+    async def __aenter__(self):
+        self.waiting += 1
+        self._idle.clear()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    async def __aexit__(self, *exc):
+        self.in_flight -= 1
+        self.completed += 1
+        self._semaphore.release()
+        if self.in_flight == 0 and self.waiting == 0:
+            self._idle.set()
+
+    async def drain(self, timeout):
+        """Stop admitting requests and wait for accepted ones to finish"""
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Shutdown timeout: {self.in_flight} requests still running")
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "draining": self.draining,
+        }
+
+
+@web.middleware
+async def backpressure_middleware(request, handler):
+    limiter = request.app["backpressure"]
+    if request.method != "POST":
+        return await handler(request)
+    if not limiter.admit():
+        limiter.rejected += 1
+        return web.json_response({"error": "Server busy, retry later"}, status=503, headers={"Retry-After": "1"})
+    async with limiter:
+        return await handler(request)
+
+
+async def _read_fields(request, *names):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="Request body must be JSON")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text="Request body must be a JSON object")
+    missing = [name for name in names if not str(body.get(name, "")).strip()]
+    if missing:
+        raise web.HTTPBadRequest(text=f"Missing field(s): {', '.join(missing)}")
+    return [str(body[name]).strip() for name in names]
+
+
+async def suggest(request):
+    cuisine_type, atmosphere = await _read_fields(request, "cuisine_type", "atmosphere")
+    response = await restaurant_suggester.get_chain().ainvoke({"cuisine_type": cuisine_type, "atmosphere": atmosphere})
+    return web.json_response({"cuisine_type": cuisine_type, "atmosphere": atmosphere, "names": response.content})
+
+
+async def restaurant(request):
+    (cuisine,) = await _read_fields(request, "cuisine")
+    response = await app.get_chain().ainvoke({"cuisine": cuisine})
+    return web.json_response({
+        "cuisine": cuisine,
+        "restaurant_name": response["restaurant_name"],
+        "menu_items": app.menu_item_list(response["menu_items"]),
+    })
+
+
+async def metrics(request):
+    return web.Response(text=get_tracer().prometheus_text(), content_type="text/plain", charset="utf-8")
+
+
+async def healthz(request):
+    return web.json_response({"status": "ok", **request.app["backpressure"].stats()})
+
+
+def create_app(max_concurrency=32, max_queue=256, shutdown_timeout=30.0):
+    server = web.Application(middlewares=[backpressure_middleware])
+    server.add_routes([
+        web.post("/suggest", suggest),
+        web.post("/restaurant", restaurant),
+        web.get("/healthz", healthz),
+        web.get("/metrics", metrics),
+    ])
+
+    async def on_startup(server):
+        server["backpressure"] = Backpressure(max_concurrency, max_queue)
+
+    async def on_shutdown(server):
+        await server["backpressure"].drain(shutdown_timeout)
+
+    async def on_cleanup(server):
+        await aclose_clients()
+
+    server.on_startup.append(on_startup)
+    server.on_shutdown.append(on_shutdown)
+    server.on_cleanup.append(on_cleanup)
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Restaurant suggester HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-concurrency", type=int, default=32, help="requests processed at once")
+    parser.add_argument("--max-queue", type=int, default=256, help="requests allowed to wait before 503s")
+    parser.add_argument("--shutdown-timeout", type=float, default=30.0, help="seconds to drain on shutdown")
+    args = parser.parse_args()
+
+    web.run_app(
+        create_app(args.max_concurrency, args.max_queue, args.shutdown_timeout),
+        host=args.host,
+        port=args.port,
+        shutdown_timeout=args.shutdown_timeout,
+    )
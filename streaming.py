@@ -0,0 +1,142 @@
+"""
+Helpers for streaming LLM output to the UI and CLI
+"""
+
+import re
+import asyncio
+import threading
+
+
+class MenuItemParser:
+    """Incrementally split streamed menu text into individual items
+
+    Numbered or bulleted lists are split on line breaks; anything else is
+    split on commas and line breaks, like the old `split(',')`, except for
+    commas inside numbers such as "1,000". An inline preamble before the
+    first item ("Here are some items: Pizza, ...") is dropped.
+    """
+
+    _MARKER = re.compile(r"^\s*(?:\d+\s*[.)]|[-*•])\s*")
+    # A comma between two digits is a thousands separator
+    _COMMA_LIST = re.compile(r"\n|(?<!\d),|,(?!\d)")
+    _PREAMBLE = re.compile(r"^[^:]*:\s*")
+
+    def __init__(self):
+        self._buffer = ""
+        self._numbered = None
+        self._first = True
+
+    def feed(self, text: str) -> list:
+        """Add a chunk of streamed text and return any items it completed"""
+        self._buffer += text
+        if self._numbered is None:
+            head = self._buffer.lstrip()
+            if not head or (head[0].isdigit() and len(head) < 4 and "\n" not in head):
+                return []
+            self._numbered = bool(self._MARKER.match(head))
+
+        if self._numbered:
+            *complete, self._buffer = self._buffer.split("\n")
+        else:
+            # "1," at the end of a chunk may be the start of "1,000"; wait for the next character
+            held = "," if self._buffer.endswith(",") and self._buffer[-2:-1].isdigit() else ""
+            *complete, rest = self._COMMA_LIST.split(self._buffer[:len(self._buffer) - len(held)])
+            self._buffer = rest + held
+        return [item for item in map(self._clean, complete) if item]
+
+    def close(self) -> list:
+        """Flush whatever is left once the stream has ended"""
+        item = self._clean(self._buffer.rstrip(","))
+        self._buffer = ""
+        return [item] if item else []
+
+    def _clean(self, item: str) -> str:
+        item = clean_menu_item(item)
+        if item and self._first:
+            self._first = False
+            if not self._numbered:
+                item = self._PREAMBLE.sub("", item)
+        return item
+
+
+def clean_menu_item(item: str) -> str:
+    """Strip list markers and trailing periods; empty for preambles"""
+    item = MenuItemParser._MARKER.sub("", item).strip().rstrip(".").strip()
+    # Skip preambles such as "Here are 10 menu items:"
+    return "" if item.endswith(":") else item
+
+
+async def astream_llm(llm, prompt_value):
+    """Stream text from `llm`, replaying a cached response when there is one
+
+    LangChain's streaming APIs skip the LLM cache, so this looks the prompt up
+    under the same key `invoke` would use and stores the streamed text.
+    """
+    from langchain_core.caches import BaseCache
+    from langchain_core.language_models import BaseChatModel
+    from langchain_core.load import dumps
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, Generation
+
+    cache = llm.cache if isinstance(llm.cache, BaseCache) else None
+    if cache is None:
+        async for chunk in llm.astream(prompt_value):
+            yield _chunk_text(chunk)
+        return
+
+    is_chat = isinstance(llm, BaseChatModel)
+    if is_chat:
+        prompt, llm_string = dumps(prompt_value.to_messages()), llm._get_llm_string(stop=None)
+    else:
+        prompt, llm_string = prompt_value.to_string(), str(sorted({**llm.dict(), "stop": None}.items()))
+
+    cached = cache.lookup(prompt, llm_string)
+    if cached:
+        yield cached[0].text
+        return
+
+    parts = []
+    async for chunk in llm.astream(prompt_value):
+        text = _chunk_text(chunk)
+        parts.append(text)
+        yield text
+
+    text = "".join(parts)
+    generation = ChatGeneration(message=AIMessage(content=text)) if is_chat else Generation(text=text)
+    cache.update(prompt, llm_string, [generation])
+
+
+def _chunk_text(chunk) -> str:
+    return chunk if isinstance(chunk, str) else chunk.content
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop():
+    # One long-lived loop so pooled async HTTP connections stay usable
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="streaming-loop", daemon=True).start()
+    return _loop
+
+
+def run_sync(coro):
+    """Run a coroutine to completion on the shared background loop"""
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop()).result()
+
+
+def iter_sync(agen):
+    """Consume an async generator from synchronous code (Streamlit, input() loops)"""
+    loop = _background_loop()
+    try:
+        while True:
+            try:
+                yield asyncio.run_coroutine_threadsafe(agen.__anext__(), loop).result()
+            except StopAsyncIteration:
+                break
+    finally:
+        asyncio.run_coroutine_threadsafe(agen.aclose(), loop).result()
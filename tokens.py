@@ -0,0 +1,39 @@
+"""
+Fast local token counting for prompt budgets
+Uses tiktoken when it is installed, otherwise a characters-per-token estimate
+"""
+
+from functools import lru_cache
+
+DEFAULT_ENCODING = "cl100k_base"
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def _encoding(name=DEFAULT_ENCODING):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception:
+        # The BPE file is downloaded on first use; offline boxes fall back to the estimate
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens `text` will use in a prompt"""
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` down to at most `max_tokens` tokens"""
+    encoding = _encoding()
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    ids = encoding.encode(text, disallowed_special=())
+    return text if len(ids) <= max_tokens else encoding.decode(ids[:max_tokens])
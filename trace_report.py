@@ -0,0 +1,145 @@
+"""
+Flame-style report from the JSONL traces written by instrumentation.py
+
+    python trace_report.py                      # where time goes, across all traces
+    python trace_report.py --trace last         # timeline of the latest trace
+    python trace_report.py --folded > out.txt   # folded stacks for flamegraph.pl / speedscope
+"""
+
+import os
+import json
+import argparse
+from collections import defaultdict
+
+from instrumentation import DEFAULT_TRACE_PATH
+
+BAR_WIDTH = 40
+
+
+def load_spans(path):
+    """Spans from a JSONL trace file, skipping lines that fail to parse"""
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                spans.append(json.loads(line))
+            except ValueError:
+                continue
+    return spans
+
+
+def build_traces(spans):
+    """{trace_id: [root spans]}, each span given a `children` list in start order"""
+    by_id = {span["span_id"]: dict(span, children=[]) for span in spans}
+    traces = defaultdict(list)
+    for span in by_id.values():
+        parent = by_id.get(span["parent_id"])
+        if parent is not None:
+            parent["children"].append(span)
+        else:
+            traces[span["trace_id"]].append(span)
+    for span in by_id.values():
+        span["children"].sort(key=lambda child: child["start"])
+    for roots in traces.values():
+        roots.sort(key=lambda root: root["start"])
+    return traces
+
+
+def self_time(span):
+    # Children can overlap when they run concurrently, so never go below zero
+    return max(0.0, span["duration"] - sum(child["duration"] for child in span["children"]))
+
+
+def folded_stacks(traces):
+    """{"root;child;leaf": self seconds} summed over every trace"""
+    stacks = defaultdict(float)
+
+    def walk(span, prefix):
+        path = f"{prefix};{span['name']}" if prefix else span["name"]
+        stacks[path] += self_time(span)
+        for child in span["children"]:
+            walk(child, path)
+
+    for roots in traces.values():
+        for root in roots:
+            walk(root, "")
+    return stacks
+
+
+def _label(span):
+    extras = []
+    if "prompt_tokens" in span:
+        extras.append(f"{span['prompt_tokens']}+{span['completion_tokens']} tok")
+    if span.get("cache_hit"):
+        extras.append("cache hit")
+    if span.get("error"):
+        extras.append("ERROR " + span["error"][:60])
+    return f" ({', '.join(extras)})" if extras else ""
+
+
+def print_timeline(roots):
+    """Indented tree with bars placed by start time, like a flame chart turned sideways"""
+    start = min(root["start"] for root in roots)
+    end = max(root["start"] + root["duration"] for root in roots)
+    scale = BAR_WIDTH / max(end - start, 1e-9)
+
+    def walk(span, depth):
+        offset = int((span["start"] - start) * scale)
+        width = max(1, int(span["duration"] * scale))
+        name = f"{'  ' * depth}{span['name']} [{span['kind']}]"
+        bar = " " * offset + "█" * min(width, BAR_WIDTH - offset)
+        print(f"{name:<48} {span['duration'] * 1000:9.1f}ms  |{bar:<{BAR_WIDTH}}|{_label(span)}")
+        for child in span["children"]:
+            walk(child, depth + 1)
+
+    for root in roots:
+        walk(root, 0)
+
+
+def print_summary(spans, traces):
+    """Per-step totals, then the heaviest stacks by self time"""
+    steps = defaultdict(list)
+    for span in spans:
+        steps[(span["name"], span["kind"])].append(span)
+
+    total = sum(root["duration"] for roots in traces.values() for root in roots) or 1e-9
+    print(f"{len(traces)} traces, {len(spans)} spans, {total:.2f}s in root spans\n")
+    print(f"{'step':<40} {'kind':<7} {'calls':>6} {'total':>10} {'p50':>9} {'p95':>9} {'tokens':>8} {'cache':>6} {'errors':>6}")
+    rows = sorted(steps.items(), key=lambda item: -sum(s["duration"] for s in item[1]))
+    for (name, kind), group in rows:
+        durations = sorted(s["duration"] for s in group)
+        tokens = sum(s.get("prompt_tokens", 0) + s.get("completion_tokens", 0) for s in group if not s.get("cache_hit"))
+        looked_up = [s for s in group if "cache_hit" in s]
+        cache = f"{sum(s['cache_hit'] for s in looked_up) / len(looked_up):.0%}" if looked_up else "-"
+        errors = sum(1 for s in group if s.get("error"))
+        print(f"{name[:40]:<40} {kind:<7} {len(group):>6} {sum(durations):>9.3f}s "
+              f"{durations[len(durations) // 2] * 1000:>7.1f}ms {durations[int(len(durations) * 0.95)] * 1000:>7.1f}ms "
+              f"{tokens:>8} {cache:>6} {errors:>6}")
+
+    print("\nSelf time by stack (flame graph, widest first):")
+    for path, seconds in sorted(folded_stacks(traces).items(), key=lambda item: -item[1])[:25]:
+        share = seconds / total
+        print(f"{'█' * max(1, int(share * BAR_WIDTH)):<{BAR_WIDTH}} {share:6.1%} {seconds * 1000:9.1f}ms  {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report on instrumentation traces")
+    parser.add_argument("path", nargs="?", default=os.getenv("TRACE_PATH", DEFAULT_TRACE_PATH))
+    parser.add_argument("--trace", help="trace id (or 'last') to show as a timeline")
+    parser.add_argument("--folded", action="store_true", help="print folded stacks in microseconds")
+    args = parser.parse_args()
+
+    spans = load_spans(args.path)
+    traces = build_traces(spans)
+    if not traces:
+        print(f"No spans in {args.path}; run with INSTRUMENTATION=1 first")
+    elif args.folded:
+        for path, seconds in sorted(folded_stacks(traces).items()):
+            print(f"{path} {int(seconds * 1_000_000)}")
+    elif args.trace:
+        trace_id = max(traces, key=lambda t: traces[t][0]["start"]) if args.trace == "last" else args.trace
+        if trace_id not in traces:
+            parser.error(f"unknown trace id {trace_id!r}")
+        print_timeline(traces[trace_id])
+    else:
+        print_summary(spans, traces)
@@ -1,21 +1,47 @@
 import streamlit as st
-from dotenv import load_dotenv
-import os
-from app import chain
+from app import astream_restaurant
+from streaming import iter_sync
 
 st.title("Restaurant Name Suggester")
 cuisine = st.sidebar.selectbox("Select Cuisine", ["bengali", "italian", "chinese", "mexican", "indian"], key="cuisine")
 
-def generate_restaurant_name(cuisine):
-  response = chain.invoke({"cuisine": cuisine})
-  return {
-    'resturant_name': response['restaurant_name'],
-    'menu_items': response['menu_items']
-  }
+@st.cache_resource
+def worker_pool():
+  # One pool per server process, shared by every session; None when UI_WORKERS=0
+  from worker_pool import get_worker_pool
+  return get_worker_pool()
+
+def restaurant_events(cuisine):
+  """Events for `cuisine` from a worker process, or inline when there is no pool"""
+  pool = worker_pool()
+  if pool is None:
+    yield from iter_sync(astream_restaurant(cuisine))
+    return
+  job = st.session_state.get("job")
+  if job is not None and job.cuisine != cuisine:
+    # The selection changed mid-generation: free the worker instead of finishing a menu nobody will see
+    job.cancel()
+    job = None
+  if job is None or job.status in ("error", "cancelled"):
+    job = st.session_state["job"] = pool.submit(cuisine)
+  # A rerun for the same cuisine replays the job from its first event
+  for kind, value in job.stream():
+    if kind == "error":
+      raise RuntimeError(value)
+    if kind in ("restaurant_name", "menu_item"):
+      yield kind, value
+
+def stream_restaurant(cuisine):
+  """Render the name as soon as it is ready, then each menu item as it streams in"""
+  header = st.empty()
+  header.caption("Thinking of a name...")
+  menu_title = st.empty()
+  for kind, value in restaurant_events(cuisine):
+    if kind == "restaurant_name":
+      header.header(value)
+      menu_title.write("Menu Items:")
+    else:
+      st.write("- " + value)
 
 if cuisine:
-  response = generate_restaurant_name(cuisine)
-  st.header(response['resturant_name'])
-  st.write("Menu Items:")
-  for item in response['menu_items'].split(','):
-    st.write("- " + item.strip())
\ No newline at end of file
+  stream_restaurant(cuisine)
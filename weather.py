@@ -0,0 +1,134 @@
+"""
+Weather fast path: SerpAPI weather answer boxes parsed into compact result
+objects, cached per location for a few minutes and rendered from templates,
+so weather questions are answered without an LLM call
+"""
+
+import os
+import ast
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+from scheduler import get_scheduler
+from search_cache import SearchCache
+
+DEFAULT_TTL = 10 * 60
+
+TEMPLATES = {
+    "default": ("Weather in {location}: {condition} at {temperature}°{unit}. "
+                "Humidity: {humidity}, Wind: {wind}, Precipitation: {precipitation} ({date})"),
+    "short": "{condition}, {temperature}°{unit} in {location}",
+}
+
+_UNITS = {"fahrenheit": "F", "celsius": "C", "f": "F", "c": "C"}
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_LOCATION = re.compile(r"\b(?:in|for|at|near)\s+(.+?)[\s?.!]*$", re.IGNORECASE)
+_TRAILING_TIME = re.compile(r"\s+\b(today|tonight|tomorrow|now|right now|this (morning|afternoon|evening|week|weekend))\b.*$", re.IGNORECASE)
+
+
+class NoWeatherResult(LookupError):
+    """The search came back without a weather answer box"""
+
+    def __init__(self, payload):
+        super().__init__("no weather answer box in search results")
+        self.payload = payload
+
+
+@dataclass(slots=True, frozen=True)
+class WeatherResult:
+    """Current conditions from a weather answer box"""
+
+    location: str
+    condition: str
+    temperature: float | None = None
+    unit: str = "F"
+    humidity: str | None = None
+    wind: str | None = None
+    precipitation: str | None = None
+    date: str | None = None
+
+    def render(self, template="default") -> str:
+        """Fill a named template from TEMPLATES, or a format string, with this result"""
+        fields = {name: "N/A" if getattr(self, name) is None else getattr(self, name) for name in self.__slots__}
+        if self.temperature is not None:
+            fields["temperature"] = f"{self.temperature:g}"
+        return TEMPLATES.get(template, template).format_map(fields)
+
+
+def _answer_box(payload):
+    if isinstance(payload, str):
+        # The string SerpAPIWrapper.run returns for answer boxes; skip the parse for anything else
+        if "weather_result" not in payload:
+            return None
+        try:
+            payload = ast.literal_eval(payload)
+        except (ValueError, SyntaxError):
+            return None
+    if not isinstance(payload, dict):
+        return None
+    box = payload.get("answer_box", payload)
+    if isinstance(box, list):
+        box = box[0] if box else {}
+    return box if isinstance(box, dict) and box.get("type") == "weather_result" else None
+
+
+def parse_weather(payload):
+    """WeatherResult from raw SerpAPI results, an answer box, or its string form; None if not a weather box"""
+    box = _answer_box(payload)
+    if box is None:
+        return None
+    temperature = _NUMBER.search(str(box.get("temperature", "")))
+    unit = str(box.get("unit", "Fahrenheit")).strip().lower()
+    return WeatherResult(
+        location=box.get("location") or "Unknown",
+        condition=box.get("weather") or "N/A",
+        temperature=float(temperature.group()) if temperature else None,
+        unit=_UNITS.get(unit, unit[:1].upper() or "F"),
+        humidity=box.get("humidity"),
+        wind=box.get("wind"),
+        precipitation=box.get("precipitation"),
+        date=box.get("date"),
+    )
+
+
+def location_key(question: str) -> str:
+    """Cache key for the place a weather question is about
+
+    "What's the weather in New York today?" and "current weather in new york"
+    share the key "new york"; questions without a place fall back to the
+    whole question.
+    """
+    match = _LOCATION.search(question)
+    place = _TRAILING_TIME.sub("", match.group(1)) if match else question
+    return SearchCache.normalize(place)
+
+
+@lru_cache(maxsize=None)
+def get_weather_cache() -> SearchCache:
+    """Location-keyed cache; WEATHER_TTL sets how long conditions are reused"""
+    from clients import load_env
+    load_env()
+    return SearchCache(ttl_classes=[], default_ttl=float(os.getenv("WEATHER_TTL", DEFAULT_TTL)), stale_window=60)
+
+
+def get_weather(question: str, search) -> WeatherResult:
+    """Current weather for the place in `question`, from cache or one scheduled search
+
+    `search(query)` returns raw SerpAPI results, e.g. SerpAPIWrapper.results.
+    Raises NoWeatherResult when the search has no weather box. Misses are
+    cached like hits, so asking again does not search again.
+    """
+    key = location_key(question)
+    # Without a recognizable place, search for the question as asked
+    query = question if key == SearchCache.normalize(question) else f"current weather in {key}"
+
+    def fetch(_):
+        payload = get_scheduler().call("serpapi", search, query)
+        result = parse_weather(payload)
+        return NoWeatherResult(payload) if result is None else result
+
+    result = get_weather_cache().get(key, fetch)
+    if isinstance(result, NoWeatherResult):
+        raise NoWeatherResult(result.payload)
+    return result
@@ -0,0 +1,204 @@
+"""
+Offline Wikipedia backend for wikipedia_agent
+Stores articles in a memory-mapped SQLite file with an FTS5 full-text index
+
+    python wiki_index.py ingest data/wikipedia_sample.jsonl
+    python wiki_index.py ingest enwiki-latest-pages-articles.xml.bz2 --limit 100000
+    python wiki_index.py search "Eiffel Tower"
+"""
+
+import os
+import re
+import bz2
+import json
+import sqlite3
+import argparse
+import threading
+import xml.etree.ElementTree as ET
+from itertools import islice
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_INDEX_PATH = os.path.join(BASE_DIR, ".cache", "wikipedia.sqlite")
+SAMPLE_CORPUS = os.path.join(BASE_DIR, "data", "wikipedia_sample.jsonl")
+
+STOPWORDS = frozenset(
+    "a about an and are as at be by can did do does explain for from how i in is it me "
+    "of on or please tell that the there this to was what when where which who why with you".split()
+)
+
+
+class WikiIndex:
+    """Local article store with the same `run(query)` interface as WikipediaQueryRun"""
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, top_k_results=3, doc_content_chars_max=4000, mmap_size=256 * 1024 * 1024):
+        self.path = path
+        self.top_k_results = top_k_results
+        self.doc_content_chars_max = doc_content_chars_max
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                id INTEGER PRIMARY KEY,
+                title TEXT NOT NULL UNIQUE,
+                text TEXT NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+                title, text, content='articles', content_rowid='id', tokenize='porter unicode61'
+            );
+            """
+        )
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def add_articles(self, articles, batch_size=1000) -> int:
+        """Insert (title, text) pairs, replacing articles with the same title"""
+        count = 0
+        batch = []
+        for title, text in articles:
+            batch.append((title, text))
+            if len(batch) >= batch_size:
+                count += self._insert(batch)
+                batch = []
+        if batch:
+            count += self._insert(batch)
+        return count
+
+    def _insert(self, batch):
+        with self._lock, self._conn:
+            for title, text in batch:
+                row = self._conn.execute("SELECT id, text FROM articles WHERE title = ?", (title,)).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "INSERT INTO articles_fts (articles_fts, rowid, title, text) VALUES ('delete', ?, ?, ?)",
+                        (row[0], title, row[1]),
+                    )
+                    self._conn.execute("DELETE FROM articles WHERE id = ?", (row[0],))
+                cursor = self._conn.execute("INSERT INTO articles (title, text) VALUES (?, ?)", (title, text))
+                self._conn.execute(
+                    "INSERT INTO articles_fts (rowid, title, text) VALUES (?, ?, ?)",
+                    (cursor.lastrowid, title, text),
+                )
+        return len(batch)
+
+    def ingest(self, source, limit=None) -> int:
+        """Load a JSONL file, a MediaWiki XML dump (.xml / .xml.bz2) or a folder of .txt files"""
+        count = self.add_articles(islice(iter_articles(source), limit))
+        with self._lock:
+            self._conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('optimize')")
+            self._conn.commit()
+        return count
+
+    def search(self, query: str, limit=None):
+        """Best matching (title, text) pairs, title matches weighted highest"""
+        match = build_match_query(query)
+        if not match:
+            return []
+        with self._lock:
+            return self._conn.execute(
+                "SELECT a.title, a.text FROM articles_fts f JOIN articles a ON a.id = f.rowid "
+                "WHERE articles_fts MATCH ? ORDER BY bm25(articles_fts, 10.0, 1.0) LIMIT ?",
+                (match, limit or self.top_k_results),
+            ).fetchall()
+
+    def run(self, query: str) -> str:
+        """Format results like WikipediaAPIWrapper.run"""
+        pages = [f"Page: {title}\nSummary: {text}" for title, text in self.search(query)]
+        if not pages:
+            return "No good Wikipedia Search Result was found"
+        return "\n\n".join(pages)[:self.doc_content_chars_max]
+
+
+def build_match_query(query: str) -> str:
+    """Turn a free-form question into an FTS5 OR query of its keywords"""
+    words = [w for w in re.findall(r"\w+", query.lower()) if w not in STOPWORDS]
+    return " OR ".join(f'"{w}"' for w in dict.fromkeys(words))
+
+
+def iter_articles(source):
+    """Yield (title, text) pairs from any supported source"""
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.endswith(".txt"):
+                with open(os.path.join(source, name), encoding="utf-8") as f:
+                    yield os.path.splitext(name)[0].replace("_", " "), f.read().strip()
+    elif source.endswith((".xml", ".xml.bz2")):
+        yield from iter_dump(source)
+    else:
+        with open(source, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record["title"], record["text"]
+
+
+def iter_dump(path):
+    """Stream main-namespace articles out of a MediaWiki XML dump"""
+    opener = bz2.open if path.endswith(".bz2") else open
+    with opener(path, "rb") as f:
+        for _, element in ET.iterparse(f, events=("end",)):
+            if element.tag.rsplit("}", 1)[-1] != "page":
+                continue
+            fields = {child.tag.rsplit("}", 1)[-1]: child for child in element.iter()}
+            title, ns, text = fields.get("title"), fields.get("ns"), fields.get("text")
+            if title is not None and text is not None and text.text and (ns is None or ns.text == "0") and "redirect" not in fields:
+                plain = strip_wikitext(text.text)
+                if plain:
+                    yield title.text, plain
+            element.clear()
+
+
+_TEMPLATE = re.compile(r"\{\{[^{}]*\}\}")
+_TABLE = re.compile(r"\{\|.*?\|\}", re.S)
+_REF = re.compile(r"<ref[^>/]*/>|<ref[^>]*>.*?</ref>", re.S)
+_TAG = re.compile(r"<[^>]+>")
+_FILE_LINK = re.compile(r"\[\[(?:File|Image|Category):[^\]]*\]\]", re.I)
+_LINK = re.compile(r"\[\[(?:[^|\]]*\|)?([^\]]*)\]\]")
+_EXTERNAL_LINK = re.compile(r"\[https?://\S+\s?([^\]]*)\]")
+
+
+def strip_wikitext(text: str) -> str:
+    """Rough wikitext to plain text conversion, good enough for search and prompts"""
+    previous = None
+    while previous != text:
+        previous, text = text, _TEMPLATE.sub("", text)
+    for pattern in (_TABLE, _REF, _FILE_LINK):
+        text = pattern.sub("", text)
+    text = _LINK.sub(r"\1", text)
+    text = _EXTERNAL_LINK.sub(r"\1", text)
+    text = _TAG.sub("", text)
+    text = re.sub(r"'{2,}", "", text)
+    text = re.sub(r"^=+\s*(.*?)\s*=+\s*$", r"\1", text, flags=re.M)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def open_index(path=DEFAULT_INDEX_PATH) -> WikiIndex:
+    """Open the local index, seeding it with the bundled sample corpus when empty"""
+    index = WikiIndex(path)
+    if len(index) == 0 and os.path.exists(SAMPLE_CORPUS):
+        index.ingest(SAMPLE_CORPUS)
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline Wikipedia index")
+    parser.add_argument("--db", default=os.getenv("WIKIPEDIA_INDEX_PATH", DEFAULT_INDEX_PATH))
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="load articles into the index")
+    ingest.add_argument("source", help="JSONL file, MediaWiki XML dump (.xml/.xml.bz2) or folder of .txt files")
+    ingest.add_argument("--limit", type=int, help="stop after this many articles")
+    search = commands.add_parser("search", help="query the index")
+    search.add_argument("query")
+    args = parser.parse_args()
+
+    index = WikiIndex(args.db)
+    if args.command == "ingest":
+        count = index.ingest(args.source, args.limit)
+        print(f"Indexed {count} articles into {args.db} ({len(index)} total)")
+    else:
+        print(index.run(args.query))
@@ -1,35 +1,106 @@
 import os
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_community.tools import WikipediaQueryRun
-from langchain_community.utilities import WikipediaAPIWrapper
+import asyncio
+from functools import lru_cache
+from clients import load_env, pooled_client_kwargs
+from instrumentation import span
+from prompts import Section, build_prompt
+from scheduler import get_scheduler
 
-load_dotenv()
+# Clients are built on first use so importing this module stays fast
 
-# Initialize LLM
-api_key = os.getenv("OPENAI_API_KEY")
-llm = ChatOpenAI(temperature=0, openai_api_key=api_key)
+@lru_cache(maxsize=None)
+def get_llm():
+    """Initialize LLM"""
+    from langchain_openai import ChatOpenAI
+    load_env()
+    api_key = os.getenv("OPENAI_API_KEY")
+    return ChatOpenAI(temperature=0, openai_api_key=api_key, **pooled_client_kwargs())
 
-# Create Wikipedia tool
-wikipedia = WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper())
+@lru_cache(maxsize=None)
+def get_wikipedia():
+    """Create Wikipedia tool; WIKIPEDIA_BACKEND=local answers from the offline index"""
+    load_env()
+    if os.getenv("WIKIPEDIA_BACKEND", "api") == "local":
+        from wiki_index import DEFAULT_INDEX_PATH, open_index
+        return open_index(os.getenv("WIKIPEDIA_INDEX_PATH", DEFAULT_INDEX_PATH))
+    from langchain_community.tools import WikipediaQueryRun
+    from langchain_community.utilities import WikipediaAPIWrapper
+    return WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper())
+
+_LAZY_ATTRIBUTES = {"llm": get_llm, "wikipedia": get_wikipedia}
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Prefix of lookup failures; answers built on one are not cached
+WIKIPEDIA_ERROR = "Error searching Wikipedia:"
+
+# Fixed opening of every Wikipedia prompt
+WIKIPEDIA_INSTRUCTIONS = "Answer the question at the end using the Wikipedia information below."
+# Budget for the Wikipedia passages
+WIKIPEDIA_TOKENS = 400
 
 def search_wikipedia(query: str) -> str:
     """Search Wikipedia for information"""
+    from passage_ranker import top_passages
+    from wiki_index import WikiIndex
+    
     try:
-        result = wikipedia.run(query)
-        return result[:500] + "..." if len(result) > 500 else result
+        wikipedia = get_wikipedia()
+        if isinstance(wikipedia, WikiIndex):
+            result = wikipedia.run(query)
+        else:
+            # The live API is rate-limited and retried by the shared scheduler
+            result = get_scheduler().call("wikipedia", wikipedia.run, query)
+        # Keep the passages most relevant to the question, not just the first 500 characters
+        with span("rank.passages", kind="step"):
+            return top_passages(query, result, max_chars=500)
     except Exception as e:
-        return f"Error searching Wikipedia: {str(e)}"
+        return f"{WIKIPEDIA_ERROR} {str(e)}"
 
-def ask_with_wikipedia(question: str) -> str:
-    """Answer questions using Wikipedia search"""
+def build_wikipedia_prompt(question: str) -> str:
+    """Look the question up on Wikipedia and build the answer prompt"""
     # First try to get Wikipedia info
-    wiki_info = search_wikipedia(question)
+    with span("tool.wikipedia", kind="tool"):
+        wiki_info = search_wikipedia(question)
     
     # Use LLM to provide a better answer based on Wikipedia info
-    prompt = f"Based on this Wikipedia information: {wiki_info}\n\nAnswer this question: {question}"
-    response = llm.invoke(prompt)
-    return response.content
+    with span("prompt.wikipedia", kind="prompt"):
+        return build_prompt("wikipedia", WIKIPEDIA_INSTRUCTIONS,
+                            [Section("Wikipedia information", wiki_info, WIKIPEDIA_TOKENS)], question)
+
+def ask_with_wikipedia(question: str) -> str:
+    """Answer questions using Wikipedia search"""
+    with span("ask_with_wikipedia", kind="agent"):
+        # Reworded repeats of an earlier question reuse its answer
+        from semantic_cache import get_semantic_cache
+        cache = get_semantic_cache()
+        answer = cache.get("wikipedia", question)
+        if answer is not None:
+            return answer
+        prompt = build_wikipedia_prompt(question)
+        response = get_llm().invoke(prompt)
+        if WIKIPEDIA_ERROR not in prompt:
+            cache.put("wikipedia", question, response.content)
+        return response.content
+
+async def astream_with_wikipedia(question: str):
+    """Stream an answer based on Wikipedia search"""
+    from semantic_cache import get_semantic_cache
+    cache = get_semantic_cache()
+    answer = cache.get("wikipedia", question)
+    if answer is not None:
+        yield answer
+        return
+    prompt = await asyncio.to_thread(build_wikipedia_prompt, question)
+    parts = []
+    async for chunk in get_llm().astream(prompt):
+        parts.append(chunk.content)
+        yield chunk.content
+    if WIKIPEDIA_ERROR not in prompt:
+        cache.put("wikipedia", question, "".join(parts))
 
 if __name__ == "__main__":
     questions = [
@@ -0,0 +1,292 @@
+"""
+Worker processes for restaurant generation requests
+The UI submits a job and gets a Job back right away; a worker process runs
+app.astream_restaurant and streams its events back, so a slow generation
+never blocks the Streamlit script thread and prompt formatting, parsing and
+caching don't share its GIL. Workers share the on-disk response cache
+(.cache/responses.sqlite), so a menu one worker generated is a cache hit for
+the others. Queued or running jobs can be cancelled.
+
+    pool = get_worker_pool()
+    job = pool.submit("italian")
+    for kind, value in job.stream():
+        print(kind, value)
+"""
+
+import os
+import time
+import queue
+import asyncio
+import itertools
+import threading
+import multiprocessing
+
+POLL_INTERVAL = 0.05  # how often a worker checks whether its job was cancelled
+
+# Terminal events; every job ends with exactly one of them
+DONE, ERROR, CANCELLED = "done", "error", "cancelled"
+
+
+class Job:
+    """One generation request: its events so far and how it ended
+
+    Events are ("restaurant_name", name), ("menu_item", item) and finally
+    ("done", None), ("error", message) or ("cancelled", None).
+    """
+
+    def __init__(self, pool, job_id, cuisine, mode):
+        self.id = job_id
+        self.cuisine = cuisine
+        self.mode = mode
+        self.status = "queued"
+        self.events = []
+        self.worker = None
+        self.submitted_at = time.perf_counter()
+        self.first_event_at = None
+        self._pool = pool
+        self._cursor = 0
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, ERROR, CANCELLED)
+
+    def _add(self, kind, value):
+        with self._changed:
+            if self.finished:
+                return
+            if self.first_event_at is None:
+                self.first_event_at = time.perf_counter()
+            self.events.append((kind, value))
+            if kind in (DONE, ERROR, CANCELLED):
+                self.status = kind
+            self._changed.notify_all()
+
+    def poll(self) -> list:
+        """Events that arrived since the last poll, without waiting"""
+        with self._changed:
+            events = self.events[self._cursor:]
+            self._cursor = len(self.events)
+        return events
+
+    def stream(self, start=0, timeout=None):
+        """Yield events from `start` as they arrive, ending after the terminal one
+
+        Raises TimeoutError if nothing arrives for `timeout` seconds.
+        """
+        position = start
+        while True:
+            with self._changed:
+                if position == len(self.events) and not self._changed.wait_for(
+                    lambda: position < len(self.events), timeout
+                ):
+                    raise TimeoutError(f"no events from job {self.id} for {timeout}s")
+                events = self.events[position:]
+            position += len(events)
+            for kind, value in events:
+                yield kind, value
+                if kind in (DONE, ERROR, CANCELLED):
+                    return
+
+    def result(self, timeout=None) -> dict:
+        """Wait for the job and return {"restaurant_name", "menu_items"}; raises if it failed"""
+        for kind, value in self.stream(timeout=timeout):
+            if kind == ERROR:
+                raise RuntimeError(value)
+            if kind == CANCELLED:
+                raise RuntimeError(f"job {self.id} was cancelled")
+        return {
+            "restaurant_name": next((v for k, v in self.events if k == "restaurant_name"), None),
+            "menu_items": [v for k, v in self.events if k == "menu_item"],
+        }
+
+    def cancel(self) -> bool:
+        return self._pool.cancel(self)
+
+
+class WorkerPool:
+    """A fixed set of worker processes fed from one queue of jobs
+
+    Jobs wait in this process until a worker is free, so cancelling a
+    queued job costs nothing; a running job is stopped within
+    POLL_INTERVAL. A worker that dies is replaced and its job fails.
+    `initializer`, a picklable function, runs in each worker at startup.
+    """
+
+    def __init__(self, workers=None, mode=None, initializer=None):
+        self.size = workers or min(4, os.cpu_count() or 1)
+        self.mode = mode
+        self.initializer = initializer
+        # spawn, not fork: the parent has threads (the asyncio loop, Streamlit's) that fork would copy mid-flight
+        self._context = multiprocessing.get_context("spawn")
+        self._events = self._context.Queue()
+        self._cancel = self._context.Array("q", [0] * self.size, lock=False)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._jobs = {}
+        self._pending = []
+        self._idle = []
+        self._tasks = [None] * self.size
+        self._processes = [None] * self.size
+        self._closed = False
+        for worker in range(self.size):
+            self._start_worker(worker)
+        self._dispatcher = threading.Thread(target=self._dispatch_events, name="worker-pool", daemon=True)
+        self._dispatcher.start()
+
+    def _start_worker(self, worker):
+        self._tasks[worker] = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker, self._tasks[worker], self._events, self._cancel, self.initializer),
+            name=f"restaurant-worker-{worker}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[worker] = process
+
+    def submit(self, cuisine, mode=None) -> Job:
+        """Queue a generation for `cuisine` and return its Job immediately"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("worker pool is shut down")
+            job = Job(self, next(self._ids), cuisine, mode or self.mode)
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            self._assign()
+        return job
+
+    def cancel(self, job) -> bool:
+        """Stop a queued or running job; False if it had already finished"""
+        with self._lock:
+            if job.finished or job.id not in self._jobs:
+                return False
+            if job.worker is None:
+                self._pending.remove(job)
+                del self._jobs[job.id]
+                job._add(CANCELLED, None)
+            else:
+                self._cancel[job.worker] = job.id
+        return True
+
+    def _assign(self):
+        # Called with the lock held
+        while self._pending and self._idle:
+            worker = self._idle.pop()
+            job = self._pending.pop(0)
+            job.worker = worker
+            job.status = "running"
+            self._tasks[worker].put((job.id, job.cuisine, job.mode))
+
+    def _dispatch_events(self):
+        while True:
+            try:
+                job_id, kind, value = self._events.get(timeout=1.0)
+            except queue.Empty:
+                self._check_workers()
+                continue
+            except (EOFError, OSError):
+                return
+            if kind == "ready":
+                with self._lock:
+                    self._idle.append(value)
+                    self._assign()
+                continue
+            job = self._jobs.get(job_id)
+            if job is None:
+                continue
+            job._add(kind, value)
+            if kind in (DONE, ERROR, CANCELLED):
+                with self._lock:
+                    del self._jobs[job_id]
+
+    def _check_workers(self):
+        with self._lock:
+            if self._closed:
+                return
+            for worker, process in enumerate(self._processes):
+                if process.is_alive():
+                    continue
+                for job in [job for job in self._jobs.values() if job.worker == worker]:
+                    del self._jobs[job.id]
+                    job._add(ERROR, f"worker {worker} exited with code {process.exitcode}")
+                if worker in self._idle:
+                    self._idle.remove(worker)
+                self._start_worker(worker)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"workers": self.size, "idle": len(self._idle), "queued": len(self._pending),
+                    "running": sum(job.worker is not None for job in self._jobs.values())}
+
+    def shutdown(self, wait=True):
+        """Cancel queued jobs and stop the workers"""
+        with self._lock:
+            self._closed = True
+            for job in self._pending:
+                job._add(CANCELLED, None)
+            self._pending.clear()
+            for worker in range(self.size):
+                self._tasks[worker].put(None)
+        if wait:
+            for process in self._processes:
+                process.join(timeout=5)
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()
+
+
+def _worker_main(worker, tasks, events, cancel, initializer):
+    if initializer is not None:
+        initializer()
+    loop = asyncio.new_event_loop()
+    events.put((None, "ready", worker))
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        job_id, cuisine, mode = task
+        loop.run_until_complete(_run_job(job_id, cuisine, mode, events, cancel, worker))
+        events.put((None, "ready", worker))
+    loop.close()
+
+
+async def _run_job(job_id, cuisine, mode, events, cancel, worker):
+    from app import astream_restaurant
+
+    async def produce():
+        async for kind, value in astream_restaurant(cuisine, mode):
+            events.put((job_id, kind, value))
+
+    task = asyncio.ensure_future(produce())
+    while not task.done():
+        await asyncio.wait({task}, timeout=POLL_INTERVAL)
+        if cancel[worker] == job_id and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            events.put((job_id, CANCELLED, None))
+            return
+    error = task.exception()
+    if error is not None:
+        events.put((job_id, ERROR, f"{type(error).__name__}: {error}"))
+    else:
+        events.put((job_id, DONE, None))
+
+
+_worker_pool = None
+_worker_pool_lock = threading.Lock()
+
+
+def get_worker_pool():
+    """Shared pool sized by UI_WORKERS (default: up to 4); None when UI_WORKERS=0"""
+    global _worker_pool
+    if _worker_pool is None:
+        with _worker_pool_lock:
+            if _worker_pool is None:
+                from clients import load_env
+                load_env()
+                workers = int(os.getenv("UI_WORKERS", min(4, os.cpu_count() or 1)))
+                if workers <= 0:
+                    return None
+                _worker_pool = WorkerPool(workers)
+    return _worker_pool